@@ -0,0 +1,161 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+from app.config import settings
+
+class ChunkStore:
+    """Extracted document text, stored once per document as a zlib blob.
+    
+    Chunks only keep (char_offset, char_length, page) in their metadata and
+    their text is sliced out of the document when a search needs it. This
+    replaces one copy of the text per chunk, which with CHUNK_OVERLAP is more
+    than the document itself. Recently used documents stay decompressed in an
+    LRU cache of CHUNK_STORE_CACHE_DOCUMENTS entries.
+    
+    Texts are keyed by their SHA-256 as well as the filename, and chunks record
+    it as text_hash, so a chunk only ever slices the version of the text it was
+    cut from. That also keeps the cache valid across processes sharing the
+    store: the text behind a hash never changes. Texts stored before hashes
+    were recorded have an empty hash.
+    """
+    
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.path.join(settings.CHROMA_PERSIST_DIRECTORY, "chunk_store.sqlite3")
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()  # (namespace, filename, text_hash) -> text
+        self._connection = sqlite3.connect(self.path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS texts (
+                namespace TEXT NOT NULL,
+                filename TEXT NOT NULL,
+                text_hash TEXT NOT NULL,
+                text BLOB NOT NULL,
+                text_bytes INTEGER NOT NULL,
+                compressed_bytes INTEGER NOT NULL,
+                chunk_bytes INTEGER NOT NULL,
+                PRIMARY KEY (namespace, filename, text_hash)
+            )
+            """
+        )
+        legacy = self._connection.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'documents'"
+        ).fetchone()
+        if legacy is not None:
+            # Texts stored before they were keyed by hash
+            self._connection.execute(
+                "INSERT OR IGNORE INTO texts SELECT namespace, filename, '', text, text_bytes, "
+                "compressed_bytes, chunk_bytes FROM documents"
+            )
+            self._connection.execute("DROP TABLE documents")
+        self._connection.commit()
+    
+    def put(self, namespace: str, filename: str, text: str, chunk_bytes: int) -> str:
+        """Store the text of a document, replacing its other versions; returns the text's hash.
+        
+        chunk_bytes is the size of the chunk texts the document was split
+        into, i.e. what storing every chunk's text would have cost.
+        """
+        encoded = text.encode("utf-8")
+        text_hash = hashlib.sha256(encoded).hexdigest()
+        compressed = zlib.compress(encoded, settings.CHUNK_STORE_COMPRESSION_LEVEL)
+        with self._lock:
+            self._connection.execute(
+                "DELETE FROM texts WHERE namespace = ? AND filename = ? AND text_hash != ?",
+                (namespace, filename, text_hash)
+            )
+            self._connection.execute(
+                "INSERT OR REPLACE INTO texts VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (namespace, filename, text_hash, compressed, len(encoded), len(compressed), chunk_bytes)
+            )
+            self._connection.commit()
+        return text_hash
+    
+    def has(self, namespace: str, filename: str) -> bool:
+        """Whether any version of a document's text is stored."""
+        with self._lock:
+            return self._connection.execute(
+                "SELECT 1 FROM texts WHERE namespace = ? AND filename = ? LIMIT 1",
+                (namespace, filename)
+            ).fetchone() is not None
+    
+    def get_text(self, namespace: str, filename: str, text_hash: str = "") -> Optional[str]:
+        """Get the full text of a document version, or None if it is not stored."""
+        key = (namespace, filename, text_hash)
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+            
+            row = self._connection.execute(
+                "SELECT text FROM texts WHERE namespace = ? AND filename = ? AND text_hash = ?",
+                key
+            ).fetchone()
+            if row is None:
+                return None
+            
+            text = zlib.decompress(row[0]).decode("utf-8")
+            self._cache[key] = text
+            while len(self._cache) > settings.CHUNK_STORE_CACHE_DOCUMENTS:
+                self._cache.popitem(last=False)
+            return text
+    
+    def get_chunk_text(
+        self,
+        namespace: str,
+        filename: str,
+        offset: int,
+        length: int,
+        text_hash: str = ""
+    ) -> Optional[str]:
+        """Get the text of one chunk from its document, or None if that version is not stored."""
+        text = self.get_text(namespace, filename, text_hash)
+        if text is None:
+            return None
+        return text[offset:offset + length]
+    
+    def delete(self, namespace: str, filename: str, text_hash: Optional[str] = None) -> None:
+        """Forget every version of the text of a document, or only the one with text_hash."""
+        with self._lock:
+            if text_hash is None:
+                self._connection.execute(
+                    "DELETE FROM texts WHERE namespace = ? AND filename = ?",
+                    (namespace, filename)
+                )
+            else:
+                self._connection.execute(
+                    "DELETE FROM texts WHERE namespace = ? AND filename = ? AND text_hash = ?",
+                    (namespace, filename, text_hash)
+                )
+            self._connection.commit()
+            for key in [key for key in self._cache if key[:2] == (namespace, filename) and text_hash in (None, key[2])]:
+                del self._cache[key]
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Storage used by the store compared with keeping every chunk's text."""
+        with self._lock:
+            documents, text_bytes, compressed_bytes, chunk_bytes = self._connection.execute(
+                "SELECT COUNT(*), COALESCE(SUM(text_bytes), 0), COALESCE(SUM(compressed_bytes), 0), "
+                "COALESCE(SUM(chunk_bytes), 0) FROM texts"
+            ).fetchone()
+        
+        return {
+            "documents": documents,
+            "text_bytes": text_bytes,
+            "compressed_bytes": compressed_bytes,
+            "chunk_text_bytes": chunk_bytes,
+            "bytes_saved": chunk_bytes - compressed_bytes,
+            "savings_ratio": round(1 - compressed_bytes / chunk_bytes, 3) if chunk_bytes else 0.0
+        }
+    
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._cache.clear()
+            self._connection.close()
\ No newline at end of file
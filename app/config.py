@@ -13,14 +13,94 @@ class Settings:
     LLM_MODEL_TYPE: str = os.getenv("LLM_MODEL_TYPE", "mistral")
     LLM_MAX_TOKENS: int = int(os.getenv("LLM_MAX_TOKENS", "2048"))
     LLM_TEMPERATURE: float = float(os.getenv("LLM_TEMPERATURE", "0.7"))
+    LLM_BACKEND: str = os.getenv("LLM_BACKEND", "local")  # local | http | fake
+    LLM_SPECULATIVE_DECODING: bool = os.getenv("LLM_SPECULATIVE_DECODING", "false").lower() == "true"  # local backend
+    LLM_DRAFT_TOKENS: int = int(os.getenv("LLM_DRAFT_TOKENS", "10"))  # tokens drafted per step by prompt lookup
+    
+    # LLM server (LLM_BACKEND=http, OpenAI / llama.cpp server compatible)
+    LLM_SERVER_URL: str = os.getenv("LLM_SERVER_URL", "http://localhost:8080")
+    LLM_SERVER_MODEL: str = os.getenv("LLM_SERVER_MODEL", "")
+    LLM_SERVER_API_KEY: str = os.getenv("LLM_SERVER_API_KEY", "")
+    LLM_SERVER_POOL_SIZE: int = int(os.getenv("LLM_SERVER_POOL_SIZE", "16"))
+    LLM_SERVER_CONNECT_TIMEOUT: float = float(os.getenv("LLM_SERVER_CONNECT_TIMEOUT", "5"))
+    LLM_SERVER_READ_TIMEOUT: float = float(os.getenv("LLM_SERVER_READ_TIMEOUT", "300"))
+    
+    # Fake LLM backend (for load testing without a model)
+    FAKE_LLM_TOKENS_PER_SEC: float = float(os.getenv("FAKE_LLM_TOKENS_PER_SEC", "20"))
+    FAKE_LLM_PROMPT_TOKENS_PER_SEC: float = float(os.getenv("FAKE_LLM_PROMPT_TOKENS_PER_SEC", "200"))
+    FAKE_LLM_OUTPUT_TOKENS: int = int(os.getenv("FAKE_LLM_OUTPUT_TOKENS", "128"))
     
     # Embedding Configuration
     EMBEDDING_MODEL: str = os.getenv("EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
     EMBEDDING_DEVICE: str = os.getenv("EMBEDDING_DEVICE", "cpu")
+    EMBEDDING_BULK_BATCH_SIZE: int = int(os.getenv("EMBEDDING_BULK_BATCH_SIZE", "64"))
+    EMBEDDING_BULK_THRESHOLD: int = int(os.getenv("EMBEDDING_BULK_THRESHOLD", "256"))  # chunks
+    EMBEDDING_WORKERS: int = int(os.getenv("EMBEDDING_WORKERS", "1"))  # processes for bulk encoding
     
     # Vector Store Configuration
     CHROMA_PERSIST_DIRECTORY: str = os.getenv("CHROMA_PERSIST_DIRECTORY", "./chroma_db")
     CHROMA_COLLECTION_NAME: str = os.getenv("CHROMA_COLLECTION_NAME", "documents")
+    CHROMA_MEMORY_LIMIT_BYTES: int = int(os.getenv("CHROMA_MEMORY_LIMIT_BYTES", "0"))  # 0 = unlimited
+    VECTOR_STORE_SHARDS: int = int(os.getenv("VECTOR_STORE_SHARDS", "1"))  # >1 runs one process per shard
+    CHUNK_STORE_ENABLED: bool = os.getenv("CHUNK_STORE_ENABLED", "true").lower() == "true"
+    CHUNK_STORE_COMPRESSION_LEVEL: int = int(os.getenv("CHUNK_STORE_COMPRESSION_LEVEL", "6"))  # zlib 1-9
+    CHUNK_STORE_CACHE_DOCUMENTS: int = int(os.getenv("CHUNK_STORE_CACHE_DOCUMENTS", "32"))  # decompressed texts kept
+    RETRIEVAL_MODE: str = os.getenv("RETRIEVAL_MODE", "flat")  # flat | two_level
+    DOC_PRUNING_TOP_M: int = int(os.getenv("DOC_PRUNING_TOP_M", "20"))  # documents searched per query in two_level mode
+    # Unset or empty = maintained only when RETRIEVAL_MODE is two_level, the only reader of the index
+    DOCUMENT_INDEX_ENABLED: bool = (os.getenv("DOCUMENT_INDEX_ENABLED") or str(RETRIEVAL_MODE == "two_level")).lower() == "true"
+    NEAR_DUP_MODE: str = os.getenv("NEAR_DUP_MODE", "off")  # off | skip | link
+    NEAR_DUP_THRESHOLD: float = float(os.getenv("NEAR_DUP_THRESHOLD", "0.85"))  # estimated Jaccard similarity of shingles
+    NEAR_DUP_SHINGLE_SIZE: int = int(os.getenv("NEAR_DUP_SHINGLE_SIZE", "5"))  # words per shingle
+    NEAR_DUP_MIN_SHINGLES: int = int(os.getenv("NEAR_DUP_MIN_SHINGLES", "10"))  # shorter chunks are always kept
+    NEAR_DUP_NUM_PERM: int = int(os.getenv("NEAR_DUP_NUM_PERM", "128"))  # MinHash signature length
+    NEAR_DUP_BANDS: int = int(os.getenv("NEAR_DUP_BANDS", "16"))  # LSH bands, must divide NEAR_DUP_NUM_PERM
+    PROJECTION_SAMPLE_SIZE: int = int(os.getenv("PROJECTION_SAMPLE_SIZE", "10000"))  # embeddings used to fit a projection
+    REINDEX_BATCH_SIZE: int = int(os.getenv("REINDEX_BATCH_SIZE", "256"))  # chunks re-embedded per batch
+    REINDEX_MAX_CHUNKS_PER_SEC: float = float(os.getenv("REINDEX_MAX_CHUNKS_PER_SEC", "200"))  # 0 = unlimited
+    REINDEX_KEEP_PREVIOUS: bool = os.getenv("REINDEX_KEEP_PREVIOUS", "true").lower() == "true"  # keep the replaced version as retired
+    
+    # Write-behind group commit of vector store inserts
+    WRITE_BUFFER_ENABLED: bool = os.getenv("WRITE_BUFFER_ENABLED", "false").lower() == "true"
+    WRITE_BUFFER_MAX_CHUNKS: int = int(os.getenv("WRITE_BUFFER_MAX_CHUNKS", "2048"))  # chunks that trigger a commit
+    WRITE_BUFFER_MAX_DELAY_MS: int = int(os.getenv("WRITE_BUFFER_MAX_DELAY_MS", "50"))  # longest a chunk waits
+    WRITE_BUFFER_DURABILITY: str = os.getenv("WRITE_BUFFER_DURABILITY", "flush")  # flush | buffer
+    
+    # Namespaces (one collection per tenant)
+    DEFAULT_NAMESPACE: str = os.getenv("DEFAULT_NAMESPACE", "default")
+    MAX_OPEN_COLLECTIONS: int = int(os.getenv("MAX_OPEN_COLLECTIONS", "32"))
+    COLLECTION_IDLE_TIMEOUT: int = int(os.getenv("COLLECTION_IDLE_TIMEOUT", "600"))  # seconds
+    
+    # Extractive answers (skip the LLM when retrieval is decisive)
+    EXTRACTIVE_ANSWERS_ENABLED: bool = os.getenv("EXTRACTIVE_ANSWERS_ENABLED", "false").lower() == "true"
+    EXTRACTIVE_MIN_SCORE: float = float(os.getenv("EXTRACTIVE_MIN_SCORE", "0.75"))  # top retrieval score
+    EXTRACTIVE_MIN_MARGIN: float = float(os.getenv("EXTRACTIVE_MIN_MARGIN", "0.05"))  # lead of the top result over the next
+    EXTRACTIVE_MIN_SENTENCE_SCORE: float = float(os.getenv("EXTRACTIVE_MIN_SENTENCE_SCORE", "0.6"))  # question-sentence similarity
+    EXTRACTIVE_TOP_CHUNKS: int = int(os.getenv("EXTRACTIVE_TOP_CHUNKS", "2"))  # chunks whose sentences are considered
+    EXTRACTIVE_MAX_SENTENCES: int = int(os.getenv("EXTRACTIVE_MAX_SENTENCES", "2"))  # longest answer span
+    
+    # Batch Question Answering
+    BATCH_MAX_QUESTIONS: int = int(os.getenv("BATCH_MAX_QUESTIONS", "1000"))
+    BATCH_MAX_CONCURRENCY: int = int(os.getenv("BATCH_MAX_CONCURRENCY", "4"))
+    
+    # Coalesce identical concurrent /ask requests into one computation
+    ASK_COALESCING_ENABLED: bool = os.getenv("ASK_COALESCING_ENABLED", "true").lower() == "true"
+    
+    # CPU budgets (0 = derived from CPU_BUDGET, which defaults to all cores)
+    CPU_BUDGET: int = int(os.getenv("CPU_BUDGET", "0"))
+    LLM_THREADS: int = int(os.getenv("LLM_THREADS", "0"))
+    QUERY_EMBED_THREADS: int = int(os.getenv("QUERY_EMBED_THREADS", "0"))
+    INGEST_EMBED_THREADS: int = int(os.getenv("INGEST_EMBED_THREADS", "0"))
+    EXTRACTION_WORKERS: int = int(os.getenv("EXTRACTION_WORKERS", "1"))
+    PDF_PAGE_WORKERS: int = int(os.getenv("PDF_PAGE_WORKERS", "0"))  # processes extracting the pages of one PDF
+    PDF_PARALLEL_MIN_PAGES: int = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "100"))  # smaller PDFs are read in-process
+    INGEST_MAX_DEFER: float = float(os.getenv("INGEST_MAX_DEFER", "30"))  # seconds ingestion waits for questions
+    
+    # Model residency (0 = never unload)
+    LLM_IDLE_UNLOAD_SECONDS: float = float(os.getenv("LLM_IDLE_UNLOAD_SECONDS", "0"))
+    EMBEDDING_IDLE_UNLOAD_SECONDS: float = float(os.getenv("EMBEDDING_IDLE_UNLOAD_SECONDS", "0"))
+    MEMORY_LOW_WATERMARK_MB: int = int(os.getenv("MEMORY_LOW_WATERMARK_MB", "0"))  # unload idle models below this MemAvailable
+    RESIDENCY_CHECK_INTERVAL: float = float(os.getenv("RESIDENCY_CHECK_INTERVAL", "10"))  # seconds
     
     # Document Processing
     CHUNK_SIZE: int = int(os.getenv("CHUNK_SIZE", "500"))
@@ -34,6 +114,12 @@ class Settings:
     # File Upload
     UPLOAD_DIR: str = os.getenv("UPLOAD_DIR", "./uploads")
     MAX_FILE_SIZE: int = int(os.getenv("MAX_FILE_SIZE", "10485760"))  # 10MB
+    UPLOAD_CHUNK_SIZE: int = int(os.getenv("UPLOAD_CHUNK_SIZE", "1048576"))  # 1MB read size
+    UPLOAD_IN_MEMORY_MAX_SIZE: int = int(os.getenv("UPLOAD_IN_MEMORY_MAX_SIZE", "4194304"))  # 4MB parsed from memory
+    
+    # Profiling (per request, opt-in via X-Profile header or ?profile=true)
+    PROFILING_ENABLED: bool = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+    PROFILES_DIR: str = os.getenv("PROFILES_DIR", "./profiles")
     
     # Create directories if they don't exist
     @classmethod
@@ -0,0 +1,281 @@
+"""
+Near-duplicate chunk detection at ingest time.
+
+Every chunk gets a MinHash signature over its word shingles. Signatures are
+split into bands and stored in SQLite next to the vector store, so chunks
+sharing any band are candidates. A candidate counts as a duplicate when the
+share of equal signature values (an estimate of the Jaccard similarity of the
+two shingle sets) reaches NEAR_DUP_THRESHOLD.
+
+NEAR_DUP_MODE decides what happens to a duplicate:
+
+    off   every chunk is embedded and stored
+    skip  the chunk is dropped
+    link  the chunk is not embedded or stored in the vector index; it is
+          recorded against its canonical chunk, which then lists the
+          duplicate's document in search results. If the canonical chunk's
+          document is deleted, its linked duplicates are indexed in its place.
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from app.config import settings
+
+SUPPORTED_MODES = ("off", "skip", "link")
+
+# Hash family h(x) = (a * x + b) mod p over 32-bit shingle hashes; every product fits in uint64
+_PRIME = np.uint64(4294967311)
+_MAX_HASH = np.uint64(0xFFFFFFFF)
+_WORD_PATTERN = re.compile(r"\w+")
+
+def shingles(text: str, size: int) -> List[str]:
+    """Overlapping word shingles of a text, lowercased."""
+    words = _WORD_PATTERN.findall(text.lower())
+    if len(words) <= size:
+        return [" ".join(words)] if words else []
+    return [" ".join(words[i:i + size]) for i in range(len(words) - size + 1)]
+
+class MinHasher:
+    """MinHash signatures of num_perm values, banded for LSH lookups."""
+    
+    def __init__(self, num_perm: int, bands: int, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError(f"NEAR_DUP_NUM_PERM ({num_perm}) must be a multiple of NEAR_DUP_BANDS ({bands})")
+        rng = np.random.default_rng(seed)
+        self.a = rng.integers(1, int(_MAX_HASH), size=num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, int(_MAX_HASH), size=num_perm, dtype=np.uint64)
+        self.bands = bands
+        self.rows = num_perm // bands
+    
+    def signature(self, shingle_set: List[str]) -> np.ndarray:
+        hashes = np.fromiter(
+            (zlib.crc32(shingle.encode("utf-8")) for shingle in set(shingle_set)),
+            dtype=np.uint64
+        )
+        permuted = (np.outer(self.a, hashes) + self.b[:, None]) % _PRIME & _MAX_HASH
+        return permuted.min(axis=1).astype(np.uint32)
+    
+    def band_keys(self, signature: np.ndarray) -> List[int]:
+        """One bucket key per band; signatures agreeing on a whole band share its key."""
+        return [
+            int.from_bytes(
+                hashlib.blake2b(signature[band * self.rows:(band + 1) * self.rows].tobytes(), digest_size=8).digest(),
+                "big",
+                signed=True
+            )
+            for band in range(self.bands)
+        ]
+
+def similarity(first: np.ndarray, second: np.ndarray) -> float:
+    """Estimated Jaccard similarity of two signatures."""
+    return float(np.mean(first == second))
+
+class NearDuplicateIndex:
+    """Persistent MinHash/LSH index of the chunks in the vector store."""
+    
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.path.join(settings.CHROMA_PERSIST_DIRECTORY, "near_duplicates.sqlite3")
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self.hasher = MinHasher(settings.NEAR_DUP_NUM_PERM, settings.NEAR_DUP_BANDS)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(self.path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS signatures (
+                namespace TEXT NOT NULL,
+                chunk_id TEXT NOT NULL,
+                filename TEXT NOT NULL,
+                signature BLOB NOT NULL,
+                PRIMARY KEY (namespace, chunk_id)
+            );
+            CREATE INDEX IF NOT EXISTS signatures_by_file ON signatures (namespace, filename);
+            CREATE TABLE IF NOT EXISTS buckets (
+                namespace TEXT NOT NULL,
+                band INTEGER NOT NULL,
+                bucket INTEGER NOT NULL,
+                chunk_id TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS buckets_by_key ON buckets (namespace, band, bucket);
+            CREATE INDEX IF NOT EXISTS buckets_by_chunk ON buckets (namespace, chunk_id);
+            CREATE TABLE IF NOT EXISTS links (
+                namespace TEXT NOT NULL,
+                chunk_id TEXT NOT NULL,
+                filename TEXT NOT NULL,
+                canonical_id TEXT NOT NULL,
+                text TEXT NOT NULL,
+                metadata TEXT NOT NULL,
+                PRIMARY KEY (namespace, chunk_id)
+            );
+            CREATE INDEX IF NOT EXISTS links_by_canonical ON links (namespace, canonical_id);
+            CREATE INDEX IF NOT EXISTS links_by_file ON links (namespace, filename);
+            """
+        )
+        self._connection.commit()
+    
+    def _find_canonical(self, namespace: str, chunk_id: str, signature: np.ndarray, keys: List[int]) -> Optional[str]:
+        """Closest other stored chunk at or above the threshold, or None."""
+        candidates = set()
+        for band, key in enumerate(keys):
+            rows = self._connection.execute(
+                "SELECT chunk_id FROM buckets WHERE namespace = ? AND band = ? AND bucket = ?",
+                (namespace, band, key)
+            ).fetchall()
+            candidates.update(row[0] for row in rows)
+        # A re-uploaded chunk is not a duplicate of its own previous version
+        candidates.discard(chunk_id)
+        
+        best_id, best_score = None, settings.NEAR_DUP_THRESHOLD
+        for candidate in sorted(candidates):
+            row = self._connection.execute(
+                "SELECT signature FROM signatures WHERE namespace = ? AND chunk_id = ?",
+                (namespace, candidate)
+            ).fetchone()
+            score = similarity(signature, np.frombuffer(row[0], dtype=np.uint32))
+            if score >= best_score:
+                best_id, best_score = candidate, score
+        return best_id
+    
+    def plan(
+        self,
+        namespace: str,
+        ids: List[str],
+        texts: List[str],
+        metadatas: List[Dict[str, Any]]
+    ) -> Tuple[Dict[int, str], Dict[int, Any]]:
+        """Split a batch of chunks into new ones and near-duplicates.
+        
+        Returns (duplicates, signatures): duplicates maps the position of each
+        near-duplicate to its canonical chunk id, which may be an earlier chunk
+        of the same batch; signatures holds the signature of every other chunk
+        long enough to be indexed. Those signatures are stored before the lock
+        is released, so of two identical uploads running at the same time only
+        one is indexed; call discard() if the chunks end up not being stored.
+        """
+        duplicates = {}
+        signatures = {}
+        pending = {}  # (band, key) -> positions of this batch's new chunks
+        with self._lock:
+            for i, (chunk_id, text) in enumerate(zip(ids, texts)):
+                shingle_set = shingles(text, settings.NEAR_DUP_SHINGLE_SIZE)
+                if len(shingle_set) < settings.NEAR_DUP_MIN_SHINGLES:
+                    continue
+                
+                signature = self.hasher.signature(shingle_set)
+                keys = self.hasher.band_keys(signature)
+                canonical = self._find_canonical(namespace, chunk_id, signature, keys)
+                if canonical is None:
+                    for earlier in sorted({
+                        j for band, key in enumerate(keys) for j in pending.get((band, key), [])
+                    }):
+                        if similarity(signature, signatures[earlier][0]) >= settings.NEAR_DUP_THRESHOLD:
+                            canonical = ids[earlier]
+                            break
+                
+                if canonical is not None:
+                    duplicates[i] = canonical
+                    continue
+                
+                signatures[i] = (signature, keys)
+                for band, key in enumerate(keys):
+                    pending.setdefault((band, key), []).append(i)
+            
+            for i, (signature, keys) in signatures.items():
+                self._connection.execute(
+                    "INSERT OR REPLACE INTO signatures VALUES (?, ?, ?, ?)",
+                    (namespace, ids[i], metadatas[i]["filename"], signature.tobytes())
+                )
+                self._connection.execute("DELETE FROM buckets WHERE namespace = ? AND chunk_id = ?", (namespace, ids[i]))
+                self._connection.executemany(
+                    "INSERT INTO buckets VALUES (?, ?, ?, ?)",
+                    [(namespace, band, key, ids[i]) for band, key in enumerate(keys)]
+                )
+            self._connection.commit()
+        return duplicates, signatures
+    
+    def record_links(
+        self,
+        namespace: str,
+        ids: List[str],
+        texts: List[str],
+        metadatas: List[Dict[str, Any]],
+        duplicates: Dict[int, str]
+    ) -> None:
+        """In link mode, store the duplicates of a batch against their canonical chunks."""
+        if settings.NEAR_DUP_MODE != "link" or not duplicates:
+            return
+        with self._lock:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO links VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (namespace, ids[i], metadatas[i]["filename"], canonical, texts[i], json.dumps(metadatas[i]))
+                    for i, canonical in duplicates.items()
+                ]
+            )
+            self._connection.commit()
+    
+    def discard(self, namespace: str, ids: List[str]) -> None:
+        """Forget the signatures and links of chunks that were planned but not stored."""
+        with self._lock:
+            for table in ("signatures", "buckets", "links"):
+                self._connection.executemany(
+                    f"DELETE FROM {table} WHERE namespace = ? AND chunk_id = ?",
+                    [(namespace, chunk_id) for chunk_id in ids]
+                )
+            self._connection.commit()
+    
+    def linked_filenames(self, namespace: str, chunk_ids: List[str]) -> Dict[str, List[str]]:
+        """Documents whose chunks were linked to each of some canonical chunks."""
+        linked = {}
+        with self._lock:
+            for chunk_id in chunk_ids:
+                rows = self._connection.execute(
+                    "SELECT DISTINCT filename FROM links WHERE namespace = ? AND canonical_id = ? ORDER BY filename",
+                    (namespace, chunk_id)
+                ).fetchall()
+                if rows:
+                    linked[chunk_id] = [row[0] for row in rows]
+        return linked
+    
+    def delete(self, namespace: str, filename: str) -> List[Dict[str, Any]]:
+        """Forget a document's signatures and links.
+        
+        Returns the chunks of other documents that were linked to this one's
+        chunks, as {"text", "metadata"} dicts, so they can be indexed again.
+        """
+        with self._lock:
+            orphans = self._connection.execute(
+                "SELECT text, metadata FROM links WHERE namespace = ? AND filename != ? AND canonical_id IN "
+                "(SELECT chunk_id FROM signatures WHERE namespace = ? AND filename = ?)",
+                (namespace, filename, namespace, filename)
+            ).fetchall()
+            self._connection.execute(
+                "DELETE FROM links WHERE namespace = ? AND (filename = ? OR canonical_id IN "
+                "(SELECT chunk_id FROM signatures WHERE namespace = ? AND filename = ?))",
+                (namespace, filename, namespace, filename)
+            )
+            self._connection.execute(
+                "DELETE FROM buckets WHERE namespace = ? AND chunk_id IN "
+                "(SELECT chunk_id FROM signatures WHERE namespace = ? AND filename = ?)",
+                (namespace, namespace, filename)
+            )
+            self._connection.execute("DELETE FROM signatures WHERE namespace = ? AND filename = ?", (namespace, filename))
+            self._connection.commit()
+        return [{"text": text, "metadata": json.loads(metadata)} for text, metadata in orphans]
+    
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            signatures = self._connection.execute("SELECT COUNT(*) FROM signatures").fetchone()[0]
+            links = self._connection.execute("SELECT COUNT(*) FROM links").fetchone()[0]
+        return {"mode": settings.NEAR_DUP_MODE, "signatures": signatures, "linked_chunks": links}
+    
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
\ No newline at end of file
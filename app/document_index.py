@@ -0,0 +1,58 @@
+"""
+Document-level index for two-level retrieval.
+
+Next to each namespace's chunk collection the vector store keeps a small
+collection with one vector per document: the normalized centroid of its
+chunk embeddings, plus the document-level metadata filters work on. With
+RETRIEVAL_MODE=two_level a search first picks the DOC_PRUNING_TOP_M closest
+documents there and then searches only their chunks.
+
+The index is maintained on upload and delete while DOCUMENT_INDEX_ENABLED
+is on, which by default it only is with RETRIEVAL_MODE=two_level. Namespaces
+indexed before it existed (or while it was off) can be backfilled with:
+
+    python -m app.document_index rebuild [--namespace NS]
+"""
+
+import argparse
+from typing import Any, Dict, List
+import numpy as np
+
+# Chunk metadata keys that describe the whole document and are copied to its index entry
+DOCUMENT_METADATA_KEYS = ("filename", "file_type", "upload_timestamp", "content_hash", "tags")
+
+def centroid(embeddings: List[List[float]]) -> List[float]:
+    """Normalized mean of a document's chunk embeddings."""
+    mean = np.asarray(embeddings, dtype=np.float32).mean(axis=0)
+    return (mean / max(float(np.linalg.norm(mean)), 1e-12)).tolist()
+
+def document_metadata(chunk_metadata: Dict[str, Any], chunk_count: int) -> Dict[str, Any]:
+    """Metadata of a document's index entry, taken from one of its chunks."""
+    metadata = {
+        key: value for key, value in chunk_metadata.items()
+        if key in DOCUMENT_METADATA_KEYS or key.startswith("tag_")
+    }
+    metadata["chunk_count"] = chunk_count
+    return metadata
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain the document-level index used by two-level retrieval")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    
+    rebuild_parser = subparsers.add_parser("rebuild", help="Recompute every document vector of a namespace")
+    rebuild_parser.add_argument("--namespace", default=None)
+    
+    args = parser.parse_args()
+    
+    from app.vector_store import create_vector_store
+    
+    # Centroids come from stored chunk vectors, so no embedding model is loaded
+    vector_store = create_vector_store(embedding_service=None)
+    try:
+        count = vector_store.rebuild_document_index(namespace=args.namespace)
+        print(f"Indexed {count} documents")
+    finally:
+        vector_store.close()
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -1,15 +1,53 @@
 import os
+import bisect
+import multiprocessing
+import tempfile
+import threading
 import fitz  # PyMuPDF
-from docx import Document
 import tiktoken
-from typing import List, Dict, Any
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Dict, Any, Optional, Tuple, Union
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from app.config import settings
+from app.profiling import stage
+from app.docx_stream import iter_docx_blocks
+from app.resource_manager import resource_manager
+
+def _open_pdf(source: Union[str, bytes]):
+    if isinstance(source, bytes):
+        return fitz.open(stream=source, filetype="pdf")
+    return fitz.open(source)
+
+def _extract_page_range(job: Tuple[Union[str, bytes], int, int]) -> List[str]:
+    """Text of pages [start, stop) of a PDF; runs in a page worker process with its own handle on the file."""
+    source, start, stop = job
+    doc = _open_pdf(source)
+    try:
+        return [doc[number].get_text() for number in range(start, stop)]
+    finally:
+        doc.close()
+
+def page_ranges(page_count: int, parts: int) -> List[Tuple[int, int]]:
+    """Split pages into at most parts contiguous ranges of near-equal size."""
+    parts = max(1, min(parts, page_count))
+    bounds = [page_count * i // parts for i in range(parts + 1)]
+    return [(bounds[i], bounds[i + 1]) for i in range(parts) if bounds[i] < bounds[i + 1]]
 
 class DocumentProcessor:
-    """Handles document processing and text chunking."""
+    """Handles document processing and text chunking.
     
-    def __init__(self):
+    PDFs of at least PDF_PARALLEL_MIN_PAGES pages are split into page ranges
+    read by a pool of page_workers processes (PDF_PAGE_WORKERS by default),
+    since PyMuPDF holds the GIL while it extracts. In-memory PDFs are written
+    to a temporary file in UPLOAD_DIR first, so every range opens the file
+    instead of receiving a copy of the bytes.
+    """
+    
+    def __init__(self, page_workers: Optional[int] = None):
+        self.page_workers = page_workers or resource_manager.pdf_page_workers
+        self._page_pool = None
+        self._page_pool_lock = threading.Lock()
         self.text_splitter = RecursiveCharacterTextSplitter(
             chunk_size=settings.CHUNK_SIZE,
             chunk_overlap=settings.CHUNK_OVERLAP,
@@ -22,52 +60,119 @@ class DocumentProcessor:
         """Count tokens in text using tiktoken."""
         return len(self.tokenizer.encode(text))
     
-    def extract_text_from_pdf(self, file_path: str) -> str:
-        """Extract text from PDF file using PyMuPDF."""
+    def extract_pages_from_pdf(self, source: Union[str, bytes]) -> List[str]:
+        """Extract the text of each page from a PDF file path or in-memory bytes using PyMuPDF."""
         try:
-            doc = fitz.open(file_path)
-            text = ""
-            for page in doc:
-                text += page.get_text()
+            doc = _open_pdf(source)
+            if self.page_workers > 1 and doc.page_count >= max(settings.PDF_PARALLEL_MIN_PAGES, 2):
+                page_count = doc.page_count
+                doc.close()
+                return self._extract_pages_parallel(source, page_count)
+            pages = [page.get_text() for page in doc]
             doc.close()
-            return text
+            return pages
         except Exception as e:
             raise Exception(f"Error extracting text from PDF: {str(e)}")
     
-    def extract_text_from_docx(self, file_path: str) -> str:
-        """Extract text from DOCX file."""
+    def _get_page_pool(self) -> ProcessPoolExecutor:
+        """The page worker pool, started on first use."""
+        with self._page_pool_lock:
+            if self._page_pool is None:
+                # Spawned rather than forked, since the API process has already loaded torch
+                self._page_pool = ProcessPoolExecutor(
+                    max_workers=self.page_workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._page_pool
+    
+    def _discard_page_pool(self, pool: ProcessPoolExecutor) -> None:
+        """Drop a broken pool so the next PDF starts a new one."""
+        with self._page_pool_lock:
+            if self._page_pool is pool:
+                self._page_pool = None
+        pool.shutdown(wait=False, cancel_futures=True)
+    
+    def _extract_pages_parallel(self, source: Union[str, bytes], page_count: int) -> List[str]:
+        """Read page ranges in the page worker pool and put the pages back in order."""
+        path = source
+        if isinstance(source, bytes):
+            os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
+            with tempfile.NamedTemporaryFile(dir=settings.UPLOAD_DIR, prefix="pages-", suffix=".pdf", delete=False) as temp_file:
+                temp_file.write(source)
+            path = temp_file.name
         try:
-            doc = Document(file_path)
-            text = ""
-            for paragraph in doc.paragraphs:
-                text += paragraph.text + "\n"
-            return text
+            # Two ranges per worker even out pages that take longer than others
+            jobs = [(path, start, stop) for start, stop in page_ranges(page_count, self.page_workers * 2)]
+            for attempt in range(2):
+                pool = self._get_page_pool()
+                try:
+                    pages = []
+                    for range_pages in pool.map(_extract_page_range, jobs):
+                        pages.extend(range_pages)
+                    return pages
+                except BrokenProcessPool:
+                    # A worker died, e.g. killed for its memory; retry once in a new pool
+                    self._discard_page_pool(pool)
+                    if attempt == 1:
+                        raise
+        finally:
+            if path is not source:
+                os.remove(path)
+    
+    def close(self) -> None:
+        """Stop the page worker pool, if one was started."""
+        with self._page_pool_lock:
+            pool, self._page_pool = self._page_pool, None
+        if pool is not None:
+            pool.shutdown()
+    
+    def extract_text_from_pdf(self, source: Union[str, bytes]) -> str:
+        """Extract text from a PDF file path or in-memory bytes using PyMuPDF."""
+        return "".join(self.extract_pages_from_pdf(source))
+    
+    def extract_text_from_docx(self, source: Union[str, bytes]) -> str:
+        """Extract text from a DOCX file path or in-memory bytes.
+        
+        Paragraphs, table rows, headers and footers are streamed in document
+        order (see app.docx_stream).
+        """
+        try:
+            return "\n".join(iter_docx_blocks(source)) + "\n"
         except Exception as e:
             raise Exception(f"Error extracting text from DOCX: {str(e)}")
     
-    def extract_text_from_txt(self, file_path: str) -> str:
-        """Extract text from TXT file."""
+    def extract_text_from_txt(self, source: Union[str, bytes]) -> str:
+        """Extract text from a TXT file path or in-memory bytes."""
         try:
-            with open(file_path, 'r', encoding='utf-8') as file:
+            if isinstance(source, bytes):
+                return source.decode('utf-8')
+            with open(source, 'r', encoding='utf-8') as file:
                 return file.read()
         except Exception as e:
             raise Exception(f"Error extracting text from TXT: {str(e)}")
     
-    def extract_text(self, file_path: str) -> str:
-        """Extract text from file based on its extension."""
-        file_extension = os.path.splitext(file_path)[1].lower()
+    def extract_text(self, source: Union[str, bytes], filename: Optional[str] = None) -> str:
+        """Extract text from a file path or in-memory bytes based on the file extension.
+        
+        The extension is taken from filename when given, otherwise from the path.
+        """
+        file_extension = os.path.splitext(filename or source)[1].lower()
         
         if file_extension == '.pdf':
-            return self.extract_text_from_pdf(file_path)
+            return self.extract_text_from_pdf(source)
         elif file_extension == '.docx':
-            return self.extract_text_from_docx(file_path)
+            return self.extract_text_from_docx(source)
         elif file_extension == '.txt':
-            return self.extract_text_from_txt(file_path)
+            return self.extract_text_from_txt(source)
         else:
             raise ValueError(f"Unsupported file type: {file_extension}")
     
-    def chunk_text(self, text: str, filename: str) -> List[Dict[str, Any]]:
-        """Split text into chunks and return with metadata."""
+    def chunk_text(self, text: str, filename: str, page_starts: Optional[List[int]] = None) -> List[Dict[str, Any]]:
+        """Split text into chunks and return with metadata.
+        
+        Each chunk records where it lies in text (char_offset, char_length) and,
+        when page_starts gives the offset of each page, its 1-based page.
+        """
         if not text.strip():
             raise ValueError("Empty text content")
         
@@ -76,29 +181,61 @@ class DocumentProcessor:
         
         # Create chunk documents with metadata
         chunk_docs = []
+        search_from = 0
         for i, chunk in enumerate(chunks):
-            chunk_doc = {
-                "text": chunk,
-                "metadata": {
-                    "filename": filename,
-                    "chunk_id": i,
-                    "chunk_index": i,
-                    "source": filename,
-                    "chunk_size": self._count_tokens(chunk)
-                }
+            metadata = {
+                "filename": filename,
+                "chunk_id": i,
+                "chunk_index": i,
+                "source": filename,
+                "chunk_size": self._count_tokens(chunk)
             }
-            chunk_docs.append(chunk_doc)
+            
+            # Chunks come out in order and are exact substrings of the text
+            offset = text.find(chunk, search_from)
+            if offset < 0:
+                offset = text.find(chunk)
+            if offset >= 0:
+                metadata["char_offset"] = offset
+                metadata["char_length"] = len(chunk)
+                search_from = offset + 1
+                if page_starts:
+                    metadata["page"] = bisect.bisect_right(page_starts, offset)
+            
+            chunk_docs.append({"text": chunk, "metadata": metadata})
         
         return chunk_docs
     
-    def process_document(self, file_path: str) -> List[Dict[str, Any]]:
-        """Process a document and return chunked text with metadata."""
-        filename = os.path.basename(file_path)
+    def process_source(self, source: Union[str, bytes], filename: str) -> Dict[str, Any]:
+        """Extract and chunk a file path or in-memory document.
         
+        Returns the extracted "text" together with its "chunks".
+        """
         # Extract text from document
-        text = self.extract_text(file_path)
+        with stage("extraction"):
+            if os.path.splitext(filename)[1].lower() == '.pdf':
+                pages = self.extract_pages_from_pdf(source)
+                page_starts = []
+                position = 0
+                for page in pages:
+                    page_starts.append(position)
+                    position += len(page)
+                text = "".join(pages)
+            else:
+                text = self.extract_text(source, filename)
+                page_starts = None
         
         # Chunk the text
-        chunks = self.chunk_text(text, filename)
+        with stage("chunking"):
+            chunks = self.chunk_text(text, filename, page_starts)
         
-        return chunks 
\ No newline at end of file
+        return {"text": text, "chunks": chunks}
+    
+    def process_document(self, file_path: str, filename: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Process a document and return chunked text with metadata."""
+        filename = filename or os.path.basename(file_path)
+        return self.process_source(file_path, filename)["chunks"]
+    
+    def process_bytes(self, data: bytes, filename: str) -> List[Dict[str, Any]]:
+        """Process an in-memory document and return chunked text with metadata."""
+        return self.process_source(data, filename)["chunks"] 
\ No newline at end of file
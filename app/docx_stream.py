@@ -0,0 +1,132 @@
+"""
+Streaming text extraction for DOCX files.
+
+A DOCX file is a zip archive; the body lives in word/document.xml and page
+headers and footers in word/header*.xml and word/footer*.xml. Instead of
+building python-docx's object model for the whole document, the parts are
+read with iterparse and discarded element by element, so memory stays flat
+no matter how long the document is.
+
+iter_docx_blocks yields one string per block in document order: headers,
+then the body, then footers. A block is a paragraph or a table row; the
+cells of a row are joined with " | ".
+"""
+
+import io
+import re
+import zipfile
+from typing import Iterator, List, Union
+from xml.etree.ElementTree import iterparse
+
+W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+MC_FALLBACK = "{http://schemas.openxmlformats.org/markup-compatibility/2006}Fallback"
+
+PARAGRAPH = W + "p"
+TEXT = W + "t"
+TAB = W + "tab"
+BREAKS = (W + "br", W + "cr")
+TABLE = W + "tbl"
+ROW = W + "tr"
+CELL = W + "tc"
+PART_ROOTS = (W + "body", W + "hdr", W + "ftr")
+
+CELL_SEPARATOR = " | "
+
+_HEADER_PART = re.compile(r"^word/header\d*\.xml$")
+_FOOTER_PART = re.compile(r"^word/footer\d*\.xml$")
+
+def _part_number(name: str) -> int:
+    digits = re.sub(r"\D", "", name)
+    return int(digits) if digits else 0
+
+def iter_part_blocks(stream) -> Iterator[str]:
+    """Yield the paragraphs and table rows of one WordprocessingML part."""
+    part_root = None
+    paragraphs: List[List[str]] = []  # text runs of the open paragraphs (text boxes nest them)
+    tables: List[List[List[str]]] = []  # for each open table, the cells of its current row
+    cells: List[List[str]] = []  # paragraphs of the open cells
+    fallback_depth = 0
+    
+    for event, elem in iterparse(stream, events=("start", "end")):
+        tag = elem.tag
+        
+        if event == "start":
+            if tag == PARAGRAPH:
+                paragraphs.append([])
+            elif tag == CELL:
+                cells.append([])
+            elif tag == ROW and tables:
+                tables[-1] = []
+            elif tag == TABLE:
+                tables.append([])
+            elif tag == MC_FALLBACK:
+                # Text boxes repeat their content in a legacy fallback; read it once
+                fallback_depth += 1
+            elif tag in PART_ROOTS and part_root is None:
+                part_root = elem
+            continue
+        
+        if tag == MC_FALLBACK:
+            fallback_depth -= 1
+        elif fallback_depth:
+            pass
+        elif tag == TEXT:
+            if paragraphs and elem.text:
+                paragraphs[-1].append(elem.text)
+        elif tag == TAB:
+            if paragraphs:
+                paragraphs[-1].append("\t")
+        elif tag in BREAKS:
+            if paragraphs:
+                paragraphs[-1].append("\n")
+        elif tag == PARAGRAPH:
+            text = "".join(paragraphs.pop())
+            if cells:
+                cells[-1].append(text)
+            else:
+                yield text
+        elif tag == CELL:
+            cell_text = " ".join(paragraph for paragraph in cells.pop() if paragraph)
+            if tables:
+                tables[-1].append(cell_text)
+        elif tag == ROW and tables:
+            row_text = CELL_SEPARATOR.join(tables[-1])
+            if len(tables) > 1 and cells:
+                # A nested table's rows become lines of the enclosing cell
+                cells[-1].append(row_text)
+            elif row_text.strip(" |"):
+                yield row_text
+        elif tag == TABLE:
+            tables.pop()
+        
+        # Drop finished top-level blocks so the parsed tree never grows
+        if tag in (PARAGRAPH, TABLE) and part_root is not None and not paragraphs and not tables:
+            part_root.clear()
+
+def iter_docx_blocks(source: Union[str, bytes]) -> Iterator[str]:
+    """Yield the blocks of a DOCX file path or in-memory bytes in document order.
+    
+    Header and footer parts shared by several sections usually repeat the
+    same text, so identical parts are emitted once.
+    """
+    with zipfile.ZipFile(io.BytesIO(source) if isinstance(source, bytes) else source) as archive:
+        names = archive.namelist()
+        if "word/document.xml" not in names:
+            raise ValueError("Not a DOCX file: word/document.xml is missing")
+        
+        headers = sorted((name for name in names if _HEADER_PART.match(name)), key=_part_number)
+        footers = sorted((name for name in names if _FOOTER_PART.match(name)), key=_part_number)
+        
+        seen_parts = set()
+        for name in headers + ["word/document.xml"] + footers:
+            if name == "word/document.xml":
+                with archive.open(name) as stream:
+                    yield from iter_part_blocks(stream)
+                continue
+            
+            with archive.open(name) as stream:
+                blocks = [block for block in iter_part_blocks(stream) if block.strip()]
+            key = tuple(blocks)
+            if blocks and key not in seen_parts:
+                seen_parts.add(key)
+                yield from blocks
\ No newline at end of file
@@ -1,34 +1,61 @@
 import torch
 from sentence_transformers import SentenceTransformer
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 import numpy as np
 from app.config import settings
+from app.resource_manager import resource_manager
+from app.residency import residency_manager
 import os
 
 class EmbeddingService:
-    """Service for generating embeddings using SentenceTransformers."""
+    """Service for generating embeddings using SentenceTransformers.
     
-    def __init__(self):
-        self.model_name = settings.EMBEDDING_MODEL
+    With EMBEDDING_IDLE_UNLOAD_SECONDS set, the model is unloaded after that
+    long without use or when memory runs low, and reloaded on the next call.
+    
+    model_name defaults to EMBEDDING_MODEL; other models are loaded for
+    namespaces whose index was built with them.
+    """
+    
+    def __init__(self, model_name: Optional[str] = None):
+        self.model_name = model_name or settings.EMBEDDING_MODEL
         self.device = settings.EMBEDDING_DEVICE
         self.model = None
+        self._process_pool = None
+        self._process_pool_size = 0
         self._load_model()
+        self.residency = residency_manager.register(
+            "embedding" if self.model_name == settings.EMBEDDING_MODEL else f"embedding:{self.model_name}",
+            self._load_model,
+            self._unload_model,
+            idle_timeout=settings.EMBEDDING_IDLE_UNLOAD_SECONDS,
+            evict_under_pressure=settings.EMBEDDING_IDLE_UNLOAD_SECONDS > 0
+        )
     
     def _load_model(self):
         """Load the SentenceTransformer model."""
         try:
             print(f"Loading embedding model: {self.model_name}")
+            # Keep query embedding within its budget instead of torch's default of all cores;
+            # the limit is process-wide, so in-process ingest encodes within it too
+            torch.set_num_threads(resource_manager.query_embed_threads)
             self.model = SentenceTransformer(self.model_name, device=self.device)
             print("Embedding model loaded successfully")
             
         except Exception as e:
             raise Exception(f"Error loading embedding model: {str(e)}")
     
+    def _unload_model(self):
+        """Free the model and the encoding processes holding copies of it."""
+        self.close()
+        self.model = None
+    
     def generate_embeddings(self, texts: List[str]) -> List[List[float]]:
         """Generate embeddings for a list of texts."""
         try:
             # Generate embeddings using sentence-transformers
-            embeddings = self.model.encode(texts, convert_to_tensor=False)
+            with self.residency.acquire():
+                embeddings = self.model.encode(texts, convert_to_tensor=False)
             
             # Convert to list of lists
             embeddings_list = embeddings.tolist()
@@ -38,6 +65,111 @@ class EmbeddingService:
         except Exception as e:
             raise Exception(f"Error generating embeddings: {str(e)}")
     
+    def generate_embeddings_bulk(
+        self,
+        texts: List[str],
+        batch_size: Optional[int] = None,
+        num_workers: Optional[int] = None
+    ) -> List[List[float]]:
+        """Generate embeddings for a large list of texts.
+        
+        Texts are sorted by token length and encoded in batches of similar
+        length, so little compute is spent on padding. With more than one
+        worker the batches are spread over a pool of processes that each hold
+        a copy of the model. Embeddings are returned in the input order.
+        Between batches the work yields to questions being answered.
+        """
+        try:
+            if not texts:
+                return []
+            
+            with self.residency.acquire():
+                return self._generate_embeddings_bulk(texts, batch_size, num_workers)
+                
+        except Exception as e:
+            raise Exception(f"Error generating embeddings: {str(e)}")
+    
+    def _generate_embeddings_bulk(
+        self,
+        texts: List[str],
+        batch_size: Optional[int],
+        num_workers: Optional[int]
+    ) -> List[List[float]]:
+        """Encode texts in length-sorted batches; the caller holds the model loaded."""
+        batch_size = batch_size or settings.EMBEDDING_BULK_BATCH_SIZE
+        num_workers = settings.EMBEDDING_WORKERS if num_workers is None else num_workers
+        
+        # Bucket texts by length
+        lengths = self._token_lengths(texts)
+        order = np.argsort(lengths, kind="stable")
+        sorted_texts = [texts[i] for i in order]
+        
+        if num_workers > 1:
+            pool = self._get_process_pool(num_workers)
+            step = batch_size * 4 * num_workers
+        else:
+            step = batch_size
+        
+        batches = []
+        for start in range(0, len(sorted_texts), step):
+            resource_manager.yield_to_interactive()
+            if num_workers > 1:
+                batches.append(self.model.encode_multi_process(
+                    sorted_texts[start:start + step],
+                    pool,
+                    batch_size=batch_size,
+                    chunk_size=batch_size * 4
+                ))
+            else:
+                batches.append(self.model.encode(sorted_texts[start:start + step], batch_size=batch_size, convert_to_tensor=False))
+        sorted_embeddings = np.vstack(batches)
+        
+        # Restore the original order
+        embeddings = np.empty_like(sorted_embeddings)
+        embeddings[order] = sorted_embeddings
+        
+        return embeddings.tolist()
+    
+    def _token_lengths(self, texts: List[str]) -> List[int]:
+        """Get the token length of each text, falling back to character length."""
+        tokenizer = getattr(self.model, "tokenizer", None)
+        if tokenizer is None:
+            return [len(text) for text in texts]
+        encoded = tokenizer(
+            texts,
+            add_special_tokens=False,
+            truncation=True,
+            max_length=getattr(self.model, "max_seq_length", None) or 512
+        )
+        return [len(input_ids) for input_ids in encoded["input_ids"]]
+    
+    def _get_process_pool(self, num_workers: int):
+        """Start (or reuse) a pool of encoding processes, each holding the model."""
+        if self._process_pool is not None and self._process_pool_size == num_workers:
+            return self._process_pool
+        self.close()
+        
+        # Split the ingest budget between workers instead of letting each use all cores
+        threads_per_worker = str(resource_manager.threads_per_ingest_worker(num_workers))
+        previous = os.environ.get("OMP_NUM_THREADS")
+        os.environ["OMP_NUM_THREADS"] = threads_per_worker
+        try:
+            self._process_pool = self.model.start_multi_process_pool(target_devices=[self.device] * num_workers)
+        finally:
+            if previous is None:
+                os.environ.pop("OMP_NUM_THREADS", None)
+            else:
+                os.environ["OMP_NUM_THREADS"] = previous
+        self._process_pool_size = num_workers
+        return self._process_pool
+    
+    def close(self) -> None:
+        """Stop the bulk encoding process pool, if one was started."""
+        if self._process_pool is not None:
+            SentenceTransformer.stop_multi_process_pool(self._process_pool)
+            self._process_pool = None
+            self._process_pool_size = 0
+    
     def generate_single_embedding(self, text: str) -> List[float]:
         """Generate embedding for a single text."""
         embeddings = self.generate_embeddings([text])
@@ -45,6 +177,7 @@ class EmbeddingService:
     
     def get_embedding_dimension(self) -> int:
         """Get the dimension of the embeddings."""
-        if self.model is None:
-            raise Exception("Model not loaded")
-        return self.model.get_sentence_embedding_dimension() 
\ No newline at end of file
+        with self.residency.acquire():
+            if self.model is None:
+                raise Exception("Model not loaded")
+            return self.model.get_sentence_embedding_dimension()
\ No newline at end of file
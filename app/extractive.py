@@ -0,0 +1,107 @@
+"""
+Extractive answers for questions that retrieval answers on its own.
+
+When the best retrieved chunk scores at least EXTRACTIVE_MIN_SCORE and
+leads the runner-up by EXTRACTIVE_MIN_MARGIN, the sentences of the top
+EXTRACTIVE_TOP_CHUNKS chunks are embedded together with the question in one
+call and the closest sentence, extended by up to EXTRACTIVE_MAX_SENTENCES - 1
+neighbours that are also close, is returned verbatim instead of calling the
+LLM. Below EXTRACTIVE_MIN_SENTENCE_SCORE the question goes to the LLM.
+"""
+
+import re
+import threading
+from typing import Any, Callable, Dict, List, Optional
+import numpy as np
+from app.config import settings
+
+# A sentence ends at ., ! or ? followed by whitespace, or at a blank line
+_SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+|\n\s*\n")
+
+def split_sentences(text: str) -> List[str]:
+    """Sentences of a chunk, with their whitespace collapsed."""
+    sentences = (" ".join(sentence.split()) for sentence in _SENTENCE_BOUNDARY.split(text))
+    return [sentence for sentence in sentences if len(sentence) >= 3]
+
+def is_decisive(search_results: List[Dict[str, Any]]) -> bool:
+    """Whether the top result is both strong and clearly ahead of the next one."""
+    if not search_results:
+        return False
+    top = search_results[0]["score"]
+    runner_up = search_results[1]["score"] if len(search_results) > 1 else 0.0
+    return top >= settings.EXTRACTIVE_MIN_SCORE and top - runner_up >= settings.EXTRACTIVE_MIN_MARGIN
+
+class ExtractiveAnswerer:
+    """Picks answer sentences out of retrieved chunks and counts the LLM calls it saved."""
+    
+    def __init__(self, embed: Callable[[List[str], Optional[str]], List[List[float]]]):
+        self._embed = embed
+        self._lock = threading.Lock()
+        self.served = 0
+        self.declined = 0
+        self.extractive_seconds = 0.0
+        self.generated = 0
+        self.generation_seconds = 0.0
+        self.seconds_saved = 0.0
+    
+    def answer(self, question: str, search_results: List[Dict[str, Any]], namespace: Optional[str] = None) -> Optional[str]:
+        """The extracted answer, or None when the question should go to the LLM."""
+        if not is_decisive(search_results):
+            return None
+        
+        # The chunk of every sentence, so spans never cross chunk boundaries
+        sentences, chunk_of = [], []
+        for c, result in enumerate(search_results[:max(settings.EXTRACTIVE_TOP_CHUNKS, 1)]):
+            for sentence in split_sentences(result["text"]):
+                sentences.append(sentence)
+                chunk_of.append(c)
+        if not sentences:
+            return None
+        
+        vectors = np.asarray(self._embed([question] + sentences, namespace), dtype=np.float32)
+        vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        scores = vectors[1:] @ vectors[0]
+        best = int(np.argmax(scores))
+        if scores[best] < settings.EXTRACTIVE_MIN_SENTENCE_SCORE:
+            return None
+        
+        # Grow the span with whichever neighbour in the same chunk is closer, while it stays close enough
+        start = stop = best
+        while stop - start + 1 < settings.EXTRACTIVE_MAX_SENTENCES:
+            neighbours = [
+                i for i in (start - 1, stop + 1)
+                if 0 <= i < len(sentences) and chunk_of[i] == chunk_of[best]
+                and scores[i] >= settings.EXTRACTIVE_MIN_SENTENCE_SCORE
+            ]
+            if not neighbours:
+                break
+            nearest = max(neighbours, key=lambda i: scores[i])
+            start, stop = min(start, nearest), max(stop, nearest)
+        return " ".join(sentences[start:stop + 1])
+    
+    def record_extractive(self, seconds: float) -> None:
+        """Count an extractive answer; it saved the average generation time so far, less its own."""
+        with self._lock:
+            self.served += 1
+            self.extractive_seconds += seconds
+            if self.generated:
+                self.seconds_saved += max(self.generation_seconds / self.generated - seconds, 0.0)
+    
+    def record_generation(self, seconds: float, declined: bool) -> None:
+        """Count an LLM answer; declined when the fast path was tried first."""
+        with self._lock:
+            if declined:
+                self.declined += 1
+            self.generated += 1
+            self.generation_seconds += seconds
+    
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": settings.EXTRACTIVE_ANSWERS_ENABLED,
+                "served": self.served,
+                "declined": self.declined,
+                "avg_extractive_seconds": round(self.extractive_seconds / self.served, 4) if self.served else None,
+                "avg_generation_seconds": round(self.generation_seconds / self.generated, 3) if self.generated else None,
+                "seconds_saved": round(self.seconds_saved, 3)
+            }
\ No newline at end of file
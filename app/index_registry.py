@@ -0,0 +1,133 @@
+"""
+Registry of the embedding index versions of every namespace.
+
+Each namespace has exactly one active index version, the Chroma collection
+that serves its searches, together with the embedding model and dimension
+its vectors were computed with. Re-embedding a namespace with another model
+builds a new version next to the active one and then activates it in a
+single transaction; the previous version is kept as retired (or dropped).
+
+The registry is a SQLite file in the persist directory, so every API worker
+sharing the directory sees a switch on its next collection lookup.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+from app.config import settings
+
+# A building version whose job has not reported for this long is considered abandoned
+STALE_BUILD_SECONDS = 300
+
+_COLUMNS = ("namespace", "version", "collection", "embedding_model", "dimension", "state", "created_at", "activated_at", "heartbeat_at")
+
+class IndexRegistry:
+    """Persistent record of index versions, their models and which one is active."""
+    
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.path.join(settings.CHROMA_PERSIST_DIRECTORY, "index_registry.sqlite3")
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(self.path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS indexes (
+                namespace TEXT NOT NULL,
+                version INTEGER NOT NULL,
+                collection TEXT NOT NULL,
+                embedding_model TEXT NOT NULL,
+                dimension INTEGER,
+                state TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                activated_at REAL,
+                heartbeat_at REAL,
+                PRIMARY KEY (namespace, version)
+            );
+            CREATE INDEX IF NOT EXISTS indexes_by_state ON indexes (namespace, state);
+            """
+        )
+        self._connection.commit()
+    
+    def _select(self, where: str, params: tuple) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._connection.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM indexes WHERE {where} ORDER BY version", params
+            ).fetchall()
+        return [dict(zip(_COLUMNS, row)) for row in rows]
+    
+    def get(self, namespace: str, state: str = "active") -> Optional[Dict[str, Any]]:
+        """The latest version of a namespace in a state, or None."""
+        rows = self._select("namespace = ? AND state = ?", (namespace, state))
+        return rows[-1] if rows else None
+    
+    def get_building(self, namespace: str) -> Optional[Dict[str, Any]]:
+        """The version being built for a namespace, or None if there is none or its job has died."""
+        building = self.get(namespace, "building")
+        if building is None or time.time() - (building["heartbeat_at"] or 0) > STALE_BUILD_SECONDS:
+            return None
+        return building
+    
+    def versions(self, namespace: str) -> List[Dict[str, Any]]:
+        return self._select("namespace = ?", (namespace,))
+    
+    def register_active(self, namespace: str, collection: str, embedding_model: str, dimension: Optional[int] = None) -> Dict[str, Any]:
+        """Record a namespace's existing collection as version 1, unless it already has an active version."""
+        with self._lock:
+            self._connection.execute(
+                "INSERT INTO indexes SELECT ?, 1, ?, ?, ?, 'active', ?, ?, NULL "
+                "WHERE NOT EXISTS (SELECT 1 FROM indexes WHERE namespace = ? AND state = 'active')",
+                (namespace, collection, embedding_model, dimension, time.time(), time.time(), namespace)
+            )
+            self._connection.commit()
+        return self.get(namespace)
+    
+    def create_version(self, namespace: str, collection_prefix: str, embedding_model: str) -> Dict[str, Any]:
+        """Add a building version named "{collection_prefix}.v{version}"."""
+        with self._lock:
+            if self._connection.execute(
+                "SELECT 1 FROM indexes WHERE namespace = ? AND state = 'building'", (namespace,)
+            ).fetchone():
+                raise ValueError(f"Namespace '{namespace}' already has an index version being built")
+            version = self._connection.execute(
+                "SELECT COALESCE(MAX(version), 1) + 1 FROM indexes WHERE namespace = ?", (namespace,)
+            ).fetchone()[0]
+            self._connection.execute(
+                "INSERT INTO indexes VALUES (?, ?, ?, ?, NULL, 'building', ?, NULL, ?)",
+                (namespace, version, f"{collection_prefix}.v{version}", embedding_model, time.time(), time.time())
+            )
+            self._connection.commit()
+        return self._select("namespace = ? AND version = ?", (namespace, version))[0]
+    
+    def update(self, namespace: str, version: int, **values: Any) -> None:
+        """Set some columns (dimension, state, heartbeat_at) of a version."""
+        assignments = ", ".join(f"{column} = ?" for column in values)
+        with self._lock:
+            self._connection.execute(
+                f"UPDATE indexes SET {assignments} WHERE namespace = ? AND version = ?",
+                (*values.values(), namespace, version)
+            )
+            self._connection.commit()
+    
+    def activate(self, namespace: str, version: int) -> None:
+        """Make a version the active one and retire the previous one, atomically."""
+        with self._lock:
+            with self._connection:
+                self._connection.execute(
+                    "UPDATE indexes SET state = 'retired' WHERE namespace = ? AND state = 'active'", (namespace,)
+                )
+                self._connection.execute(
+                    "UPDATE indexes SET state = 'active', activated_at = ? WHERE namespace = ? AND version = ?",
+                    (time.time(), namespace, version)
+                )
+    
+    def delete(self, namespace: str, version: int) -> None:
+        with self._lock:
+            self._connection.execute("DELETE FROM indexes WHERE namespace = ? AND version = ?", (namespace, version))
+            self._connection.commit()
+    
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
\ No newline at end of file
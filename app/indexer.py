@@ -0,0 +1,283 @@
+"""
+Offline bulk indexer for directories and zip archives.
+
+Walks a directory (or the entries of a .zip file) and indexes every PDF, DOCX
+and TXT file in-process, without going through the API: a pool of processes
+extracts and chunks documents in parallel while the main process embeds the
+chunks of many documents at once with the bulk embedding path.
+
+Progress is appended to a JSONL manifest, one {"path", "sha256", "status",
+"chunks", "error"} line per file. A rerun with the same manifest skips files
+already indexed with the same content, re-indexes changed ones and retries
+failed ones, so an interrupted run resumes where it stopped. Documents are
+stored under their path relative to the source. Stop the API while indexing.
+
+Usage:
+    python -m app.indexer SOURCE [--namespace NS] [--manifest FILE] [--workers 4]
+        [--batch-chunks 2048] [--tags a,b]
+"""
+
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+from app.config import settings
+from app.document_processor import DocumentProcessor
+from app.rag_service import build_document_metadata
+from app.vector_store import TAG_PATTERN
+
+SUPPORTED_EXTENSIONS = (".pdf", ".docx", ".txt")
+
+_processor = None
+_page_workers = None
+
+def _init_worker() -> None:
+    """Extraction processes already run in parallel, so each reads its PDFs in-process."""
+    global _page_workers
+    _page_workers = 1
+
+def default_manifest_path(source: str) -> str:
+    return os.path.abspath(source).rstrip(os.sep) + ".manifest.jsonl"
+
+def load_manifest(path: str) -> Dict[str, Dict[str, Any]]:
+    """Latest manifest entry of every path; a torn last line from a crash is ignored."""
+    entries = {}
+    if not os.path.exists(path):
+        return entries
+    with open(path, encoding="utf-8") as file:
+        for line in file:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            entries[entry["path"]] = entry
+    return entries
+
+def iter_source(source: str) -> Iterator[Tuple[str, Union[str, bytes]]]:
+    """Yield (relative path, file path or bytes) for every supported file of a directory or zip."""
+    if zipfile.is_zipfile(source):
+        with zipfile.ZipFile(source) as archive:
+            for info in sorted(archive.infolist(), key=lambda info: info.filename):
+                if not info.is_dir() and os.path.splitext(info.filename)[1].lower() in SUPPORTED_EXTENSIONS:
+                    yield info.filename, archive.read(info)
+        return
+    
+    if not os.path.isdir(source):
+        raise ValueError(f"{source} is neither a directory nor a zip archive")
+    for root, dirs, files in os.walk(source):
+        dirs.sort()
+        for name in sorted(files):
+            if os.path.splitext(name)[1].lower() in SUPPORTED_EXTENSIONS:
+                path = os.path.join(root, name)
+                yield os.path.relpath(path, source).replace(os.sep, "/"), path
+
+def content_hash(data: Union[str, bytes]) -> str:
+    """SHA-256 of a file path's content or of bytes, as computed for /upload."""
+    digest = hashlib.sha256()
+    if isinstance(data, bytes):
+        digest.update(data)
+    else:
+        with open(data, "rb") as file:
+            for block in iter(lambda: file.read(settings.UPLOAD_CHUNK_SIZE), b""):
+                digest.update(block)
+    return digest.hexdigest()
+
+def _extract(job: Tuple[str, Union[str, bytes]]) -> Dict[str, Any]:
+    """Extract and chunk one document; runs in a worker process."""
+    global _processor
+    if _processor is None:
+        _processor = DocumentProcessor(page_workers=_page_workers)
+    name, source = job
+    try:
+        return {"path": name, **_processor.process_source(source, name)}
+    except Exception as e:
+        return {"path": name, "error": str(e)}
+
+class BulkIndexer:
+    """Indexes the files of a directory or zip archive into a vector store, resumably."""
+    
+    def __init__(
+        self,
+        vector_store,
+        manifest_path: str,
+        namespace: Optional[str] = None,
+        workers: int = 4,
+        batch_chunks: int = 2048,
+        tags: Optional[List[str]] = None
+    ):
+        self.vector_store = vector_store
+        self.manifest_path = manifest_path
+        self.namespace = namespace
+        self.workers = workers
+        self.batch_chunks = batch_chunks
+        self.tags = tags or []
+        self.stats = {"indexed": 0, "skipped": 0, "failed": 0, "chunks": 0, "bytes": 0}
+        self._pending = []  # extracted documents waiting for the next embedding batch
+    
+    def _write(self, manifest, entry: Dict[str, Any]) -> None:
+        manifest.write(json.dumps(entry) + "\n")
+        manifest.flush()
+        os.fsync(manifest.fileno())
+    
+    def _store(self, documents: List[Dict[str, Any]]) -> None:
+        """Embed and store the chunks of some extracted documents."""
+        self.vector_store.add_documents(
+            [chunk for document in documents for chunk in document["chunks"]],
+            namespace=self.namespace,
+            bulk=True,
+            source_texts={document["path"]: document["text"] for document in documents},
+            # The manifest must not call a document indexed while its chunks sit in the write buffer
+            wait=True
+        )
+    
+    def _fail(self, manifest, path: str, sha256: str, error: str) -> None:
+        self.stats["failed"] += 1
+        self._write(manifest, {"path": path, "sha256": sha256, "status": "failed", "chunks": 0, "error": error})
+        print(f"Failed {path}: {error}")
+    
+    def _flush(self, manifest) -> None:
+        """Embed and store the pending documents, then mark each indexed or failed.
+        
+        When the batch fails its documents are stored one at a time, so a bad
+        document is recorded as failed instead of failing its batch on every
+        resume.
+        """
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, []
+        try:
+            self._store(pending)
+            stored = pending
+        except Exception as e:
+            if len(pending) == 1:
+                self._fail(manifest, pending[0]["path"], pending[0]["sha256"], str(e))
+                return
+            print(f"Batch of {len(pending)} documents failed, storing them one at a time: {str(e)}")
+            stored = []
+            for document in pending:
+                try:
+                    self._store([document])
+                    stored.append(document)
+                except Exception as e:
+                    self._fail(manifest, document["path"], document["sha256"], str(e))
+        
+        for document in stored:
+            self._write(manifest, {
+                "path": document["path"],
+                "sha256": document["sha256"],
+                "status": "indexed",
+                "chunks": len(document["chunks"]),
+                "error": None
+            })
+            self.stats["indexed"] += 1
+            self.stats["chunks"] += len(document["chunks"])
+    
+    def _jobs(self, source: str, previous: Dict[str, Dict[str, Any]], hashes: Dict[str, Tuple[str, int]]):
+        """Files of the source that still need indexing."""
+        for name, data in iter_source(source):
+            sha256 = content_hash(data)
+            entry = previous.get(name)
+            if entry and entry["status"] == "indexed" and entry["sha256"] == sha256:
+                self.stats["skipped"] += 1
+                continue
+            hashes[name] = (sha256, len(data) if isinstance(data, bytes) else os.path.getsize(data))
+            yield name, data
+    
+    def _handle(self, result: Dict[str, Any], hashes: Dict[str, Tuple[str, int]], manifest) -> None:
+        sha256, size = hashes.pop(result["path"])
+        if "error" in result:
+            self._fail(manifest, result["path"], sha256, result["error"])
+            return
+        
+        # Drop chunks left by an earlier version or an interrupted run
+        self.vector_store.delete_documents_by_filename(result["path"], namespace=self.namespace)
+        metadata = build_document_metadata(result["path"], sha256, self.tags)
+        for chunk in result["chunks"]:
+            chunk["metadata"].update(metadata)
+        
+        self.stats["bytes"] += size
+        self._pending.append({"path": result["path"], "sha256": sha256, "text": result["text"], "chunks": result["chunks"]})
+        if sum(len(document["chunks"]) for document in self._pending) >= self.batch_chunks:
+            self._flush(manifest)
+    
+    def run(self, source: str) -> Dict[str, Any]:
+        """Index a directory or zip archive; returns counts and throughput."""
+        start = time.perf_counter()
+        previous = load_manifest(self.manifest_path)
+        hashes = {}
+        
+        with open(self.manifest_path, "a", encoding="utf-8") as manifest:
+            jobs = self._jobs(source, previous, hashes)
+            if self.workers > 1:
+                # Spawned rather than forked, since the parent has already loaded torch
+                context = multiprocessing.get_context("spawn")
+                with ProcessPoolExecutor(max_workers=self.workers, mp_context=context, initializer=_init_worker) as pool:
+                    # Keep a bounded number of documents in flight so memory stays flat
+                    in_flight = []
+                    for job in jobs:
+                        in_flight.append(pool.submit(_extract, job))
+                        if len(in_flight) >= self.workers * 2:
+                            self._handle(in_flight.pop(0).result(), hashes, manifest)
+                    for future in in_flight:
+                        self._handle(future.result(), hashes, manifest)
+            else:
+                for job in jobs:
+                    self._handle(_extract(job), hashes, manifest)
+            self._flush(manifest)
+        
+        elapsed = time.perf_counter() - start
+        return {
+            **self.stats,
+            "seconds": elapsed,
+            "files_per_sec": self.stats["indexed"] / elapsed if elapsed else 0.0,
+            "chunks_per_sec": self.stats["chunks"] / elapsed if elapsed else 0.0,
+            "mb_per_sec": self.stats["bytes"] / 1e6 / elapsed if elapsed else 0.0
+        }
+
+def main():
+    parser = argparse.ArgumentParser(description="Index a directory or zip archive without the API")
+    parser.add_argument("source", help="directory or .zip archive")
+    parser.add_argument("--namespace", default=None)
+    parser.add_argument("--manifest", default=None, help="progress manifest (default: SOURCE.manifest.jsonl)")
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) // 2), help="extraction processes")
+    parser.add_argument("--batch-chunks", type=int, default=2048, help="chunks embedded per batch")
+    parser.add_argument("--tags", default="", help="comma separated tags for every document")
+    args = parser.parse_args()
+    
+    tags = [tag for tag in args.tags.split(",") if tag]
+    for tag in tags:
+        if not TAG_PATTERN.match(tag):
+            raise SystemExit(f"Invalid tag '{tag}'. Use 1-32 letters, digits, '-' or '_'")
+    
+    from app.embedding_service import EmbeddingService
+    from app.vector_store import create_vector_store
+    
+    embedding_service = EmbeddingService()
+    vector_store = create_vector_store(embedding_service)
+    try:
+        indexer = BulkIndexer(
+            vector_store,
+            args.manifest or default_manifest_path(args.source),
+            namespace=args.namespace,
+            workers=args.workers,
+            batch_chunks=args.batch_chunks,
+            tags=tags
+        )
+        result = indexer.run(args.source)
+    finally:
+        vector_store.close()
+        embedding_service.close()
+    
+    print(
+        f"Indexed {result['indexed']} files ({result['chunks']} chunks, {result['bytes'] / 1e6:.1f} MB) "
+        f"in {result['seconds']:.1f}s: {result['files_per_sec']:.2f} files/s, {result['chunks_per_sec']:.1f} chunks/s, "
+        f"{result['mb_per_sec']:.2f} MB/s; {result['skipped']} already indexed, {result['failed']} failed"
+    )
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
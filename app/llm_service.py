@@ -1,14 +1,43 @@
+import contextlib
+import json
 import os
-from typing import List, Dict, Any, Optional
-from llama_cpp import Llama
+import threading
+import time
+from typing import List, Dict, Any, Optional, Iterator
+import requests
+from requests.adapters import HTTPAdapter
 from app.config import settings
+from app.resource_manager import resource_manager
+from app.residency import residency_manager
+
+STOP_SEQUENCES = ["</s>", "[INST]", "Question:", "Context:"]
+
+# Models sometimes repeat the prompt's final cue before answering
+ANSWER_PREFIX = "Answer:"
 
 class LLMService:
-    """Service for local LLM inference using llama-cpp-python."""
+    """Service for local LLM inference using llama-cpp-python.
+    
+    Other backends subclass this and override _load_model, _complete and
+    _stream; prompt building and answer cleanup are shared.
+    
+    The local model is unloaded after LLM_IDLE_UNLOAD_SECONDS without use or
+    when memory runs low (see app.residency) and reloaded by the next answer.
+    """
+    
+    # Backends holding model weights in this process can be unloaded while idle
+    unloadable = True
     
     def __init__(self):
         self.model = None
+        # llama.cpp contexts are not thread-safe; concurrent callers are serialized
+        self._lock = threading.Lock()
         self._load_model()
+        self.residency = None
+        if self.unloadable:
+            self.residency = residency_manager.register(
+                "llm", self._load_model, self._unload_model, idle_timeout=settings.LLM_IDLE_UNLOAD_SECONDS
+            )
     
     def _load_model(self):
         """Load the local LLM model."""
@@ -20,12 +49,16 @@ class LLMService:
             
             print(f"Loading LLM model: {model_path}")
             
+            # Imported here so the fake backend runs without llama-cpp-python installed
+            from llama_cpp import Llama
+            
             # Initialize Llama model
             self.model = Llama(
                 model_path=model_path,
                 n_ctx=settings.LLM_MAX_TOKENS,
-                n_threads=os.cpu_count(),
+                n_threads=resource_manager.llm_threads,
                 n_gpu_layers=0,  # Set to higher value if GPU is available
+                draft_model=self._draft_model(),
                 verbose=False
             )
             
@@ -34,6 +67,35 @@ class LLMService:
         except Exception as e:
             raise Exception(f"Error loading LLM model: {str(e)}")
     
+    def _unload_model(self):
+        """Free the local model; _load_model brings it back."""
+        with self._lock:
+            model, self.model = self.model, None
+        if model is not None and hasattr(model, "close"):
+            model.close()
+    
+    def _resident(self):
+        """Hold the model loaded for the duration of a block."""
+        if self.residency is None:
+            return contextlib.nullcontext()
+        return self.residency.acquire()
+    
+    def _draft_model(self):
+        """Prompt lookup draft model when LLM_SPECULATIVE_DECODING is on, else None.
+        
+        Drafts come from n-grams of the prompt itself, so no second model is
+        loaded. Answers copy heavily from the retrieved context, so drafts are
+        often accepted and several tokens are verified per forward pass. With
+        temperature 0 the output is unchanged; only the speed differs.
+        """
+        if not settings.LLM_SPECULATIVE_DECODING:
+            return None
+        
+        from llama_cpp.llama_speculative import LlamaPromptLookupDecoding
+        
+        print(f"Using prompt lookup decoding with {settings.LLM_DRAFT_TOKENS} draft tokens")
+        return LlamaPromptLookupDecoding(num_pred_tokens=settings.LLM_DRAFT_TOKENS)
+    
     def _create_prompt(self, question: str, context: List[Dict[str, Any]]) -> str:
         """Create a prompt for the LLM with context and question."""
         # Format context
@@ -62,49 +124,249 @@ Answer:"""
         
         return prompt
     
+    def _generation_params(self) -> Dict[str, Any]:
+        """Sampling parameters shared by every backend."""
+        return {
+            "max_tokens": settings.LLM_MAX_TOKENS,
+            "temperature": settings.LLM_TEMPERATURE,
+            "stop": STOP_SEQUENCES
+        }
+    
+    def _complete(self, prompt: str) -> str:
+        """Run the prompt through the local model and return the completion text."""
+        with self._lock:
+            response = self.model(prompt, echo=False, **self._generation_params())
+        return response['choices'][0]['text']
+    
+    def _stream(self, prompt: str) -> Iterator[str]:
+        """Run the prompt through the local model, yielding text as it is generated."""
+        with self._lock:
+            for chunk in self.model(prompt, echo=False, stream=True, **self._generation_params()):
+                yield chunk['choices'][0]['text']
+    
     def generate_answer(self, question: str, context: List[Dict[str, Any]]) -> str:
-        """Generate an answer using the local LLM."""
+        """Generate an answer using the LLM."""
         try:
-            if not self.model:
-                raise Exception("LLM model not loaded")
-            
-            # Create prompt
-            prompt = self._create_prompt(question, context)
-            
-            # Generate response
-            response = self.model(
-                prompt,
-                max_tokens=settings.LLM_MAX_TOKENS,
-                temperature=settings.LLM_TEMPERATURE,
-                stop=["</s>", "[INST]", "Question:", "Context:"],
-                echo=False
-            )
-            
-            # Extract answer
-            answer = response['choices'][0]['text'].strip()
+            with self._resident():
+                if not self.model:
+                    raise Exception("LLM model not loaded")
+                
+                # Create prompt
+                prompt = self._create_prompt(question, context)
+                
+                # Generate response
+                answer = self._complete(prompt).strip()
             
             # Clean up the answer
-            if answer.startswith("Answer:"):
-                answer = answer[7:].strip()
+            if answer.startswith(ANSWER_PREFIX):
+                answer = answer[len(ANSWER_PREFIX):].strip()
             
             return answer
             
         except Exception as e:
             raise Exception(f"Error generating answer: {str(e)}")
     
+    def stream_answer(self, question: str, context: List[Dict[str, Any]]) -> Iterator[str]:
+        """Generate an answer, yielding pieces of text as the model produces them."""
+        try:
+            with self._resident():
+                if not self.model:
+                    raise Exception("LLM model not loaded")
+                
+                prompt = self._create_prompt(question, context)
+                
+                # Hold back the start of the answer until it is known whether it
+                # begins with ANSWER_PREFIX, which is dropped as in generate_answer
+                head = ""
+                prefix_checked = False
+                started = False
+                for piece in self._stream(prompt):
+                    if not started:
+                        head = (head + piece).lstrip()
+                        if not prefix_checked:
+                            if len(head) < len(ANSWER_PREFIX) and ANSWER_PREFIX.startswith(head):
+                                continue
+                            prefix_checked = True
+                            if head.startswith(ANSWER_PREFIX):
+                                head = head[len(ANSWER_PREFIX):].lstrip()
+                        if not head:
+                            continue
+                        started = True
+                        piece = head
+                    yield piece
+                
+                if not started and head:
+                    # The whole answer was shorter than the prefix
+                    yield head
+                    
+        except Exception as e:
+            raise Exception(f"Error generating answer: {str(e)}")
+    
     def is_available(self) -> bool:
-        """Check if the LLM service is available."""
-        return self.model is not None
+        """Check if the LLM service is available (an unloaded model is reloaded on use)."""
+        return self.model is not None or (self.residency is not None and not self.residency.resident)
+    
+    def close(self) -> None:
+        """Release resources held by the backend."""
     
     def get_model_info(self) -> Dict[str, Any]:
         """Get information about the loaded model."""
-        if not self.model:
+        if not self.is_available():
             return {"status": "not_loaded"}
         
         return {
-            "status": "loaded",
+            "status": "loaded" if self.model else "unloaded",
+            "backend": "local",
             "model_path": settings.LLM_MODEL_PATH,
             "model_type": settings.LLM_MODEL_TYPE,
             "max_tokens": settings.LLM_MAX_TOKENS,
+            "temperature": settings.LLM_TEMPERATURE,
+            "speculative_decoding": (
+                {"method": "prompt_lookup", "draft_tokens": settings.LLM_DRAFT_TOKENS}
+                if settings.LLM_SPECULATIVE_DECODING else None
+            )
+        }
+
+class FakeLLMService(LLMService):
+    """Stand-in LLM for load testing the API, retrieval and queueing paths.
+    
+    Loads no model. Each answer sleeps for the time a local model would take:
+    prompt tokens at FAKE_LLM_PROMPT_TOKENS_PER_SEC plus FAKE_LLM_OUTPUT_TOKENS
+    at FAKE_LLM_TOKENS_PER_SEC. Calls are serialized like a single llama.cpp context.
+    """
+    
+    unloadable = False
+    
+    def _load_model(self):
+        """Nothing to load; mark the service as available."""
+        self.model = "fake"
+        print(
+            f"Using fake LLM backend ({settings.FAKE_LLM_TOKENS_PER_SEC} tokens/s, "
+            f"{settings.FAKE_LLM_OUTPUT_TOKENS} tokens per answer)"
+        )
+    
+    def _prompt_tokens(self, prompt: str) -> int:
+        # Roughly four characters per token for English text
+        return len(prompt) // 4
+    
+    def _complete(self, prompt: str) -> str:
+        """Sleep for the modelled generation time and return a canned answer."""
+        prompt_tokens = self._prompt_tokens(prompt)
+        with self._lock:
+            time.sleep(
+                prompt_tokens / settings.FAKE_LLM_PROMPT_TOKENS_PER_SEC
+                + settings.FAKE_LLM_OUTPUT_TOKENS / settings.FAKE_LLM_TOKENS_PER_SEC
+            )
+        return f"[fake answer to a {prompt_tokens}-token prompt]"
+    
+    def _stream(self, prompt: str) -> Iterator[str]:
+        """Yield one fake token per modelled generation step."""
+        prompt_tokens = self._prompt_tokens(prompt)
+        with self._lock:
+            time.sleep(prompt_tokens / settings.FAKE_LLM_PROMPT_TOKENS_PER_SEC)
+            for i in range(settings.FAKE_LLM_OUTPUT_TOKENS):
+                time.sleep(1 / settings.FAKE_LLM_TOKENS_PER_SEC)
+                yield f" token{i}"
+    
+    def get_model_info(self) -> Dict[str, Any]:
+        """Get information about the fake backend."""
+        return {
+            "status": "loaded",
+            "backend": "fake",
+            "tokens_per_sec": settings.FAKE_LLM_TOKENS_PER_SEC,
+            "prompt_tokens_per_sec": settings.FAKE_LLM_PROMPT_TOKENS_PER_SEC,
+            "output_tokens": settings.FAKE_LLM_OUTPUT_TOKENS
+        }
+
+class HTTPLLMService(LLMService):
+    """Client for an OpenAI / llama.cpp server compatible /v1/completions endpoint.
+    
+    The model runs in its own process (for example llama.cpp's server with
+    continuous batching), so it can be scaled and restarted independently and
+    shared by every API worker. Requests go over a pooled keep-alive session and
+    are not serialized here; the server schedules them.
+    """
+    
+    unloadable = False
+    
+    def _load_model(self):
+        """Set up the pooled HTTP session; the server is not contacted yet."""
+        self.base_url = settings.LLM_SERVER_URL.rstrip("/")
+        
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=settings.LLM_SERVER_POOL_SIZE)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        if settings.LLM_SERVER_API_KEY:
+            session.headers["Authorization"] = f"Bearer {settings.LLM_SERVER_API_KEY}"
+        
+        self.model = session
+        print(f"Using LLM server at {self.base_url}")
+    
+    def _timeout(self):
+        return (settings.LLM_SERVER_CONNECT_TIMEOUT, settings.LLM_SERVER_READ_TIMEOUT)
+    
+    def _post_completion(self, prompt: str, stream: bool) -> requests.Response:
+        """Send a completion request and check its status."""
+        payload = {"prompt": prompt, "stream": stream, **self._generation_params()}
+        if settings.LLM_SERVER_MODEL:
+            payload["model"] = settings.LLM_SERVER_MODEL
+        
+        response = self.model.post(
+            f"{self.base_url}/v1/completions",
+            json=payload,
+            timeout=self._timeout(),
+            stream=stream
+        )
+        if response.status_code != 200:
+            detail = response.text[:200]
+            response.close()
+            raise Exception(f"LLM server returned {response.status_code}: {detail}")
+        return response
+    
+    def _complete(self, prompt: str) -> str:
+        """Request a full completion from the server."""
+        return self._post_completion(prompt, stream=False).json()["choices"][0]["text"]
+    
+    def _stream(self, prompt: str) -> Iterator[str]:
+        """Request a streamed completion and yield the text of each server-sent event."""
+        with self._post_completion(prompt, stream=True) as response:
+            for line in response.iter_lines(decode_unicode=True):
+                if not line or not line.startswith("data:"):
+                    continue
+                data = line[5:].strip()
+                if data == "[DONE]":
+                    break
+                yield json.loads(data)["choices"][0]["text"]
+    
+    def close(self) -> None:
+        """Close the pooled connections."""
+        self.model.close()
+    
+    def get_model_info(self) -> Dict[str, Any]:
+        """Get information about the LLM server, checking that it is reachable."""
+        try:
+            response = self.model.get(f"{self.base_url}/v1/models", timeout=self._timeout())
+            status = "reachable" if response.status_code == 200 else f"error {response.status_code}"
+        except requests.RequestException as e:
+            status = f"unreachable: {str(e)}"
+        
+        return {
+            "status": status,
+            "backend": "http",
+            "url": self.base_url,
+            "model": settings.LLM_SERVER_MODEL or None,
+            "max_tokens": settings.LLM_MAX_TOKENS,
             "temperature": settings.LLM_TEMPERATURE
-        } 
\ No newline at end of file
+        }
+
+def create_llm_service() -> LLMService:
+    """Create the LLM service selected by LLM_BACKEND."""
+    backend = settings.LLM_BACKEND.lower()
+    if backend == "fake":
+        return FakeLLMService()
+    if backend == "http":
+        return HTTPLLMService()
+    if backend == "local":
+        return LLMService()
+    raise ValueError(f"Unknown LLM_BACKEND: {settings.LLM_BACKEND}. Use 'local', 'http' or 'fake'")
\ No newline at end of file
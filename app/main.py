@@ -1,17 +1,23 @@
 import os
-import shutil
+import json
+import hashlib
+import tempfile
 from datetime import datetime
-from typing import List
-from fastapi import FastAPI, File, UploadFile, HTTPException, Depends
+from typing import List, Optional
+from fastapi import FastAPI, File, UploadFile, HTTPException, Depends, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 import uvicorn
 
 from app.models import (
-    DocumentUploadResponse, QuestionRequest, QuestionResponse,
-    DocumentsListResponse, DocumentInfo, HealthResponse
+    DocumentUploadResponse, QuestionRequest, QuestionResponse, BatchQuestionRequest,
+    DocumentsListResponse, DocumentInfo, HealthResponse, SearchFilters, ReindexRequest
 )
 from app.rag_service import RAGService
+from app.profiling import RequestProfile, ProfilerBusyError
+from app.singleflight import SingleFlight, question_key
+from app.vector_store import resolve_namespace, TAG_PATTERN
 from app.config import settings
 
 # Initialize FastAPI app
@@ -30,9 +36,54 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Room for the multipart boundaries, part headers and form fields around the file
+MULTIPART_OVERHEAD = 64 * 1024
+
+class UploadSizeLimitMiddleware:
+    """Reject /upload bodies over MAX_FILE_SIZE before they are parsed.
+    
+    Starlette spools the whole multipart body into a temporary file before the
+    endpoint runs, so the limit has to be enforced while the body is received:
+    on Content-Length when the client sends one, else on the bytes read so far.
+    """
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] != "/upload":
+            await self.app(scope, receive, send)
+            return
+        
+        limit = settings.MAX_FILE_SIZE + MULTIPART_OVERHEAD
+        detail = f"File too large. Maximum size: {settings.MAX_FILE_SIZE} bytes"
+        content_length = dict(scope["headers"]).get(b"content-length", b"")
+        if content_length.isdigit() and int(content_length) > limit:
+            response = JSONResponse(status_code=413, content={"detail": detail})
+            await response(scope, receive, send)
+            return
+        
+        received = 0
+        
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    raise HTTPException(status_code=413, detail=detail)
+            return message
+        
+        await self.app(scope, limited_receive, send)
+
+app.add_middleware(UploadSizeLimitMiddleware)
+
 # Initialize RAG service
 rag_service = None
 
+# Identical concurrent /ask requests share one retrieval and generation
+ask_flights = SingleFlight()
+
 def get_rag_service():
     """Dependency to get RAG service instance."""
     global rag_service
@@ -40,6 +91,111 @@ def get_rag_service():
         rag_service = RAGService()
     return rag_service
 
+def validate_namespace(namespace: Optional[str]) -> str:
+    """Resolve a namespace from a request, rejecting invalid names."""
+    try:
+        return resolve_namespace(namespace)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+async def receive_upload(file: UploadFile, file_extension: str):
+    """Read an upload in UPLOAD_CHUNK_SIZE pieces, enforcing MAX_FILE_SIZE on the file itself.
+    
+    By now Starlette has received the body, which UploadSizeLimitMiddleware
+    holds to MAX_FILE_SIZE plus MULTIPART_OVERHEAD. Uploads up to
+    UPLOAD_IN_MEMORY_MAX_SIZE stay in memory; larger ones are copied to a
+    uniquely named temporary file in UPLOAD_DIR. The SHA-256 of the content is
+    computed while reading. Returns (data, temp_file_path, content_hash) where
+    exactly one of data and temp_file_path is set.
+    """
+    digest = hashlib.sha256()
+    buffer = bytearray()
+    temp_file = None
+    total_size = 0
+    
+    try:
+        while True:
+            chunk = await file.read(settings.UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            
+            total_size += len(chunk)
+            if total_size > settings.MAX_FILE_SIZE:
+                raise HTTPException(
+                    status_code=413,
+                    detail=f"File too large. Maximum size: {settings.MAX_FILE_SIZE} bytes"
+                )
+            digest.update(chunk)
+            
+            if temp_file is None and len(buffer) + len(chunk) > settings.UPLOAD_IN_MEMORY_MAX_SIZE:
+                os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
+                temp_file = tempfile.NamedTemporaryFile(
+                    dir=settings.UPLOAD_DIR, prefix="upload-", suffix=file_extension, delete=False
+                )
+                temp_file.write(buffer)
+                buffer = bytearray()
+            
+            if temp_file is None:
+                buffer.extend(chunk)
+            else:
+                temp_file.write(chunk)
+        
+        if temp_file is None:
+            return bytes(buffer), None, digest.hexdigest()
+        
+        temp_file.close()
+        return None, temp_file.name, digest.hexdigest()
+        
+    except BaseException:
+        if temp_file is not None:
+            temp_file.close()
+            os.remove(temp_file.name)
+        raise
+
+def validate_tags(tags: Optional[List[str]]) -> List[str]:
+    """Reject tags that can't be stored as metadata keys."""
+    for tag in tags or []:
+        if not TAG_PATTERN.match(tag):
+            raise HTTPException(status_code=400, detail=f"Invalid tag '{tag}'. Use 1-32 letters, digits, '-' or '_'")
+    return list(tags or [])
+
+def filters_to_dict(filters: Optional[SearchFilters]) -> Optional[dict]:
+    """Convert request filters for the RAG service, validating their tags."""
+    if filters is None:
+        return None
+    validate_tags(filters.tags)
+    return filters.model_dump(exclude_none=True)
+
+def profiling_requested(request: Request) -> bool:
+    """Check whether a request opted into profiling; ignored unless PROFILING_ENABLED."""
+    if not settings.PROFILING_ENABLED:
+        return False
+    flag = request.headers.get("x-profile") or request.query_params.get("profile")
+    return flag is not None and flag.lower() in ("1", "true", "yes")
+
+def run_profiled(request: Request, kind: str, work):
+    """Run work under a RequestProfile and attach its summary to the result.
+    
+    cProfile only sees the thread it was enabled in, so this is meant to be
+    the function handed to run_in_threadpool, not to wrap the await.
+    """
+    with RequestProfile(kind, request.headers.get("x-request-id")) as profile:
+        result = work()
+    result["profile"] = profile.summary()
+    return result
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Check whether the request's If-None-Match header matches an ETag."""
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+def not_modified(etag: str) -> Response:
+    """Build a 304 response for a matching ETag."""
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+
 @app.on_event("startup")
 async def startup_event():
     """Initialize services on startup."""
@@ -50,6 +206,12 @@ async def startup_event():
     except Exception as e:
         print(f"Error initializing RAG service: {str(e)}")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Release background resources on shutdown."""
+    if rag_service is not None:
+        rag_service.close()
+
 @app.get("/", response_model=dict)
 async def root():
     """Root endpoint with API information."""
@@ -59,9 +221,12 @@ async def root():
         "endpoints": {
             "upload": "POST /upload",
             "ask": "POST /ask",
+            "ask_batch": "POST /ask/batch",
+            "ask_stream": "POST /ask/stream",
             "documents": "GET /documents",
             "health": "GET /health",
-            "status": "GET /status"
+            "status": "GET /status",
+            "reindex": "POST /admin/reindex"
         }
     }
 
@@ -75,23 +240,49 @@ async def health_check():
     )
 
 @app.get("/status")
-async def get_status(rag: RAGService = Depends(get_rag_service)):
-    """Get system status and component information."""
+async def get_status(
+    request: Request,
+    response: Response,
+    rag: RAGService = Depends(get_rag_service)
+):
+    """Get system status and component information.
+    
+    The ETag follows the models and the catalog and index versions only, so a
+    matching If-None-Match gets a 304 Not Modified without building the
+    status; live counters (memory, queues, progress) may then be stale.
+    """
     try:
-        return rag.get_system_status()
+        status_version = rag.get_status_version()
+        etag = f'W/"{hashlib.sha1(status_version.encode("utf-8")).hexdigest()}"'
+        if etag_matches(request, etag):
+            return not_modified(etag)
+        
+        status = rag.get_system_status()
+        status["ask_coalescing"] = {"enabled": settings.ASK_COALESCING_ENABLED, **ask_flights.stats()}
+        
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = "no-cache"
+        return status
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/upload", response_model=DocumentUploadResponse)
 async def upload_document(
+    http_request: Request,
     file: UploadFile = File(...),
+    namespace: Optional[str] = Query(None, description="Namespace (tenant) to store the document in"),
+    tags: Optional[List[str]] = Query(None, description="Tags to attach to the document, usable as /ask filters"),
     rag: RAGService = Depends(get_rag_service)
 ):
     """Upload and process a document."""
     try:
+        namespace = validate_namespace(namespace)
+        tags = validate_tags(tags)
+        
         # Validate file type
         allowed_extensions = ['.pdf', '.docx', '.txt']
-        file_extension = os.path.splitext(file.filename)[1].lower()
+        filename = os.path.basename(file.filename or "")
+        file_extension = os.path.splitext(filename)[1].lower()
         
         if file_extension not in allowed_extensions:
             raise HTTPException(
@@ -99,23 +290,25 @@ async def upload_document(
                 detail=f"Unsupported file type. Allowed types: {', '.join(allowed_extensions)}"
             )
         
-        # Validate file size
-        if file.size > settings.MAX_FILE_SIZE:
-            raise HTTPException(
-                status_code=400,
-                detail=f"File too large. Maximum size: {settings.MAX_FILE_SIZE} bytes"
-            )
-        
-        # Save file temporarily
-        temp_file_path = os.path.join(settings.UPLOAD_DIR, file.filename)
-        with open(temp_file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-        
-        # Process document
-        result = rag.upload_document(temp_file_path)
+        # Read the upload, enforcing the size limit on the file itself
+        data, temp_file_path, content_hash = await receive_upload(file, file_extension)
         
-        # Clean up temporary file
-        os.remove(temp_file_path)
+        try:
+            # Process document
+            def process():
+                if temp_file_path is None:
+                    return rag.upload_document_bytes(data, filename, namespace=namespace, content_hash=content_hash, tags=tags)
+                return rag.upload_document(temp_file_path, namespace=namespace, filename=filename, content_hash=content_hash, tags=tags)
+            
+            # Off the event loop, since ingestion may wait for questions to finish
+            if profiling_requested(http_request):
+                result = await run_in_threadpool(run_profiled, http_request, "upload", process)
+            else:
+                result = await run_in_threadpool(process)
+        finally:
+            # Clean up temporary file
+            if temp_file_path is not None and os.path.exists(temp_file_path):
+                os.remove(temp_file_path)
         
         if result["status"] == "error":
             raise HTTPException(status_code=500, detail=result["message"])
@@ -124,33 +317,135 @@ async def upload_document(
         
     except HTTPException:
         raise
+    except ProfilerBusyError as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/ask", response_model=QuestionResponse)
 async def ask_question(
     request: QuestionRequest,
+    http_request: Request,
     rag: RAGService = Depends(get_rag_service)
 ):
-    """Ask a question and get an answer using RAG."""
+    """Ask a question and get an answer using RAG.
+    
+    Identical questions in flight at the same time (same namespace, catalog
+    version, top_k and filters) are answered by a single computation.
+    """
     try:
-        result = rag.ask_question(request.question, request.top_k)
+        namespace = validate_namespace(request.namespace)
+        filters = filters_to_dict(request.filters)
         
-        if "error" in result["answer"].lower():
+        def answer():
+            return rag.ask_question(request.question, request.top_k, namespace=namespace, filters=filters)
+        
+        if profiling_requested(http_request):
+            # Profiled requests are never shared
+            result = await run_in_threadpool(run_profiled, http_request, "ask", answer)
+        elif settings.ASK_COALESCING_ENABLED:
+            key = question_key(request.question, request.top_k, namespace, rag.get_catalog_version(namespace), filters)
+            result, _ = await ask_flights.do(key, lambda: run_in_threadpool(answer))
+        else:
+            result = await run_in_threadpool(answer)
+        
+        # Extracted answers are document text, which may well mention errors
+        if result.get("answer_type") != "extractive" and "error" in result["answer"].lower():
             raise HTTPException(status_code=500, detail=result["answer"])
         
         return QuestionResponse(**result)
         
+    except HTTPException:
+        raise
+    except ProfilerBusyError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/ask/stream")
+async def ask_question_stream(
+    request: QuestionRequest,
+    rag: RAGService = Depends(get_rag_service)
+):
+    """Ask a question, streaming NDJSON events as the answer is generated."""
+    try:
+        namespace = validate_namespace(request.namespace)
+        filters = filters_to_dict(request.filters)
+        # Retrieval runs before the first event; the sync generator below is iterated in the threadpool
+        events = await run_in_threadpool(
+            rag.ask_question_stream, request.question, request.top_k, namespace=namespace, filters=filters
+        )
+        
+        def stream_events():
+            for event in events:
+                yield json.dumps(event, default=str) + "\n"
+        
+        return StreamingResponse(stream_events(), media_type="application/x-ndjson")
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/ask/batch")
+async def ask_question_batch(
+    request: BatchQuestionRequest,
+    rag: RAGService = Depends(get_rag_service)
+):
+    """Answer many questions, streaming one NDJSON result line per question as each completes."""
+    try:
+        namespace = validate_namespace(request.namespace)
+        
+        if len(request.questions) > settings.BATCH_MAX_QUESTIONS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Too many questions. Maximum per batch: {settings.BATCH_MAX_QUESTIONS}"
+            )
+        for question in request.questions:
+            if not question.strip() or len(question) > 1000:
+                raise HTTPException(
+                    status_code=400,
+                    detail="Each question must contain between 1 and 1000 characters"
+                )
+        
+        filters = filters_to_dict(request.filters)
+        # Embedding and retrieval run before the first line; keep them off the event loop
+        results = await run_in_threadpool(
+            rag.ask_questions_batch, request.questions, request.top_k, namespace=namespace, filters=filters
+        )
+        
+        def stream_results():
+            for result in results:
+                yield json.dumps(result, default=str) + "\n"
+        
+        return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+        
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/documents", response_model=DocumentsListResponse)
-async def get_documents(rag: RAGService = Depends(get_rag_service)):
-    """Get list of uploaded documents."""
+async def get_documents(
+    request: Request,
+    response: Response,
+    namespace: Optional[str] = Query(None, description="Namespace (tenant) to list"),
+    rag: RAGService = Depends(get_rag_service)
+):
+    """Get list of uploaded documents.
+    
+    The ETag is the namespace's catalog version, so a matching If-None-Match
+    gets a 304 Not Modified without listing the collection.
+    """
     try:
-        documents = rag.get_documents()
+        namespace = validate_namespace(namespace)
+        
+        catalog_version = rag.get_catalog_version(namespace)
+        etag = f'W/"{namespace}-{catalog_version}"'
+        if etag_matches(request, etag):
+            return not_modified(etag)
+        
+        documents = rag.get_documents(namespace=namespace)
         
         # Convert to DocumentInfo objects
         document_infos = []
@@ -164,22 +459,30 @@ async def get_documents(rag: RAGService = Depends(get_rag_service)):
             )
             document_infos.append(document_info)
         
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = "no-cache"
         return DocumentsListResponse(
             documents=document_infos,
-            total_count=len(document_infos)
+            total_count=len(document_infos),
+            namespace=namespace,
+            catalog_version=catalog_version
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.delete("/documents/{filename}")
 async def delete_document(
     filename: str,
+    namespace: Optional[str] = Query(None, description="Namespace (tenant) the document belongs to"),
     rag: RAGService = Depends(get_rag_service)
 ):
     """Delete a document from the vector store."""
     try:
-        result = rag.delete_document(filename)
+        namespace = validate_namespace(namespace)
+        result = rag.delete_document(filename, namespace=namespace)
         
         if result["status"] == "error":
             raise HTTPException(status_code=500, detail=result["message"])
@@ -191,6 +494,40 @@ async def delete_document(
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/admin/reindex", status_code=202)
+async def start_reindex(
+    request: ReindexRequest,
+    rag: RAGService = Depends(get_rag_service)
+):
+    """Re-embed a namespace with another model in the background.
+    
+    The current index keeps serving until the new one is complete; progress
+    is reported by GET /admin/reindex.
+    """
+    try:
+        namespace = validate_namespace(request.namespace)
+        return await run_in_threadpool(rag.start_reindex, request.embedding_model, namespace)
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/admin/reindex")
+async def get_reindex_status(
+    namespace: Optional[str] = Query(None, description="Namespace whose index versions are listed"),
+    rag: RAGService = Depends(get_rag_service)
+):
+    """Progress of re-embedding jobs and the index versions of a namespace."""
+    try:
+        namespace = validate_namespace(namespace)
+        return rag.get_reindex_status(namespace)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.exception_handler(Exception)
 async def global_exception_handler(request, exc):
     """Global exception handler."""
@@ -8,12 +8,39 @@ class DocumentUploadResponse(BaseModel):
     status: str
     message: str
     chunks_processed: int
+    duplicates_suppressed: int = 0
     file_size: int
+    namespace: Optional[str] = None
+    content_hash: Optional[str] = None
+    tags: List[str] = []
+    profile: Optional[Dict[str, Any]] = None
+
+class SearchFilters(BaseModel):
+    """Metadata filters applied inside the vector search."""
+    filenames: Optional[List[str]] = None
+    file_types: Optional[List[str]] = None
+    uploaded_after: Optional[datetime] = None
+    uploaded_before: Optional[datetime] = None
+    tags: Optional[List[str]] = None
 
 class QuestionRequest(BaseModel):
     """Request model for asking questions."""
     question: str = Field(..., min_length=1, max_length=1000)
     top_k: int = Field(default=5, ge=1, le=20)
+    namespace: Optional[str] = Field(default=None, max_length=32)
+    filters: Optional[SearchFilters] = None
+
+class BatchQuestionRequest(BaseModel):
+    """Request model for answering many questions in one call."""
+    questions: List[str] = Field(..., min_length=1)
+    top_k: int = Field(default=5, ge=1, le=20)
+    namespace: Optional[str] = Field(default=None, max_length=32)
+    filters: Optional[SearchFilters] = None
+
+class ReindexRequest(BaseModel):
+    """Request model for re-embedding a namespace with another model."""
+    embedding_model: str = Field(..., min_length=1, max_length=200)
+    namespace: Optional[str] = Field(default=None, max_length=32)
 
 class QuestionResponse(BaseModel):
     """Response model for question answers."""
@@ -22,6 +49,8 @@ class QuestionResponse(BaseModel):
     sources: List[Dict[str, Any]]
     confidence: float
     processing_time: float
+    answer_type: str = "generated"  # "extractive" when taken verbatim from a source without the LLM
+    profile: Optional[Dict[str, Any]] = None
 
 class DocumentInfo(BaseModel):
     """Model for document information."""
@@ -35,6 +64,8 @@ class DocumentsListResponse(BaseModel):
     """Response model for listing documents."""
     documents: List[DocumentInfo]
     total_count: int
+    namespace: Optional[str] = None
+    catalog_version: Optional[str] = None
 
 class HealthResponse(BaseModel):
     """Health check response."""
@@ -0,0 +1,125 @@
+import contextlib
+import cProfile
+import io
+import json
+import os
+import pstats
+import re
+import threading
+import time
+import tracemalloc
+import uuid
+from contextvars import ContextVar
+from typing import Dict, Any, Optional
+from app.config import settings
+
+REQUEST_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+# The profile of the request running in the current context, if any
+_current_profile: ContextVar[Optional["RequestProfile"]] = ContextVar("current_profile", default=None)
+
+# cProfile and tracemalloc are process-wide, so only one request is profiled at a time
+_profiling_lock = threading.Lock()
+
+_NO_STAGE = contextlib.nullcontext()
+
+class ProfilerBusyError(Exception):
+    """Raised when a profiled request arrives while another one is being profiled."""
+
+def stage(name: str):
+    """Time a named stage of the current request when it is being profiled.
+    
+    Outside a profiled request this returns a shared no-op context manager,
+    so instrumented code pays only a context variable lookup.
+    """
+    profile = _current_profile.get()
+    if profile is None:
+        return _NO_STAGE
+    return profile.stage(name)
+
+def new_request_id(requested: Optional[str] = None) -> str:
+    """Use a caller supplied request ID when it is safe as a filename, else generate one."""
+    if requested and REQUEST_ID_PATTERN.match(requested):
+        return requested
+    return uuid.uuid4().hex
+
+class RequestProfile:
+    """cProfile + tracemalloc capture and stage timings for a single request.
+    
+    Use as a context manager around the request's work. On exit the cProfile
+    stats are written to PROFILES_DIR/<request_id>.prof and a JSON summary
+    with stage timings, peak traced memory and the top functions to
+    PROFILES_DIR/<request_id>.json.
+    """
+    
+    def __init__(self, kind: str, request_id: Optional[str] = None):
+        self.kind = kind
+        self.request_id = new_request_id(request_id)
+        self.stages: Dict[str, float] = {}
+        self.total_time = 0.0
+        self.memory_peak_bytes = 0
+        self.profile_path = os.path.join(settings.PROFILES_DIR, f"{self.request_id}.prof")
+        self._profiler = cProfile.Profile()
+        self._started_tracemalloc = False
+        self._token = None
+        self._start = 0.0
+    
+    @contextlib.contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start
+    
+    def __enter__(self) -> "RequestProfile":
+        if not _profiling_lock.acquire(blocking=False):
+            raise ProfilerBusyError("Another request is being profiled; try again shortly")
+        
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+        else:
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        
+        self._token = _current_profile.set(self)
+        self._start = time.perf_counter()
+        self._profiler.enable()
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        try:
+            self._profiler.disable()
+            self.total_time = time.perf_counter() - self._start
+            self.memory_peak_bytes = tracemalloc.get_traced_memory()[1]
+            if self._started_tracemalloc:
+                tracemalloc.stop()
+            _current_profile.reset(self._token)
+            self._save()
+        finally:
+            _profiling_lock.release()
+    
+    def _save(self) -> None:
+        """Write the cProfile stats and the JSON summary to PROFILES_DIR."""
+        os.makedirs(settings.PROFILES_DIR, exist_ok=True)
+        self._profiler.dump_stats(self.profile_path)
+        
+        top_functions = io.StringIO()
+        pstats.Stats(self._profiler, stream=top_functions).sort_stats("cumulative").print_stats(25)
+        
+        summary = self.summary()
+        summary["top_functions"] = top_functions.getvalue()
+        with open(os.path.join(settings.PROFILES_DIR, f"{self.request_id}.json"), "w", encoding="utf-8") as file:
+            json.dump(summary, file, indent=2)
+    
+    def summary(self) -> Dict[str, Any]:
+        """Stage timing breakdown returned in the API response."""
+        return {
+            "request_id": self.request_id,
+            "kind": self.kind,
+            "total_time": self.total_time,
+            "stages": dict(self.stages),
+            "memory_peak_bytes": self.memory_peak_bytes,
+            # Relative to PROFILES_DIR; server paths stay out of API responses
+            "profile_file": os.path.basename(self.profile_path)
+        }
\ No newline at end of file
@@ -0,0 +1,188 @@
+"""
+Dimensionality reduction of stored embeddings.
+
+A projection maps the vectors of a namespace's embedding model to fewer dimensions:
+
+    pca       the top principal directions of a sample of stored embeddings
+              (uncentered, so dot products and cosine rankings are preserved)
+    truncate  the first dimensions, for Matryoshka-trained models whose
+              leading dimensions carry most of the signal
+
+Once a namespace has a projection (CHROMA_PERSIST_DIRECTORY/projections/<ns>.npz)
+the vector store applies it to new chunks and to queries. The migrate command
+fits a projection and rewrites the namespace's collection with projected
+vectors, without re-embedding any text. Stop the API while migrating.
+
+Usage:
+    python -m app.projection migrate --dim 128 [--namespace NS] [--method pca|truncate] [--sample 10000]
+    python -m app.projection info [--namespace NS]
+"""
+
+import argparse
+from typing import List, Optional, Union, TYPE_CHECKING
+import numpy as np
+from app.config import settings
+
+if TYPE_CHECKING:
+    from app.vector_store import VectorStore
+
+SUPPORTED_METHODS = ("pca", "truncate")
+
+class Projection:
+    """A (target_dim, source_dim) linear map applied to embeddings, followed by L2 normalization."""
+    
+    def __init__(self, components: np.ndarray, method: str, embedding_model: Optional[str] = None):
+        self.components = np.asarray(components, dtype=np.float32)
+        self.method = method
+        self.embedding_model = embedding_model or settings.EMBEDDING_MODEL
+    
+    @property
+    def source_dim(self) -> int:
+        return self.components.shape[1]
+    
+    @property
+    def target_dim(self) -> int:
+        return self.components.shape[0]
+    
+    def apply(self, embeddings: Union[List[List[float]], np.ndarray]) -> np.ndarray:
+        """Project a batch of embeddings."""
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        if embeddings.ndim != 2 or embeddings.shape[1] != self.source_dim:
+            raise ValueError(
+                f"Projection expects {self.source_dim}-d embeddings, got shape {embeddings.shape}"
+            )
+        projected = embeddings @ self.components.T
+        norms = np.linalg.norm(projected, axis=1, keepdims=True)
+        return projected / np.maximum(norms, 1e-12)
+    
+    def save(self, path: str) -> None:
+        with open(path, "wb") as file:
+            np.savez(
+                file,
+                components=self.components,
+                method=np.array(self.method),
+                embedding_model=np.array(self.embedding_model)
+            )
+    
+    @classmethod
+    def load(cls, path: str, embedding_model: Optional[str] = None) -> "Projection":
+        """Load a projection, rejecting one fitted for another model than the namespace's."""
+        embedding_model = embedding_model or settings.EMBEDDING_MODEL
+        with np.load(path) as data:
+            projection = cls(data["components"], str(data["method"]), str(data["embedding_model"]))
+        if projection.embedding_model != embedding_model:
+            raise ValueError(
+                f"Projection {path} was fitted for '{projection.embedding_model}' but the namespace uses "
+                f"'{embedding_model}'"
+            )
+        return projection
+    
+    def info(self) -> dict:
+        return {
+            "method": self.method,
+            "source_dim": self.source_dim,
+            "target_dim": self.target_dim,
+            "embedding_model": self.embedding_model
+        }
+
+def fit_pca(
+    embeddings: Union[List[List[float]], np.ndarray],
+    target_dim: int,
+    embedding_model: Optional[str] = None
+) -> Projection:
+    """Fit a projection onto the top target_dim principal directions of a sample."""
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    if target_dim >= embeddings.shape[1]:
+        raise ValueError(f"Target dimension {target_dim} must be below {embeddings.shape[1]}")
+    if len(embeddings) < target_dim:
+        raise ValueError(f"Need at least {target_dim} embeddings to fit, got {len(embeddings)}")
+    # Right singular vectors of the uncentered sample span the directions with most energy
+    _, _, vt = np.linalg.svd(embeddings, full_matrices=False)
+    return Projection(vt[:target_dim], "pca", embedding_model)
+
+def truncation(source_dim: int, target_dim: int, embedding_model: Optional[str] = None) -> Projection:
+    """Keep the first target_dim dimensions."""
+    if target_dim >= source_dim:
+        raise ValueError(f"Target dimension {target_dim} must be below {source_dim}")
+    return Projection(np.eye(source_dim, dtype=np.float32)[:target_dim], "truncate", embedding_model)
+
+def sample_embeddings(vector_store: "VectorStore", namespace: Optional[str], size: int) -> np.ndarray:
+    """Reservoir-sample up to size stored embeddings of a namespace."""
+    rng = np.random.default_rng(0)
+    sample = []
+    seen = 0
+    for batch in vector_store.iter_chunks(namespace=namespace):
+        for embedding in batch["embeddings"]:
+            if len(sample) < size:
+                sample.append(embedding)
+            else:
+                slot = rng.integers(0, seen + 1)
+                if slot < size:
+                    sample[slot] = embedding
+            seen += 1
+    return np.asarray(sample, dtype=np.float32)
+
+def migrate(
+    vector_store: "VectorStore",
+    target_dim: int,
+    namespace: Optional[str] = None,
+    method: str = "pca",
+    sample_size: int = 10000
+) -> dict:
+    """Fit a projection for a namespace and rewrite its stored vectors with it."""
+    if method not in SUPPORTED_METHODS:
+        raise ValueError(f"Unsupported method: {method}. Use one of: {', '.join(SUPPORTED_METHODS)}")
+    if vector_store.get_projection(namespace) is not None:
+        raise ValueError("Namespace is already projected; re-embed it to change the projection")
+    
+    sample = sample_embeddings(vector_store, namespace, sample_size)
+    if len(sample) == 0:
+        raise ValueError("Namespace has no embeddings to project")
+    
+    embedding_model = vector_store.get_embedding_model(namespace)
+    if method == "pca":
+        projection = fit_pca(sample, target_dim, embedding_model)
+    else:
+        projection = truncation(sample.shape[1], target_dim, embedding_model)
+    
+    # Share of the sample's energy the projection keeps
+    kept = np.linalg.norm(sample @ projection.components.T) ** 2 / np.linalg.norm(sample) ** 2
+    
+    rewritten = vector_store.apply_projection(projection, namespace=namespace)
+    vector_store.set_projection(projection, namespace=namespace)
+    return {**projection.info(), "chunks": rewritten, "sample_size": len(sample), "energy_kept": float(kept)}
+
+def main():
+    parser = argparse.ArgumentParser(description="Shrink stored embeddings with a fitted projection")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    
+    migrate_parser = subparsers.add_parser("migrate", help="Fit a projection and rewrite a namespace with it")
+    migrate_parser.add_argument("--dim", type=int, required=True)
+    migrate_parser.add_argument("--namespace", default=None)
+    migrate_parser.add_argument("--method", choices=SUPPORTED_METHODS, default="pca")
+    migrate_parser.add_argument("--sample", type=int, default=settings.PROJECTION_SAMPLE_SIZE)
+    
+    info_parser = subparsers.add_parser("info", help="Show the projection of a namespace")
+    info_parser.add_argument("--namespace", default=None)
+    
+    args = parser.parse_args()
+    
+    from app.vector_store import create_vector_store
+    
+    # Stored vectors are transformed directly, so no embedding model is loaded
+    vector_store = create_vector_store(embedding_service=None)
+    try:
+        if args.command == "migrate":
+            result = migrate(vector_store, args.dim, namespace=args.namespace, method=args.method, sample_size=args.sample)
+            print(
+                f"Projected {result['chunks']} chunks from {result['source_dim']} to {result['target_dim']} dimensions "
+                f"({result['method']}, {result['energy_kept']:.1%} of the sample's energy kept)"
+            )
+        else:
+            projection = vector_store.get_projection(args.namespace)
+            print(projection.info() if projection is not None else "No projection")
+    finally:
+        vector_store.close()
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -1,12 +1,39 @@
 import time
 import os
-from typing import List, Dict, Any, Optional
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Dict, Any, Optional, Iterator, Union
 from datetime import datetime
 from app.document_processor import DocumentProcessor
 from app.embedding_service import EmbeddingService
-from app.vector_store import VectorStore
-from app.llm_service import LLMService
+from app.vector_store import create_vector_store, resolve_namespace, tag_key
+from app.llm_service import create_llm_service
 from app.config import settings
+from app.profiling import stage
+from app.resource_manager import resource_manager
+from app.residency import residency_manager
+from app.reindex import Reindexer
+from app.extractive import ExtractiveAnswerer
+
+def build_document_metadata(
+    filename: str,
+    content_hash: Optional[str] = None,
+    tags: Optional[List[str]] = None
+) -> Dict[str, Any]:
+    """Metadata recorded on every chunk of an uploaded document.
+    
+    The file type, upload time and tags let searches be filtered on them.
+    """
+    metadata = {
+        "file_type": os.path.splitext(filename)[1].lower(),
+        "upload_timestamp": time.time()
+    }
+    if content_hash:
+        metadata["content_hash"] = content_hash
+    if tags:
+        metadata["tags"] = ",".join(tags)
+        for tag in tags:
+            metadata[tag_key(tag)] = True
+    return metadata
 
 class RAGService:
     """Main RAG service that orchestrates all components."""
@@ -15,41 +42,87 @@ class RAGService:
         """Initialize all RAG components."""
         self.document_processor = DocumentProcessor()
         self.embedding_service = EmbeddingService()
-        self.vector_store = VectorStore(self.embedding_service)
-        self.llm_service = LLMService()
+        self.vector_store = create_vector_store(self.embedding_service)
+        self.llm_service = create_llm_service()
+        self.reindexer = Reindexer(self.vector_store)
+        self.extractive = ExtractiveAnswerer(self.vector_store.embed_texts)
         
         # Create necessary directories
         settings.create_directories()
     
-    def upload_document(self, file_path: str) -> Dict[str, Any]:
-        """Upload and process a document."""
+    def upload_document(
+        self,
+        file_path: str,
+        namespace: Optional[str] = None,
+        filename: Optional[str] = None,
+        content_hash: Optional[str] = None,
+        tags: Optional[List[str]] = None
+    ) -> Dict[str, Any]:
+        """Upload and process a document stored on disk."""
+        filename = filename or (os.path.basename(file_path) if file_path else "unknown")
         try:
-            start_time = time.time()
-            
-            # Get file info
-            filename = os.path.basename(file_path)
             file_size = os.path.getsize(file_path)
+        except OSError:
+            file_size = 0
+        return self._upload(file_path, filename, file_size, namespace, content_hash, tags)
+    
+    def upload_document_bytes(
+        self,
+        data: bytes,
+        filename: str,
+        namespace: Optional[str] = None,
+        content_hash: Optional[str] = None,
+        tags: Optional[List[str]] = None
+    ) -> Dict[str, Any]:
+        """Upload and process a document held in memory."""
+        return self._upload(data, filename, len(data), namespace, content_hash, tags)
+    
+    def _upload(
+        self,
+        source: Union[str, bytes],
+        filename: str,
+        file_size: int,
+        namespace: Optional[str],
+        content_hash: Optional[str],
+        tags: Optional[List[str]]
+    ) -> Dict[str, Any]:
+        """Process a document from a path or bytes and add its chunks to the vector store."""
+        try:
+            start_time = time.time()
             
             # Process document
-            chunks = self.document_processor.process_document(file_path)
+            resource_manager.yield_to_interactive()
+            with resource_manager.extraction_slot():
+                processed = self.document_processor.process_source(source, filename)
+            chunks = processed["chunks"]
+            
+            document_metadata = build_document_metadata(filename, content_hash, tags)
+            for chunk in chunks:
+                chunk["metadata"].update(document_metadata)
             
             # Add to vector store
-            self.vector_store.add_documents(chunks)
+            duplicates_suppressed = self.vector_store.add_documents(
+                chunks, namespace=namespace, source_text=processed["text"]
+            )
             
             processing_time = time.time() - start_time
             
             return {
                 "filename": filename,
+                "namespace": resolve_namespace(namespace),
                 "status": "success",
                 "message": f"Document processed successfully in {processing_time:.2f}s",
                 "chunks_processed": len(chunks),
+                "duplicates_suppressed": duplicates_suppressed,
                 "file_size": file_size,
+                "content_hash": content_hash,
+                "tags": tags or [],
                 "processing_time": processing_time
             }
             
         except Exception as e:
             return {
-                "filename": os.path.basename(file_path) if file_path else "unknown",
+                "filename": filename,
                 "status": "error",
                 "message": str(e),
                 "chunks_processed": 0,
@@ -57,75 +130,253 @@ class RAGService:
                 "processing_time": 0
             }
     
-    def ask_question(self, question: str, top_k: int = 5) -> Dict[str, Any]:
-        """Ask a question and get an answer using RAG."""
+    def ask_question(
+        self,
+        question: str,
+        top_k: int = 5,
+        namespace: Optional[str] = None,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """Ask a question and get an answer using RAG.
+        
+        filters restrict retrieval to matching chunks (see build_where).
+        """
         try:
             start_time = time.time()
             
-            # Search for relevant documents
-            search_results = self.vector_store.search(question, top_k)
-            
-            if not search_results:
-                return {
-                    "question": question,
-                    "answer": "I don't have any relevant documents to answer your question. Please upload some documents first.",
-                    "sources": [],
-                    "confidence": 0.0,
-                    "processing_time": time.time() - start_time
-                }
-            
-            # Generate answer using LLM
-            answer = self.llm_service.generate_answer(question, search_results)
-            
-            # Calculate confidence based on search scores
-            avg_confidence = sum(result["score"] for result in search_results) / len(search_results)
-            
-            # Format sources
-            sources = []
-            for result in search_results:
-                source = {
-                    "filename": result["metadata"]["filename"],
-                    "chunk_id": result["metadata"]["chunk_id"],
-                    "text": result["text"][:200] + "..." if len(result["text"]) > 200 else result["text"],
-                    "score": result["score"]
-                }
-                sources.append(source)
-            
-            processing_time = time.time() - start_time
-            
+            with resource_manager.interactive():
+                # Search for relevant documents
+                search_results = self.vector_store.search(question, top_k, namespace=namespace, filters=filters)
+                
+                return self._answer_from_results(question, search_results, start_time, namespace)
+                
+        except Exception as e:
             return {
                 "question": question,
-                "answer": answer,
-                "sources": sources,
-                "confidence": avg_confidence,
-                "processing_time": processing_time
+                "answer": f"Error processing your question: {str(e)}",
+                "sources": [],
+                "confidence": 0.0,
+                "processing_time": time.time() - start_time
             }
-            
+    
+    def ask_questions_batch(
+        self,
+        questions: List[str],
+        top_k: int = 5,
+        namespace: Optional[str] = None,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """Answer many questions, returning an iterator over results as they complete.
+        
+        All questions are embedded in one call and retrieved with one vectorized
+        collection query before this returns, so retrieval errors surface here.
+        Questions that normalize to the same text and retrieve the same chunks
+        share a single LLM generation. Generation runs on at most
+        BATCH_MAX_CONCURRENCY threads. Each result carries the "index" of its
+        question in the request.
+        """
+        start_time = time.time()
+        
+        # Retrieve contexts for the whole batch at once
+        all_search_results = self.vector_store.search_batch(questions, top_k, namespace=namespace, filters=filters)
+        
+        # Group questions with identical (question, retrieved chunks) pairs
+        groups: Dict[Any, List[int]] = {}
+        for index, (question, search_results) in enumerate(zip(questions, all_search_results)):
+            key = (
+                " ".join(question.lower().split()),
+                tuple(result["id"] for result in search_results)
+            )
+            groups.setdefault(key, []).append(index)
+        
+        return self._iter_batch_answers(questions, all_search_results, list(groups.values()), start_time, namespace)
+    
+    def _iter_batch_answers(
+        self,
+        questions: List[str],
+        all_search_results: List[List[Dict[str, Any]]],
+        groups: List[List[int]],
+        start_time: float,
+        namespace: Optional[str] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """Generate answers for grouped questions, yielding them in completion order."""
+        def answer_group(indices: List[int]) -> Dict[str, Any]:
+            first = indices[0]
+            return self._answer_from_results(questions[first], all_search_results[first], start_time, namespace)
+        
+        executor = ThreadPoolExecutor(max_workers=max(settings.BATCH_MAX_CONCURRENCY, 1))
+        try:
+            futures = {executor.submit(answer_group, indices): indices for indices in groups}
+            for future in as_completed(futures):
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = {
+                        "answer": f"Error processing your question: {str(e)}",
+                        "sources": [],
+                        "confidence": 0.0,
+                        "processing_time": time.time() - start_time,
+                        "error": True
+                    }
+                for index in futures[future]:
+                    yield {**result, "index": index, "question": questions[index]}
+        finally:
+            # Stop pending generations if the consumer goes away early
+            executor.shutdown(wait=False, cancel_futures=True)
+    
+    def _extract_answer(self, question: str, search_results: List[Dict[str, Any]], namespace: Optional[str]) -> Optional[str]:
+        """Answer with sentences of the top chunks when retrieval is decisive, else None."""
+        if not settings.EXTRACTIVE_ANSWERS_ENABLED:
+            return None
+        extract_start = time.perf_counter()
+        try:
+            with stage("extractive_answer"):
+                answer = self.extractive.answer(question, search_results, namespace)
         except Exception as e:
+            # The LLM can still answer
+            print(f"Error extracting answer: {str(e)}")
+            return None
+        if answer is not None:
+            self.extractive.record_extractive(time.perf_counter() - extract_start)
+        return answer
+    
+    def _answer_from_results(
+        self,
+        question: str,
+        search_results: List[Dict[str, Any]],
+        start_time: float,
+        namespace: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Answer a question from its retrieved chunks, extractively or with the LLM."""
+        if not search_results:
             return {
                 "question": question,
-                "answer": f"Error processing your question: {str(e)}",
+                "answer": "I don't have any relevant documents to answer your question. Please upload some documents first.",
                 "sources": [],
                 "confidence": 0.0,
                 "processing_time": time.time() - start_time
             }
+        
+        answer = self._extract_answer(question, search_results, namespace)
+        answer_type = "extractive" if answer is not None else "generated"
+        if answer is None:
+            # Generate answer using LLM
+            generation_start = time.perf_counter()
+            with stage("generation"):
+                answer = self.llm_service.generate_answer(question, search_results)
+            self.extractive.record_generation(
+                time.perf_counter() - generation_start, declined=settings.EXTRACTIVE_ANSWERS_ENABLED
+            )
+        
+        # Calculate confidence based on search scores
+        avg_confidence = sum(result["score"] for result in search_results) / len(search_results)
+        
+        # Format sources
+        sources = self._format_sources(search_results)
+        
+        processing_time = time.time() - start_time
+        
+        return {
+            "question": question,
+            "answer": answer,
+            "sources": sources,
+            "confidence": avg_confidence,
+            "processing_time": processing_time,
+            "answer_type": answer_type
+        }
+    
+    def _format_sources(self, search_results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Format retrieved chunks as answer sources."""
+        sources = []
+        for result in search_results:
+            source = {
+                "filename": result["metadata"]["filename"],
+                "chunk_id": result["metadata"]["chunk_id"],
+                "text": result["text"][:200] + "..." if len(result["text"]) > 200 else result["text"],
+                "score": result["score"]
+            }
+            if "near_duplicates" in result["metadata"]:
+                source["near_duplicates"] = result["metadata"]["near_duplicates"]
+            sources.append(source)
+        return sources
     
-    def get_documents(self) -> List[Dict[str, Any]]:
+    def ask_question_stream(
+        self,
+        question: str,
+        top_k: int = 5,
+        namespace: Optional[str] = None,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """Ask a question, returning an iterator over answer events.
+        
+        Retrieval runs before this returns, so its errors surface here. The
+        iterator yields a "sources" event, then "token" events as the LLM
+        generates text, then a "done" event with the processing time.
+        """
+        start_time = time.time()
+        with resource_manager.interactive():
+            search_results = self.vector_store.search(question, top_k, namespace=namespace, filters=filters)
+        return self._iter_answer_events(question, search_results, start_time, namespace)
+    
+    def _iter_answer_events(
+        self,
+        question: str,
+        search_results: List[Dict[str, Any]],
+        start_time: float,
+        namespace: Optional[str] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """Stream the answer for a question from its retrieved chunks.
+        
+        An extractive answer arrives as a single "token" event.
+        """
+        if not search_results:
+            yield {"type": "sources", "question": question, "sources": [], "confidence": 0.0}
+            yield {
+                "type": "token",
+                "text": "I don't have any relevant documents to answer your question. Please upload some documents first."
+            }
+        else:
+            avg_confidence = sum(result["score"] for result in search_results) / len(search_results)
+            with resource_manager.interactive():
+                answer = self._extract_answer(question, search_results, namespace)
+            yield {
+                "type": "sources",
+                "question": question,
+                "sources": self._format_sources(search_results),
+                "confidence": avg_confidence,
+                "answer_type": "extractive" if answer is not None else "generated"
+            }
+            try:
+                if answer is not None:
+                    yield {"type": "token", "text": answer}
+                else:
+                    with resource_manager.interactive():
+                        for piece in self.llm_service.stream_answer(question, search_results):
+                            yield {"type": "token", "text": piece}
+            except Exception as e:
+                yield {"type": "error", "message": str(e)}
+        
+        yield {"type": "done", "processing_time": time.time() - start_time}
+    
+    def get_documents(self, namespace: Optional[str] = None) -> List[Dict[str, Any]]:
         """Get list of uploaded documents."""
         try:
-            filenames = self.vector_store.list_filenames()
+            filenames = self.vector_store.list_filenames(namespace=namespace)
             documents = []
             
             for filename in filenames:
                 # Get document chunks
-                chunks = self.vector_store.get_documents_by_filename(filename)
+                chunks = self.vector_store.get_documents_by_filename(filename, namespace=namespace)
                 
                 # Calculate total size (approximate)
                 total_size = sum(len(chunk["text"]) for chunk in chunks)
                 
+                # Documents uploaded before upload times were recorded have none
+                timestamps = [chunk["metadata"]["upload_timestamp"] for chunk in chunks if "upload_timestamp" in chunk["metadata"]]
+                
                 document_info = {
                     "filename": filename,
-                    "upload_date": datetime.now(),  # This would need to be stored in metadata
+                    "upload_date": datetime.fromtimestamp(min(timestamps)) if timestamps else datetime.now(),
                     "file_size": total_size,
                     "chunks_count": len(chunks),
                     "file_type": os.path.splitext(filename)[1].lower()
@@ -138,10 +389,10 @@ class RAGService:
             print(f"Error getting documents: {str(e)}")
             return []
     
-    def delete_document(self, filename: str) -> Dict[str, Any]:
+    def delete_document(self, filename: str, namespace: Optional[str] = None) -> Dict[str, Any]:
         """Delete a document from the vector store."""
         try:
-            self.vector_store.delete_documents_by_filename(filename)
+            self.vector_store.delete_documents_by_filename(filename, namespace=namespace)
             
             return {
                 "filename": filename,
@@ -156,25 +407,79 @@ class RAGService:
                 "message": str(e)
             }
     
+    def start_reindex(self, embedding_model: str, namespace: Optional[str] = None) -> Dict[str, Any]:
+        """Start re-embedding a namespace into a new index version in the background."""
+        return self.reindexer.start(embedding_model, namespace=namespace).get_status()
+    
+    def get_reindex_status(self, namespace: Optional[str] = None) -> Dict[str, Any]:
+        """Progress of re-embedding jobs and the index versions of a namespace."""
+        return {
+            "jobs": self.reindexer.get_status(),
+            "indexes": self.vector_store.get_index_versions(namespace)
+        }
+    
+    def close(self) -> None:
+        """Release background resources held by the components."""
+        self.reindexer.stop()
+        self.document_processor.close()
+        self.vector_store.close()
+        self.embedding_service.close()
+        self.llm_service.close()
+        residency_manager.stop()
+    
+    def get_catalog_version(self, namespace: Optional[str] = None) -> str:
+        """Get the version token of a namespace's document catalog."""
+        return self.vector_store.get_catalog_version(namespace)
+    
+    def get_status_version(self) -> str:
+        """Get a token that changes with the slow-moving parts of the system status.
+        
+        It covers the models in use and the catalog and index versions of
+        every open namespace, not live counters such as memory or queue sizes.
+        """
+        parts = [settings.EMBEDDING_MODEL, settings.LLM_BACKEND, settings.LLM_MODEL_PATH]
+        for namespace in self.vector_store.get_open_namespaces():
+            parts.append(f"{namespace}={self.vector_store.get_catalog_version(namespace)}")
+            parts.extend(
+                f"v{entry['version']}:{entry['state']}:{entry['embedding_model']}"
+                for entry in self.vector_store.get_index_versions(namespace)
+            )
+        return "|".join(parts)
+    
     def get_system_status(self) -> Dict[str, Any]:
         """Get system status and component information."""
         return {
             "embedding_service": {
                 "model": settings.EMBEDDING_MODEL,
                 "device": settings.EMBEDDING_DEVICE,
-                "status": "loaded"
+                "status": "loaded" if self.embedding_service.residency.resident else "unloaded"
             },
             "vector_store": {
                 "type": "ChromaDB",
+                "shards": settings.VECTOR_STORE_SHARDS,
                 "collection": settings.CHROMA_COLLECTION_NAME,
                 "document_count": self.vector_store.get_document_count(),
+                "open_namespaces": self.vector_store.get_open_namespaces(),
+                "chunk_store": self.vector_store.get_chunk_store_stats(),
+                "retrieval_mode": settings.RETRIEVAL_MODE,
+                "near_duplicates": self.vector_store.get_near_duplicate_stats(),
+                "indexes": self.vector_store.get_index_versions(),
+                "write_buffer": self.vector_store.get_write_buffer_stats(),
                 "status": "ready"
             },
+            "reindex": self.reindexer.get_status(),
+            "extractive_answers": self.extractive.get_stats(),
             "llm_service": {
+                "backend": settings.LLM_BACKEND,
                 "model_path": settings.LLM_MODEL_PATH,
                 "model_type": settings.LLM_MODEL_TYPE,
-                "status": "loaded" if self.llm_service.is_available() else "not_loaded"
+                "status": (
+                    "not_loaded" if not self.llm_service.is_available()
+                    else "loaded" if self.llm_service.model else "unloaded"
+                )
             },
+            "resources": resource_manager.get_status(),
+            "residency": residency_manager.get_status(),
             "document_processor": {
                 "chunk_size": settings.CHUNK_SIZE,
                 "chunk_overlap": settings.CHUNK_OVERLAP,
@@ -0,0 +1,268 @@
+"""
+Background re-embedding of a namespace into a new index version.
+
+A ReindexJob builds the next index version of a namespace with another
+embedding model while the active version keeps serving searches:
+
+1. a building version is registered and its collection created
+2. the stored chunks are copied over in batches, their texts re-embedded
+   with the new model; uploads and deletes made meanwhile are applied to
+   both versions
+3. a reconciliation pass re-copies chunks that changed during the copy and
+   drops ones deleted from the active version
+4. the new version is activated in one registry transaction; the previous
+   one is kept as retired unless REINDEX_KEEP_PREVIOUS is off
+
+The copy yields to questions being answered between batches and is limited
+to REINDEX_MAX_CHUNKS_PER_SEC. Run it through POST /admin/reindex or:
+
+    python -m app.reindex run --model MODEL [--namespace NS] [--batch-size 256]
+    python -m app.reindex list [--namespace NS]
+"""
+
+import argparse
+import threading
+import time
+from typing import Any, Dict, List, Optional
+from app.config import settings
+from app.index_registry import STALE_BUILD_SECONDS
+from app.resource_manager import resource_manager
+from app.vector_store import resolve_namespace
+
+class ReindexJob:
+    """Re-embeds one namespace into a new index version and switches to it."""
+    
+    def __init__(
+        self,
+        vector_store,
+        namespace: Optional[str],
+        embedding_model: str,
+        batch_size: Optional[int] = None,
+        max_chunks_per_sec: Optional[float] = None
+    ):
+        self.vector_store = vector_store
+        self.namespace = resolve_namespace(namespace)
+        self.embedding_model = embedding_model
+        self.batch_size = batch_size or settings.REINDEX_BATCH_SIZE
+        self.max_chunks_per_sec = settings.REINDEX_MAX_CHUNKS_PER_SEC if max_chunks_per_sec is None else max_chunks_per_sec
+        self.state = "pending"
+        self.version = None
+        self.total = 0
+        self.done = 0
+        self.reconciled = 0
+        self.error = None
+        self.started_at = None
+        self.finished_at = None
+        self._cancel = threading.Event()
+        self._thread = None
+    
+    def start(self) -> None:
+        """Run the job in a background thread."""
+        self._thread = threading.Thread(target=self.run, name=f"reindex-{self.namespace}", daemon=True)
+        self._thread.start()
+    
+    def cancel(self) -> None:
+        """Stop the job after its current batch; the active version is left untouched."""
+        self._cancel.set()
+        if self._thread is not None:
+            self._thread.join()
+    
+    def run(self) -> None:
+        """Build, fill and activate the new version."""
+        self.started_at = time.time()
+        self.state = "copying"
+        building = None
+        try:
+            registry = self.vector_store.registry
+            stale = registry.get(self.namespace, "building")
+            if stale is not None and time.time() - (stale["heartbeat_at"] or 0) > STALE_BUILD_SECONDS:
+                # Left behind by a job that died; start over
+                self.vector_store.drop_index_version(self.namespace, stale["version"])
+            
+            prefix = self.vector_store._base_collection_name(self.namespace)
+            building = registry.create_version(self.namespace, prefix, self.embedding_model)
+            self.version = building["version"]
+            target = self.vector_store.client.get_or_create_collection(
+                name=building["collection"],
+                metadata={"hnsw:space": "cosine", "namespace": self.namespace, "embedding_model": self.embedding_model}
+            )
+            embedder = self.vector_store.embedding_service_for(self.embedding_model)
+            
+            self.total = self.vector_store.get_document_count(self.namespace)
+            offset = 0
+            while not self._cancel.is_set():
+                batch = self.vector_store.get_chunks(namespace=self.namespace, offset=offset, limit=self.batch_size)
+                if not batch["ids"]:
+                    break
+                self._copy(target, embedder, batch["ids"], batch["texts"], batch["metadatas"])
+                offset += len(batch["ids"])
+                self.done = offset
+            
+            if not self._cancel.is_set():
+                self.state = "reconciling"
+                self._reconcile(target, embedder)
+            if self._cancel.is_set():
+                self.vector_store.drop_index_version(self.namespace, self.version)
+                self.state = "cancelled"
+                return
+            
+            self.state = "switching"
+            self.vector_store.activate_index_version(self.namespace, self.version)
+            self.state = "completed"
+            print(f"Namespace '{self.namespace}' now served by index version {self.version} ({self.embedding_model})")
+            
+        except Exception as e:
+            self.state = "failed"
+            self.error = str(e)
+            print(f"Error re-embedding namespace '{self.namespace}': {str(e)}")
+            active = self.vector_store.registry.get(self.namespace)
+            # A switch that failed after activating leaves the new version serving
+            if building is not None and (active is None or active["version"] != building["version"]):
+                self.vector_store.registry.update(self.namespace, building["version"], state="failed")
+                try:
+                    # Don't leave the half-built collection on disk until the next job
+                    self.vector_store.drop_index_version(self.namespace, building["version"])
+                except Exception as drop_error:
+                    print(f"Error dropping index version {building['version']}: {str(drop_error)}")
+        finally:
+            self.finished_at = time.time()
+    
+    def _copy(self, target, embedder, ids: List[str], texts: List[str], metadatas: List[Dict[str, Any]]) -> None:
+        """Re-embed one batch of chunks into the new version, within the throughput limit."""
+        start = time.perf_counter()
+        resource_manager.yield_to_interactive()
+        embeddings = embedder.generate_embeddings(self.vector_store._hydrate_texts(texts, metadatas, self.namespace))
+        # Texts kept in the chunk store stay there; only the vectors change
+        target.upsert(ids=ids, embeddings=embeddings, documents=texts, metadatas=metadatas)
+        self.vector_store.registry.update(
+            self.namespace, self.version, dimension=len(embeddings[0]), heartbeat_at=time.time()
+        )
+        
+        if self.max_chunks_per_sec > 0:
+            remaining = len(ids) / self.max_chunks_per_sec - (time.perf_counter() - start)
+            if remaining > 0:
+                self._cancel.wait(remaining)
+    
+    def _reconcile(self, target, embedder) -> None:
+        """Bring chunks that changed while they were being copied up to date."""
+        # Buffered uploads have already reached the new version; let them reach the active one too
+        self.vector_store.flush_writes()
+        self.vector_store.registry.update(self.namespace, self.version, heartbeat_at=time.time())
+        source = self.vector_store._get_collection(self.namespace)
+        source_chunks = source.get(include=["documents", "metadatas"]) if source is not None else {"ids": []}
+        target_chunks = target.get(include=["metadatas"])
+        target_metadatas = dict(zip(target_chunks["ids"], target_chunks["metadatas"]))
+        
+        stale = [
+            i for i, chunk_id in enumerate(source_chunks["ids"])
+            if target_metadatas.get(chunk_id) != source_chunks["metadatas"][i]
+        ]
+        for start in range(0, len(stale), self.batch_size):
+            positions = stale[start:start + self.batch_size]
+            self._copy(
+                target,
+                embedder,
+                [source_chunks["ids"][i] for i in positions],
+                [source_chunks["documents"][i] or "" for i in positions],
+                [source_chunks["metadatas"][i] for i in positions]
+            )
+        
+        removed = sorted(set(target_metadatas) - set(source_chunks["ids"]))
+        if removed:
+            target.delete(ids=removed)
+        self.reconciled = len(stale) + len(removed)
+    
+    def get_status(self) -> Dict[str, Any]:
+        elapsed = (self.finished_at or time.time()) - self.started_at if self.started_at else 0.0
+        rate = self.done / elapsed if elapsed else 0.0
+        return {
+            "namespace": self.namespace,
+            "embedding_model": self.embedding_model,
+            "version": self.version,
+            "state": self.state,
+            "done": self.done,
+            "total": self.total,
+            "reconciled": self.reconciled,
+            "chunks_per_sec": round(rate, 1),
+            "eta_seconds": round((self.total - self.done) / rate, 1) if rate and self.state == "copying" else None,
+            "max_chunks_per_sec": self.max_chunks_per_sec,
+            "error": self.error
+        }
+
+class Reindexer:
+    """Starts re-embedding jobs and keeps the latest one of every namespace for status."""
+    
+    def __init__(self, vector_store):
+        self.vector_store = vector_store
+        self._jobs: Dict[str, ReindexJob] = {}
+        self._lock = threading.Lock()
+    
+    def start(self, embedding_model: str, namespace: Optional[str] = None) -> ReindexJob:
+        if settings.VECTOR_STORE_SHARDS > 1:
+            raise ValueError("Re-embedding is not supported with VECTOR_STORE_SHARDS > 1")
+        namespace = resolve_namespace(namespace)
+        if not self.vector_store.has_namespace(namespace):
+            raise ValueError(f"Namespace '{namespace}' has no documents")
+        with self._lock:
+            running = self._jobs.get(namespace)
+            if running is not None and running.finished_at is None:
+                raise ValueError(f"Namespace '{namespace}' is already being re-embedded")
+            job = ReindexJob(self.vector_store, namespace, embedding_model)
+            self._jobs[namespace] = job
+        job.start()
+        return job
+    
+    def stop(self) -> None:
+        """Cancel running jobs."""
+        with self._lock:
+            jobs = list(self._jobs.values())
+        for job in jobs:
+            if job.finished_at is None:
+                job.cancel()
+    
+    def get_status(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [job.get_status() for job in self._jobs.values()]
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-embed a namespace into a new index version")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    
+    run_parser = subparsers.add_parser("run", help="Re-embed a namespace with another model and switch to it")
+    run_parser.add_argument("--model", required=True, help="SentenceTransformers model name")
+    run_parser.add_argument("--namespace", default=None)
+    run_parser.add_argument("--batch-size", type=int, default=None)
+    run_parser.add_argument("--max-chunks-per-sec", type=float, default=0, help="0 = unlimited")
+    
+    list_parser = subparsers.add_parser("list", help="Show the index versions of a namespace")
+    list_parser.add_argument("--namespace", default=None)
+    
+    args = parser.parse_args()
+    
+    from app.vector_store import create_vector_store
+    
+    # Models are loaded on demand, for the namespace's current one and the new one
+    vector_store = create_vector_store(embedding_service=None)
+    try:
+        if args.command == "list":
+            for entry in vector_store.get_index_versions(args.namespace):
+                print(
+                    f"v{entry['version']} {entry['state']:<8} {entry['collection']} "
+                    f"{entry['embedding_model']} dim={entry['dimension']}"
+                )
+            return
+        
+        job = ReindexJob(vector_store, args.namespace, args.model, args.batch_size, args.max_chunks_per_sec)
+        job.run()
+        status = job.get_status()
+        print(
+            f"{status['state']}: {status['done']} chunks re-embedded, {status['reconciled']} reconciled, "
+            f"{status['chunks_per_sec']} chunks/s"
+        )
+        if status["error"]:
+            raise SystemExit(status["error"])
+    finally:
+        vector_store.close()
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
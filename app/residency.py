@@ -0,0 +1,174 @@
+import contextlib
+import gc
+import threading
+import time
+from typing import Callable, Dict, Any, Optional
+from app.config import settings
+
+def available_memory_bytes() -> Optional[int]:
+    """MemAvailable from /proc/meminfo, or None where it cannot be read."""
+    try:
+        with open("/proc/meminfo") as meminfo:
+            for line in meminfo:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+class ModelResidency:
+    """Load state of one model that may be unloaded while idle and reloaded on demand.
+    
+    Callers wrap every use of the model in acquire(), which reloads it first
+    if it was unloaded. A model is only unloaded while nobody holds it.
+    """
+    
+    def __init__(
+        self,
+        name: str,
+        load: Callable[[], None],
+        unload: Callable[[], None],
+        idle_timeout: float = 0,
+        evict_under_pressure: bool = True
+    ):
+        self.name = name
+        self._load = load
+        self._unload = unload
+        self.idle_timeout = idle_timeout
+        self.evict_under_pressure = evict_under_pressure
+        self._lock = threading.Lock()
+        self._in_use = 0
+        self.resident = True
+        self.last_used = time.monotonic()
+        self.reloads = 0
+        self.reload_seconds = 0.0
+        self.evictions = {"idle": 0, "memory_pressure": 0}
+    
+    @contextlib.contextmanager
+    def acquire(self):
+        """Hold the model for the duration of the block, reloading it if needed."""
+        with self._lock:
+            if not self.resident:
+                start = time.perf_counter()
+                print(f"Reloading {self.name} model")
+                self._load()
+                self.resident = True
+                self.reloads += 1
+                self.reload_seconds += time.perf_counter() - start
+            self._in_use += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._in_use -= 1
+                self.last_used = time.monotonic()
+    
+    def idle_seconds(self) -> float:
+        return 0.0 if self._in_use else time.monotonic() - self.last_used
+    
+    def evict(self, reason: str) -> bool:
+        """Unload the model unless it is in use or already unloaded; returns whether it was unloaded."""
+        with self._lock:
+            if not self.resident or self._in_use:
+                return False
+            print(f"Unloading {self.name} model ({reason.replace('_', ' ')})")
+            self._unload()
+            self.resident = False
+            self.evictions[reason] += 1
+        # Drop the freed weights now rather than at the next collection
+        gc.collect()
+        return True
+    
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            "state": "resident" if self.resident else "unloaded",
+            "in_use": self._in_use,
+            "idle_seconds": round(self.idle_seconds(), 1),
+            "idle_timeout": self.idle_timeout,
+            "reloads": self.reloads,
+            "reload_seconds": round(self.reload_seconds, 3),
+            "evictions": dict(self.evictions)
+        }
+
+class ResidencyManager:
+    """Unloads idle models and, when memory runs low, the least recently used ones.
+    
+    A daemon thread checks every RESIDENCY_CHECK_INTERVAL seconds. A model is
+    unloaded once it has been idle for its idle_timeout (0 = never), and while
+    MemAvailable is below MEMORY_LOW_WATERMARK_MB (0 = off) idle models that
+    allow it are unloaded, least recently used first.
+    """
+    
+    def __init__(self):
+        self._residencies: Dict[str, ModelResidency] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+    
+    def register(
+        self,
+        name: str,
+        load: Callable[[], None],
+        unload: Callable[[], None],
+        idle_timeout: float = 0,
+        evict_under_pressure: bool = True
+    ) -> ModelResidency:
+        """Track a loaded model; starts the reaper when there is a policy to enforce."""
+        residency = ModelResidency(name, load, unload, idle_timeout, evict_under_pressure)
+        with self._lock:
+            self._residencies[name] = residency
+            if (idle_timeout > 0 or settings.MEMORY_LOW_WATERMARK_MB > 0) and self._thread is None:
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="model-residency", daemon=True)
+                self._thread.start()
+        return residency
+    
+    def _run(self) -> None:
+        while not self._stop.wait(settings.RESIDENCY_CHECK_INTERVAL):
+            try:
+                self.check()
+            except Exception as e:
+                print(f"Error checking model residency: {str(e)}")
+    
+    def check(self) -> None:
+        """Apply the idle and memory pressure policies once."""
+        with self._lock:
+            residencies = list(self._residencies.values())
+        
+        for residency in residencies:
+            if residency.idle_timeout > 0 and residency.resident and residency.idle_seconds() >= residency.idle_timeout:
+                residency.evict("idle")
+        
+        if settings.MEMORY_LOW_WATERMARK_MB <= 0:
+            return
+        watermark = settings.MEMORY_LOW_WATERMARK_MB * 1024 * 1024
+        candidates = sorted(
+            (r for r in residencies if r.resident and r.evict_under_pressure),
+            key=lambda r: r.last_used
+        )
+        for residency in candidates:
+            available = available_memory_bytes()
+            if available is None or available >= watermark:
+                break
+            residency.evict("memory_pressure")
+    
+    def stop(self) -> None:
+        """Stop the reaper thread."""
+        self._stop.set()
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join()
+    
+    def get_status(self) -> Dict[str, Any]:
+        """Residency of every tracked model, reported in /status."""
+        with self._lock:
+            residencies = dict(self._residencies)
+        available = available_memory_bytes()
+        return {
+            "models": {name: residency.get_status() for name, residency in residencies.items()},
+            "available_memory_mb": available // (1024 * 1024) if available is not None else None,
+            "memory_low_watermark_mb": settings.MEMORY_LOW_WATERMARK_MB
+        }
+
+residency_manager = ResidencyManager()
\ No newline at end of file
@@ -0,0 +1,95 @@
+import contextlib
+import os
+import threading
+import time
+from typing import Dict, Any
+from app.config import settings
+
+class ResourceManager:
+    """CPU budgets for the model runtimes and priority of questions over ingestion.
+    
+    Thread budgets (0 in the settings means derived from CPU_BUDGET):
+        LLM_THREADS            llama.cpp threads
+        QUERY_EMBED_THREADS    torch intra-op threads in the API process
+        INGEST_EMBED_THREADS   threads shared by the bulk encoding processes
+        EXTRACTION_WORKERS     documents extracted at the same time
+        PDF_PAGE_WORKERS       processes sharing the pages of one large PDF
+    
+    torch's thread count is process-wide, so only ingestion that encodes in
+    separate processes (EMBEDDING_WORKERS > 1) gets INGEST_EMBED_THREADS.
+    Ingestion that encodes in the API process (uploads below
+    EMBEDDING_BULK_THRESHOLD chunks, bulk encoding with one worker,
+    re-embedding jobs) shares QUERY_EMBED_THREADS with the questions.
+    
+    Ingestion calls yield_to_interactive() between batches and waits there
+    while any question is being answered, for at most INGEST_MAX_DEFER
+    seconds at a time so a steady stream of questions cannot starve it.
+    """
+    
+    def __init__(self):
+        self.cpu_budget = settings.CPU_BUDGET or os.cpu_count() or 1
+        self.query_embed_threads = settings.QUERY_EMBED_THREADS or max(1, self.cpu_budget // 8)
+        self.ingest_embed_threads = settings.INGEST_EMBED_THREADS or max(1, self.cpu_budget // 4)
+        self.llm_threads = settings.LLM_THREADS or max(
+            1, self.cpu_budget - self.query_embed_threads - self.ingest_embed_threads
+        )
+        self.extraction_workers = max(1, settings.EXTRACTION_WORKERS)
+        self.pdf_page_workers = settings.PDF_PAGE_WORKERS or max(1, self.cpu_budget // 4)
+        
+        self._condition = threading.Condition()
+        self._interactive = 0
+        self._extraction_slots = threading.BoundedSemaphore(self.extraction_workers)
+        self.ingest_deferrals = 0
+        self.ingest_deferred_seconds = 0.0
+    
+    @contextlib.contextmanager
+    def interactive(self):
+        """Mark a question as being answered for the duration of the block."""
+        with self._condition:
+            self._interactive += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._interactive -= 1
+                if self._interactive == 0:
+                    self._condition.notify_all()
+    
+    def yield_to_interactive(self) -> float:
+        """Block ingestion while questions are being answered; returns the seconds waited."""
+        with self._condition:
+            if self._interactive == 0:
+                return 0.0
+            start = time.perf_counter()
+            self._condition.wait_for(lambda: self._interactive == 0, timeout=settings.INGEST_MAX_DEFER)
+            waited = time.perf_counter() - start
+            self.ingest_deferrals += 1
+            self.ingest_deferred_seconds += waited
+            return waited
+    
+    @contextlib.contextmanager
+    def extraction_slot(self):
+        """Limit how many documents are extracted at the same time."""
+        with self._extraction_slots:
+            yield
+    
+    def threads_per_ingest_worker(self, num_workers: int) -> int:
+        """Split the ingest embedding budget between bulk encoding processes."""
+        return max(1, self.ingest_embed_threads // max(1, num_workers))
+    
+    def get_status(self) -> Dict[str, Any]:
+        """Budgets and scheduling counters reported in /status."""
+        return {
+            "cpu_budget": self.cpu_budget,
+            "llm_threads": self.llm_threads,
+            "query_embed_threads": self.query_embed_threads,
+            "ingest_embed_threads": self.ingest_embed_threads,
+            "extraction_workers": self.extraction_workers,
+            "pdf_page_workers": self.pdf_page_workers,
+            "active_questions": self._interactive,
+            "ingest_deferrals": self.ingest_deferrals,
+            "ingest_deferred_seconds": round(self.ingest_deferred_seconds, 3)
+        }
+
+# Global resource manager instance
+resource_manager = ResourceManager()
\ No newline at end of file
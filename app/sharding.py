@@ -0,0 +1,284 @@
+import hashlib
+import multiprocessing
+import os
+import threading
+from typing import List, Dict, Any, Optional, Iterator
+from app.config import settings
+from app.vector_store import VectorStore
+
+def _shard_worker(shard_index: int, persist_directory: str, conn) -> None:
+    """Serve VectorStore calls for one shard until told to stop.
+    
+    Runs in its own process with its own Chroma client rooted at the shard's
+    directory. Requests are (method, args, kwargs) tuples; None stops the loop.
+    """
+    settings.CHROMA_PERSIST_DIRECTORY = persist_directory
+    # Document texts are kept by the parent's chunk store
+    settings.CHUNK_STORE_ENABLED = False
+    # Near-duplicates are filtered by the parent before chunks reach a shard
+    settings.NEAR_DUP_MODE = "off"
+    # Inserts are grouped by the parent's write buffer
+    settings.WRITE_BUFFER_ENABLED = False
+    store = VectorStore(embedding_service=None)
+    
+    while True:
+        try:
+            request = conn.recv()
+        except EOFError:
+            break
+        if request is None:
+            break
+        
+        method, args, kwargs = request
+        try:
+            conn.send(("ok", getattr(store, method)(*args, **kwargs)))
+        except Exception as e:
+            conn.send(("error", f"Shard {shard_index}: {str(e)}"))
+    
+    store.close()
+    conn.close()
+
+class _Shard:
+    """Parent-side handle to one shard process."""
+    
+    def __init__(self, index: int, persist_directory: str):
+        self.index = index
+        context = multiprocessing.get_context("spawn")
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=_shard_worker,
+            args=(index, persist_directory, child_conn),
+            name=f"vector-shard-{index}",
+            daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+        # One request in flight per shard; held from send until the reply is read
+        self.lock = threading.Lock()
+    
+    def send(self, method: str, *args, **kwargs) -> None:
+        self.lock.acquire()
+        try:
+            self.conn.send((method, args, kwargs))
+        except Exception:
+            self.lock.release()
+            raise
+    
+    def receive(self) -> Any:
+        try:
+            status, result = self.conn.recv()
+        finally:
+            self.lock.release()
+        if status == "error":
+            raise Exception(result)
+        return result
+    
+    def call(self, method: str, *args, **kwargs) -> Any:
+        self.send(method, *args, **kwargs)
+        return self.receive()
+    
+    def stop(self) -> None:
+        with self.lock:
+            try:
+                self.conn.send(None)
+            except Exception:
+                pass
+        self.process.join(timeout=10)
+        if self.process.is_alive():
+            self.process.terminate()
+
+class ShardedVectorStore(VectorStore):
+    """Vector store that spreads chunks over VECTOR_STORE_SHARDS local processes.
+    
+    Every document lives on the shard picked by the hash of its filename, so
+    per-document reads and deletions go to a single shard. Searches send the
+    query embeddings to every shard in parallel and merge the per-shard top-k
+    by score. Embeddings are computed in this process; shards only store and
+    search vectors.
+    """
+    
+    def __init__(self, embedding_service, num_shards: Optional[int] = None):
+        self.num_shards = num_shards or settings.VECTOR_STORE_SHARDS
+        self.shards: List[_Shard] = []
+        super().__init__(embedding_service)
+    
+    def _initialize_chroma(self):
+        """Start the shard processes instead of a local Chroma client."""
+        try:
+            for index in range(self.num_shards):
+                persist_directory = os.path.join(settings.CHROMA_PERSIST_DIRECTORY, f"shard-{index}")
+                self.shards.append(_Shard(index, persist_directory))
+            
+            print(f"Sharded vector store started with {self.num_shards} shards")
+            
+        except Exception as e:
+            self.close()
+            raise Exception(f"Error starting vector store shards: {str(e)}")
+    
+    def shard_for(self, filename: str) -> _Shard:
+        """Get the shard that owns a document."""
+        digest = hashlib.blake2b(filename.encode("utf-8"), digest_size=8).digest()
+        return self.shards[int.from_bytes(digest, "big") % self.num_shards]
+    
+    def _broadcast(self, method: str, *args, **kwargs) -> List[Any]:
+        """Call a method on every shard in parallel and collect the results in shard order."""
+        sent = []
+        try:
+            for shard in self.shards:
+                shard.send(method, *args, **kwargs)
+                sent.append(shard)
+        finally:
+            results = []
+            errors = []
+            for shard in sent:
+                try:
+                    results.append(shard.receive())
+                except Exception as e:
+                    errors.append(str(e))
+        if errors:
+            raise Exception("; ".join(errors))
+        return results
+    
+    def add_embeddings(
+        self,
+        ids: List[str],
+        embeddings: List[List[float]],
+        texts: List[str],
+        metadatas: List[Dict[str, Any]],
+        namespace: Optional[str] = None
+    ) -> None:
+        """Route precomputed chunks to the shards owning their documents."""
+        if not ids:
+            return
+        
+        groups: Dict[int, List[int]] = {}
+        for i, metadata in enumerate(metadatas):
+            groups.setdefault(self.shard_for(metadata["filename"]).index, []).append(i)
+        
+        sent = []
+        try:
+            # Lock shards in index order, like _broadcast, so concurrent calls can't deadlock
+            for shard_index in sorted(groups):
+                positions = groups[shard_index]
+                shard = self.shards[shard_index]
+                shard.send(
+                    "add_embeddings",
+                    [ids[i] for i in positions],
+                    [list(embeddings[i]) for i in positions],
+                    [texts[i] for i in positions],
+                    [metadatas[i] for i in positions],
+                    namespace=namespace
+                )
+                sent.append(shard)
+        finally:
+            errors = []
+            for shard in sent:
+                try:
+                    shard.receive()
+                except Exception as e:
+                    errors.append(str(e))
+        if errors:
+            raise Exception("; ".join(errors))
+        
+        self._bump_catalog_version(namespace)
+    
+    def search_by_embeddings(
+        self,
+        query_embeddings: List[List[float]],
+        top_k: int = 5,
+        namespace: Optional[str] = None,
+        where: Optional[Dict[str, Any]] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """Scatter the queries to all shards and merge their top-k by score."""
+        query_embeddings = [list(embedding) for embedding in query_embeddings]
+        per_shard = self._broadcast("search_by_embeddings", query_embeddings, top_k, namespace=namespace, where=where)
+        
+        merged = []
+        for q in range(len(query_embeddings)):
+            candidates = [result for shard_results in per_shard for result in shard_results[q]]
+            candidates.sort(key=lambda result: result["score"], reverse=True)
+            merged.append(candidates[:top_k])
+        return merged
+    
+    def apply_projection(self, projection, namespace: Optional[str] = None, batch_size: int = 1000) -> int:
+        """Rewrite every shard's collection with projected vectors."""
+        count = sum(self._broadcast("apply_projection", projection, namespace=namespace, batch_size=batch_size))
+        self._bump_catalog_version(namespace)
+        return count
+    
+    def rebuild_document_index(self, namespace: Optional[str] = None) -> int:
+        """Rebuild the document-level index of every shard."""
+        return sum(self._broadcast("rebuild_document_index", namespace=namespace))
+    
+    def has_namespace(self, namespace: Optional[str] = None) -> bool:
+        """Assume the namespace exists; shards without it return no results."""
+        return True
+    
+    def get_document_count(self, namespace: Optional[str] = None) -> int:
+        """Get the total number of chunks across all shards."""
+        try:
+            return sum(self._broadcast("get_document_count", namespace=namespace))
+        except Exception as e:
+            print(f"Error getting document count: {str(e)}")
+            return 0
+    
+    def get_documents_by_filename(self, filename: str, namespace: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Get all chunks of a document from its shard."""
+        chunks = self.shard_for(filename).call("get_documents_by_filename", filename, namespace=namespace)
+        return self._hydrate_results(chunks, namespace)
+    
+    def delete_documents_by_filename(self, filename: str, namespace: Optional[str] = None) -> None:
+        """Delete a document on the shard that owns it."""
+        # Buffered chunks of the document must not be written after it is deleted
+        self.flush_writes()
+        self.shard_for(filename).call("delete_documents_by_filename", filename, namespace=namespace)
+        self._forget_document_text(filename, namespace)
+        self._bump_catalog_version(namespace)
+    
+    def _has_chunks(self, filename: str, namespace: Optional[str] = None) -> bool:
+        return self.shard_for(filename).call("_has_chunks", filename, namespace=namespace)
+    
+    def list_filenames(self, namespace: Optional[str] = None) -> List[str]:
+        """Get the unique filenames stored on any shard."""
+        try:
+            filenames = set()
+            for shard_filenames in self._broadcast("list_filenames", namespace=namespace):
+                filenames.update(shard_filenames)
+            return list(filenames)
+        except Exception as e:
+            print(f"Error listing filenames: {str(e)}")
+            return []
+    
+    def iter_chunks(self, namespace: Optional[str] = None, batch_size: int = 1000) -> Iterator[Dict[str, Any]]:
+        """Iterate over all stored chunks, one shard after another."""
+        for shard in self.shards:
+            offset = 0
+            while True:
+                batch = shard.call("get_chunks", namespace=namespace, offset=offset, limit=batch_size)
+                if not batch["ids"]:
+                    break
+                batch["texts"] = self._hydrate_texts(batch["texts"], batch["metadatas"], namespace)
+                yield batch
+                offset += len(batch["ids"])
+    
+    def get_open_namespaces(self) -> List[str]:
+        """Get the namespaces open on any shard."""
+        try:
+            namespaces = set()
+            for shard_namespaces in self._broadcast("get_open_namespaces"):
+                namespaces.update(shard_namespaces)
+            return sorted(namespaces)
+        except Exception as e:
+            print(f"Error listing open namespaces: {str(e)}")
+            return []
+    
+    def close(self) -> None:
+        """Stop all shard processes, then release what the store holds in this process."""
+        # Buffered chunks still have to reach the shards
+        if getattr(self, "write_buffer", None) is not None:
+            self.write_buffer.close()
+            self.write_buffer = None
+        for shard in self.shards:
+            shard.stop()
+        self.shards = []
+        super().close()
\ No newline at end of file
@@ -0,0 +1,68 @@
+import asyncio
+import json
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+class SingleFlight:
+    """Coalesce identical concurrent calls into one in-flight computation.
+    
+    The first caller for a key (the leader) starts the computation as a task;
+    callers arriving with the same key while it runs (followers) await that
+    task instead of starting their own. Everyone gets the same result or
+    exception. The task is shielded, so a disconnecting leader does not cancel
+    it for the followers. Keys are forgotten as soon as the task finishes, so
+    nothing is cached beyond the burst.
+    """
+    
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+        self.leaders = 0
+        self.followers = 0
+    
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """Run fn once per key at a time; returns (result, shared) where shared is True for followers."""
+        task = self._calls.get(key)
+        shared = task is not None
+        if shared:
+            self.followers += 1
+        else:
+            self.leaders += 1
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda _: self._forget(key, task))
+        
+        return await asyncio.shield(task), shared
+    
+    def _forget(self, key: Hashable, task: asyncio.Future) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            # Mark the exception as retrieved if every caller went away
+            task.exception()
+    
+    def stats(self) -> Dict[str, int]:
+        """Counters reported in /status."""
+        return {
+            "in_flight": len(self._calls),
+            "leaders": self.leaders,
+            "followers": self.followers
+        }
+
+def question_key(
+    question: str,
+    top_k: int,
+    namespace: str,
+    catalog_version: str,
+    filters: Optional[Dict[str, Any]] = None
+) -> Tuple[str, ...]:
+    """Key under which identical /ask requests are coalesced.
+    
+    Questions are compared case- and whitespace-insensitively. The catalog
+    version makes requests that straddle an upload or delete compute separately.
+    """
+    return (
+        namespace,
+        catalog_version,
+        " ".join(question.lower().split()),
+        str(top_k),
+        json.dumps(filters or {}, sort_keys=True, default=str)
+    )
\ No newline at end of file
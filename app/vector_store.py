@@ -1,111 +1,970 @@
 import chromadb
+import contextlib
 from chromadb.config import Settings as ChromaSettings
-from typing import List, Dict, Any, Optional
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Iterator, TYPE_CHECKING
 import os
+import re
+import threading
+import time
+import uuid
 from app.config import settings
-from app.embedding_service import EmbeddingService
+from app.profiling import stage
+from app.resource_manager import resource_manager
+from app.chunk_store import ChunkStore
+from app.projection import Projection
+from app.document_index import centroid, document_metadata
+from app.dedup import NearDuplicateIndex
+from app.index_registry import IndexRegistry
+from app.write_buffer import WriteBuffer
+
+if TYPE_CHECKING:
+    # Only needed for type hints; importing it loads torch in shard workers and CLI tools
+    from app.embedding_service import EmbeddingService
+
+# Namespaces become part of the Chroma collection name, so keep them to a
+# conservative subset of the characters Chroma accepts.
+NAMESPACE_PATTERN = re.compile(r"^[A-Za-z0-9](?:[A-Za-z0-9_-]{0,30}[A-Za-z0-9])?$")
+
+TAG_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,32}$")
+
+def tag_key(tag: str) -> str:
+    """Metadata key marking a chunk with a tag (Chroma metadata values can't be lists)."""
+    return f"tag_{tag}"
+
+def build_where(filters: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Translate search filters into a Chroma where clause.
+    
+    Supported keys: filenames, file_types, uploaded_after and uploaded_before
+    (datetimes or epoch seconds) and tags (matches chunks with any of them).
+    Returns None when there is nothing to filter on.
+    """
+    if not filters:
+        return None
+    
+    conditions = []
+    if filters.get("filenames"):
+        conditions.append({"filename": {"$in": list(filters["filenames"])}})
+    if filters.get("file_types"):
+        file_types = [
+            file_type.lower() if file_type.startswith(".") else f".{file_type.lower()}"
+            for file_type in filters["file_types"]
+        ]
+        conditions.append({"file_type": {"$in": file_types}})
+    for key, operator in (("uploaded_after", "$gte"), ("uploaded_before", "$lte")):
+        value = filters.get(key)
+        if value is not None:
+            timestamp = value.timestamp() if hasattr(value, "timestamp") else float(value)
+            conditions.append({"upload_timestamp": {operator: timestamp}})
+    if filters.get("tags"):
+        for tag in filters["tags"]:
+            if not TAG_PATTERN.match(tag):
+                raise ValueError(f"Invalid tag '{tag}'. Use 1-32 letters, digits, '-' or '_'")
+        tag_conditions = [{tag_key(tag): True} for tag in filters["tags"]]
+        conditions.append(tag_conditions[0] if len(tag_conditions) == 1 else {"$or": tag_conditions})
+    
+    if not conditions:
+        return None
+    if len(conditions) == 1:
+        return conditions[0]
+    return {"$and": conditions}
+
+def resolve_namespace(namespace: Optional[str]) -> str:
+    """Return the namespace to use, validating user supplied values."""
+    if namespace is None or namespace == "":
+        return settings.DEFAULT_NAMESPACE
+    if not NAMESPACE_PATTERN.match(namespace):
+        raise ValueError(
+            f"Invalid namespace '{namespace}'. Use 1-32 letters, digits, '-' or '_'"
+        )
+    return namespace
 
 class VectorStore:
-    """Vector store service using ChromaDB."""
+    """Vector store service using ChromaDB.
     
-    def __init__(self, embedding_service: EmbeddingService):
+    Each namespace is served by the active version of its index in the
+    index registry, and queries are embedded with the model that version
+    was built with.
+    """
+    
+    def __init__(self, embedding_service: "EmbeddingService"):
         self.embedding_service = embedding_service
+        # Model recorded for newly created namespaces
+        self.embedding_model = getattr(embedding_service, "model_name", None) or settings.EMBEDDING_MODEL
+        self._embedding_services: Dict[str, "EmbeddingService"] = {}  # model name -> service for other models
+        self._embedding_services_lock = threading.Lock()
         self.client = None
         self.collection = None
+        self._collections = OrderedDict()  # namespace -> (collection, last_used)
+        self._collections_lock = threading.Lock()
+        # Chunks with a char_offset keep their text here instead of in Chroma
+        self.chunk_store = ChunkStore() if settings.CHUNK_STORE_ENABLED else None
+        self._projections: Dict[str, Any] = {}  # namespace -> (collection name, projection)
+        self._document_collections: Dict[str, Any] = {}  # namespace -> document-level collection
+        self.near_duplicates = NearDuplicateIndex() if settings.NEAR_DUP_MODE != "off" else None
+        self.registry = IndexRegistry()
+        # Uploads embedding with one index version's model hold off switching to another
+        self._index_switch = threading.Condition()
+        self._uploads_in_flight = 0
+        self._switching = False
         self._initialize_chroma()
+        # Inserts from concurrent uploads are written in groups
+        self.write_buffer = WriteBuffer(self.add_embeddings) if settings.WRITE_BUFFER_ENABLED else None
     
     def _initialize_chroma(self):
         """Initialize ChromaDB client and collection."""
         try:
+            chroma_settings = ChromaSettings(
+                anonymized_telemetry=False,
+                allow_reset=True
+            )
+            if settings.CHROMA_MEMORY_LIMIT_BYTES > 0:
+                # Let Chroma unload the indexes of idle collections first
+                chroma_settings.chroma_segment_cache_policy = "LRU"
+                chroma_settings.chroma_memory_limit_bytes = settings.CHROMA_MEMORY_LIMIT_BYTES
+            
             # Create ChromaDB client
             self.client = chromadb.PersistentClient(
                 path=settings.CHROMA_PERSIST_DIRECTORY,
-                settings=ChromaSettings(
-                    anonymized_telemetry=False,
-                    allow_reset=True
-                )
+                settings=chroma_settings
             )
             
-            # Get or create collection
-            self.collection = self.client.get_or_create_collection(
-                name=settings.CHROMA_COLLECTION_NAME,
-                metadata={"hnsw:space": "cosine"}
-            )
+            # Get or create the collection of the default namespace
+            self.collection = self._get_collection(settings.DEFAULT_NAMESPACE, create=True)
             
-            print(f"ChromaDB initialized with collection: {settings.CHROMA_COLLECTION_NAME}")
+            active = self.registry.get(settings.DEFAULT_NAMESPACE)
+            if active is not None and active["embedding_model"] != settings.EMBEDDING_MODEL:
+                print(
+                    f"Warning: the default namespace is indexed with {active['embedding_model']}, "
+                    f"not EMBEDDING_MODEL ({settings.EMBEDDING_MODEL}); its queries keep using "
+                    f"{active['embedding_model']} until it is re-embedded"
+                )
+            
+            print(f"ChromaDB initialized with collection: {self._collection_name(settings.DEFAULT_NAMESPACE)}")
             
         except Exception as e:
             raise Exception(f"Error initializing ChromaDB: {str(e)}")
     
-    def add_documents(self, documents: List[Dict[str, Any]]) -> None:
-        """Add documents to the vector store."""
+    def _base_collection_name(self, namespace: str) -> str:
+        """Map a namespace to the Chroma collection name of its first index version."""
+        if namespace == settings.DEFAULT_NAMESPACE:
+            # Keep the pre-namespace collection as the default one
+            return settings.CHROMA_COLLECTION_NAME
+        return f"{settings.CHROMA_COLLECTION_NAME}-{namespace}"
+    
+    def _collection_name(self, namespace: str) -> str:
+        """Chroma collection name of a namespace's active index version."""
+        active = self.registry.get(namespace)
+        return active["collection"] if active is not None else self._base_collection_name(namespace)
+    
+    def _get_collection(self, namespace: Optional[str] = None, create: bool = False):
+        """Get the collection of a namespace from the pool, opening it lazily.
+        
+        Returns None when the collection does not exist and create is False,
+        so reads against an unknown namespace never create empty collections.
+        """
+        namespace = resolve_namespace(namespace)
+        # Looked up every time, so a version switched to by another worker is picked up
+        name = self._collection_name(namespace)
+        with self._collections_lock:
+            now = time.monotonic()
+            entry = self._collections.get(namespace)
+            if entry is not None and entry[0].name == name:
+                self._collections[namespace] = (entry[0], now)
+                self._collections.move_to_end(namespace)
+                return entry[0]
+            
+            if create:
+                collection = self.client.get_or_create_collection(
+                    name=name,
+                    metadata={"hnsw:space": "cosine", "namespace": namespace, "embedding_model": self.embedding_model}
+                )
+            else:
+                try:
+                    collection = self.client.get_collection(name=name)
+                except Exception:
+                    return None
+            
+            # Collections created before the registry existed become version 1
+            self.registry.register_active(
+                namespace, name, (collection.metadata or {}).get("embedding_model", self.embedding_model)
+            )
+            self._collections[namespace] = (collection, now)
+            self._evict_collections(now)
+            return collection
+    
+    def _evict_collections(self, now: float) -> None:
+        """Close idle collections and keep the pool within MAX_OPEN_COLLECTIONS.
+        
+        Must be called with the pool lock held. The default namespace is pinned.
+        """
+        idle_timeout = settings.COLLECTION_IDLE_TIMEOUT
+        for namespace, (_, last_used) in list(self._collections.items()):
+            if namespace == settings.DEFAULT_NAMESPACE:
+                continue
+            if idle_timeout > 0 and now - last_used > idle_timeout:
+                del self._collections[namespace]
+        
+        while len(self._collections) > max(settings.MAX_OPEN_COLLECTIONS, 1):
+            for namespace in self._collections:
+                if namespace != settings.DEFAULT_NAMESPACE:
+                    del self._collections[namespace]
+                    break
+            else:
+                break
+    
+    def _get_document_collection(self, namespace: Optional[str] = None, create: bool = False):
+        """Get the document-level collection of a namespace, or None if it does not exist."""
+        namespace = resolve_namespace(namespace)
+        # "." cannot appear in namespaces, so this never clashes with a chunk collection
+        name = f"{self._collection_name(namespace)}.docs"
+        with self._collections_lock:
+            collection = self._document_collections.get(namespace)
+            if collection is not None and collection.name == name:
+                return collection
+            
+            if create:
+                collection = self.client.get_or_create_collection(
+                    name=name,
+                    metadata={"hnsw:space": "cosine", "namespace": namespace}
+                )
+            else:
+                try:
+                    collection = self.client.get_collection(name=name)
+                except Exception:
+                    return None
+            
+            self._document_collections[namespace] = collection
+            return collection
+    
+    def _update_document_vectors(self, filenames: List[str], namespace: Optional[str] = None) -> None:
+        """Recompute the document-level vectors of some documents from their chunks."""
+        collection = self._get_collection(namespace)
+        document_collection = self._get_document_collection(namespace, create=True)
+        for filename in filenames:
+            chunks = None
+            if collection is not None:
+                chunks = collection.get(where={"filename": filename}, include=["embeddings", "metadatas"])
+            if not chunks or not chunks["ids"]:
+                document_collection.delete(ids=[filename])
+                continue
+            document_collection.upsert(
+                ids=[filename],
+                embeddings=[centroid(chunks["embeddings"])],
+                metadatas=[document_metadata(chunks["metadatas"][0], len(chunks["ids"]))]
+            )
+    
+    def rebuild_document_index(self, namespace: Optional[str] = None) -> int:
+        """Recreate the document-level collection of a namespace; returns the number of documents."""
+        namespace = resolve_namespace(namespace)
+        with self._collections_lock:
+            self._document_collections.pop(namespace, None)
+        try:
+            self.client.delete_collection(f"{self._collection_name(namespace)}.docs")
+        except Exception:
+            pass
+        
+        filenames = self.list_filenames(namespace=namespace)
+        self._update_document_vectors(filenames, namespace)
+        return len(filenames)
+    
+    def get_open_namespaces(self) -> List[str]:
+        """Get the namespaces whose collections are currently open."""
+        with self._collections_lock:
+            return list(self._collections.keys())
+    
+    def embedding_service_for(self, model_name: str) -> "EmbeddingService":
+        """Embedding service of a model, loading models other than the main one on first use."""
+        if self.embedding_service is not None and getattr(self.embedding_service, "model_name", model_name) == model_name:
+            return self.embedding_service
+        with self._embedding_services_lock:
+            if model_name not in self._embedding_services:
+                from app.embedding_service import EmbeddingService
+                self._embedding_services[model_name] = EmbeddingService(model_name)
+            return self._embedding_services[model_name]
+    
+    def get_embedding_model(self, namespace: Optional[str] = None) -> str:
+        """Model a namespace's active index was built with, or the one a new namespace would get."""
+        active = self.registry.get(resolve_namespace(namespace))
+        return active["embedding_model"] if active is not None else self.embedding_model
+    
+    def _embedder(self, namespace: Optional[str]) -> "EmbeddingService":
+        """Embedding service of the model a namespace's active index was built with."""
+        return self.embedding_service_for(self.get_embedding_model(namespace))
+    
+    def embed_texts(self, texts: List[str], namespace: Optional[str] = None) -> List[List[float]]:
+        """Embed texts with the model of a namespace's active index, without projecting them."""
+        return self._embedder(namespace).generate_embeddings(texts)
+    
+    def _check_dimension(self, collection, namespace: Optional[str], dimension: int) -> None:
+        """Record the vector dimension of a namespace's active index, or reject vectors of another one."""
+        namespace = resolve_namespace(namespace)
+        active = self.registry.get(namespace)
+        # An empty index takes whatever comes first
+        if active["dimension"] is None or (active["dimension"] != dimension and collection.count() == 0):
+            self.registry.update(namespace, active["version"], dimension=dimension)
+        elif active["dimension"] != dimension:
+            raise ValueError(
+                f"Namespace '{namespace}' holds {active['dimension']}-dimensional vectors from "
+                f"{active['embedding_model']}, got {dimension}-dimensional ones"
+            )
+    
+    def get_building_index(self, namespace: Optional[str] = None):
+        """(registry entry, collection) of the index version being built for a namespace, or (None, None).
+        
+        A version whose job stopped reporting is ignored, so uploads stop
+        paying for a second embedding once its job has died.
+        """
+        building = self.registry.get_building(resolve_namespace(namespace))
+        if building is None:
+            return None, None
+        try:
+            return building, self.client.get_collection(name=building["collection"])
+        except Exception:
+            return None, None
+    
+    def _write_building_index(
+        self,
+        ids: List[str],
+        texts: List[str],
+        stored_texts: List[str],
+        metadatas: List[Dict[str, Any]],
+        namespace: Optional[str]
+    ) -> None:
+        """Also add new chunks to the index version being built, so it misses no upload."""
+        building, collection = self.get_building_index(namespace)
+        if collection is None or not ids:
+            return
+        embeddings = self.embedding_service_for(building["embedding_model"]).generate_embeddings(texts)
+        collection.upsert(ids=ids, embeddings=embeddings, documents=stored_texts, metadatas=metadatas)
+    
+    @contextlib.contextmanager
+    def _upload_in_flight(self):
+        """Keep index versions from being switched while an upload is embedded and written."""
+        with self._index_switch:
+            self._index_switch.wait_for(lambda: not self._switching)
+            self._uploads_in_flight += 1
+        try:
+            yield
+        finally:
+            with self._index_switch:
+                self._uploads_in_flight -= 1
+                self._index_switch.notify_all()
+    
+    def activate_index_version(self, namespace: Optional[str], version: int) -> None:
+        """Switch a namespace's searches and writes to another index version.
+        
+        Waits for uploads being embedded to be written, and holds new ones
+        back until the switch is done, so no chunk embedded with the old
+        model lands in the new version.
+        """
+        namespace = resolve_namespace(namespace)
+        with self._index_switch:
+            self._switching = True
+            self._index_switch.wait_for(lambda: self._uploads_in_flight == 0)
+        try:
+            # Buffered chunks were embedded for the version being replaced
+            self.flush_writes()
+            previous = self.registry.get(namespace)
+            self.registry.activate(namespace, version)
+            with self._collections_lock:
+                self._collections.pop(namespace, None)
+                self._document_collections.pop(namespace, None)
+            if namespace == settings.DEFAULT_NAMESPACE:
+                self.collection = self._get_collection(namespace)
+            # The new vectors come straight from the model
+            if os.path.exists(self._projection_path(namespace)):
+                self.set_projection(None, namespace)
+            if settings.DOCUMENT_INDEX_ENABLED:
+                self.rebuild_document_index(namespace)
+            self._bump_catalog_version(namespace)
+        finally:
+            with self._index_switch:
+                self._switching = False
+                self._index_switch.notify_all()
+        
+        if previous is not None and not settings.REINDEX_KEEP_PREVIOUS:
+            self.drop_index_version(namespace, previous["version"])
+    
+    def drop_index_version(self, namespace: Optional[str], version: int) -> None:
+        """Delete an inactive index version and its collections."""
+        namespace = resolve_namespace(namespace)
+        entry = next((entry for entry in self.registry.versions(namespace) if entry["version"] == version), None)
+        if entry is None:
+            return
+        if entry["state"] == "active":
+            raise ValueError(f"Version {version} of namespace '{namespace}' is active")
+        for name in (entry["collection"], f"{entry['collection']}.docs"):
+            try:
+                self.client.delete_collection(name)
+            except Exception:
+                pass
+        self.registry.delete(namespace, version)
+    
+    def get_index_versions(self, namespace: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Every index version of a namespace with its model, dimension and state."""
+        return self.registry.versions(resolve_namespace(namespace))
+    
+    def _catalog_version_path(self, namespace: Optional[str]) -> str:
+        """Path of the file holding the catalog version of a namespace."""
+        return os.path.join(
+            settings.CHROMA_PERSIST_DIRECTORY, "catalog_versions", f"{resolve_namespace(namespace)}.version"
+        )
+    
+    def get_catalog_version(self, namespace: Optional[str] = None) -> str:
+        """Get an opaque token that changes whenever documents are added or deleted.
+        
+        The token lives on disk next to the collections so every API worker
+        sharing the persist directory sees the same value.
+        """
+        try:
+            with open(self._catalog_version_path(namespace), "r") as file:
+                return file.read().strip() or "0"
+        except FileNotFoundError:
+            return "0"
+    
+    def _bump_catalog_version(self, namespace: Optional[str]) -> None:
+        """Give a namespace a new catalog version after its documents changed."""
+        path = self._catalog_version_path(namespace)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(temp_path, "w") as file:
+            file.write(uuid.uuid4().hex)
+        os.replace(temp_path, path)
+    
+    def _projection_path(self, namespace: Optional[str]) -> str:
+        """Path of the projection file of a namespace."""
+        return os.path.join(settings.CHROMA_PERSIST_DIRECTORY, "projections", f"{resolve_namespace(namespace)}.npz")
+    
+    def get_projection(self, namespace: Optional[str] = None) -> Optional[Projection]:
+        """Get the projection applied to a namespace's vectors, if it has one."""
+        namespace = resolve_namespace(namespace)
+        name = self._collection_name(namespace)
+        cached = self._projections.get(namespace)
+        # A new index version comes without the previous version's projection
+        if cached is None or cached[0] != name:
+            path = self._projection_path(namespace)
+            cached = (name, Projection.load(path, self.get_embedding_model(namespace)) if os.path.exists(path) else None)
+            self._projections[namespace] = cached
+        return cached[1]
+    
+    def set_projection(self, projection: Optional[Projection], namespace: Optional[str] = None) -> None:
+        """Persist (or remove, with None) the projection of a namespace."""
+        namespace = resolve_namespace(namespace)
+        path = self._projection_path(namespace)
+        if projection is None:
+            if os.path.exists(path):
+                os.remove(path)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+            projection.save(temp_path)
+            os.replace(temp_path, path)
+        self._projections[namespace] = (self._collection_name(namespace), projection)
+    
+    def _project(self, embeddings: List[List[float]], namespace: Optional[str]) -> List[List[float]]:
+        """Map model embeddings into the namespace's stored vector space."""
+        projection = self.get_projection(namespace)
+        if projection is None or len(embeddings) == 0:
+            return embeddings
+        return projection.apply(embeddings).tolist()
+    
+    def apply_projection(self, projection: Projection, namespace: Optional[str] = None, batch_size: int = 1000) -> int:
+        """Rewrite a namespace's collection with projected vectors; returns the number of chunks.
+        
+        The vectors are copied into a new collection which then replaces the
+        old one, since a Chroma collection's dimension cannot change.
+        """
+        namespace = resolve_namespace(namespace)
+        source = self._get_collection(namespace)
+        if source is None:
+            return 0
+        
+        name = self._collection_name(namespace)
+        temp_name = f"{name}-projecting"
+        try:
+            self.client.delete_collection(temp_name)
+        except Exception:
+            pass
+        target = self.client.create_collection(name=temp_name, metadata=source.metadata)
+        
+        count = 0
+        while True:
+            batch = self.get_chunks(namespace=namespace, offset=count, limit=batch_size)
+            if not batch["ids"]:
+                break
+            target.add(
+                ids=batch["ids"],
+                embeddings=projection.apply(batch["embeddings"]).tolist(),
+                documents=batch["texts"],
+                metadatas=batch["metadatas"]
+            )
+            count += len(batch["ids"])
+        
+        with self._collections_lock:
+            self._collections.pop(namespace, None)
+        self.client.delete_collection(name)
+        target.modify(name=name)
+        if namespace == settings.DEFAULT_NAMESPACE:
+            self.collection = self._get_collection(namespace)
+        active = self.registry.get(namespace)
+        self.registry.update(namespace, active["version"], dimension=projection.target_dim)
+        
+        # Document vectors live in the old space too
+        if settings.DOCUMENT_INDEX_ENABLED:
+            self.rebuild_document_index(namespace)
+        
+        self._bump_catalog_version(namespace)
+        return count
+    
+    def add_documents(
+        self,
+        documents: List[Dict[str, Any]],
+        namespace: Optional[str] = None,
+        bulk: Optional[bool] = None,
+        source_text: Optional[str] = None,
+        source_texts: Optional[Dict[str, str]] = None,
+        wait: bool = False
+    ) -> int:
+        """Add documents to the vector store.
+        
+        Bulk embedding is used when bulk is True, or when it is None and there
+        are at least EMBEDDING_BULK_THRESHOLD documents.
+        
+        source_text is the full text the chunks of a single file were cut
+        from; source_texts maps filenames to it when chunks of several files
+        are added at once. These chunks are then the whole document, and any
+        chunks already stored for it are deleted first. With the chunk store
+        enabled each text is stored once, compressed, and its chunks that
+        carry a char_offset are added to Chroma without their text, recording
+        the text's hash as text_hash.
+        
+        With NEAR_DUP_MODE skip or link, near-duplicates of stored chunks are
+        neither embedded nor added. Returns the number of chunks suppressed.
+        
+        With the write buffer in buffer mode, chunks are only queued unless
+        wait is True; a queued upload that then fails to be written has its
+        near-duplicate signatures and stored text dropped again.
+        """
         try:
             if not documents:
-                return
+                return 0
             
             # Extract texts and metadata
             texts = [doc["text"] for doc in documents]
             metadatas = [doc["metadata"] for doc in documents]
             ids = [f"{doc['metadata']['filename']}_{doc['metadata']['chunk_id']}" for doc in documents]
             
-            # Generate embeddings
-            embeddings = self.embedding_service.generate_embeddings(texts)
+            if source_text is not None:
+                source_texts = {metadatas[0]["filename"]: source_text}
+            for filename in source_texts or {}:
+                # Re-uploaded: chunks of the old version would keep their embeddings, and
+                # chunks beyond the new chunk count would stay behind
+                if self.has_document(filename, namespace):
+                    self.delete_documents_by_filename(filename, namespace=namespace)
             
-            # Add to collection
-            self.collection.add(
-                embeddings=embeddings,
-                documents=texts,
-                metadatas=metadatas,
-                ids=ids
-            )
+            duplicates, signatures = {}, {}
+            if self.near_duplicates is not None:
+                with stage("near_duplicates"):
+                    duplicates, signatures = self.near_duplicates.plan(resolve_namespace(namespace), ids, texts, metadatas)
+            all_ids, all_texts, all_metadatas = ids, texts, metadatas
+            if duplicates:
+                kept = [i for i in range(len(ids)) if i not in duplicates]
+                ids = [all_ids[i] for i in kept]
+                texts = [all_texts[i] for i in kept]
+                metadatas = [all_metadatas[i] for i in kept]
+            
+            text_hashes = {}
+            with self._upload_in_flight():
+                try:
+                    # Generate embeddings
+                    if bulk is None:
+                        bulk = len(texts) >= settings.EMBEDDING_BULK_THRESHOLD
+                    with stage("embedding"):
+                        if not texts:
+                            embeddings = []
+                        elif bulk:
+                            embeddings = self._embedder(namespace).generate_embeddings_bulk(texts)
+                        else:
+                            # Embed in batches so questions can run in between
+                            embeddings = []
+                            batch_size = settings.EMBEDDING_BULK_BATCH_SIZE
+                            embedder = self._embedder(namespace)
+                            for start in range(0, len(texts), batch_size):
+                                resource_manager.yield_to_interactive()
+                                embeddings.extend(embedder.generate_embeddings(texts[start:start + batch_size]))
+                        embeddings = self._project(embeddings, namespace)
+                    
+                    embedded_texts = texts
+                    
+                    if source_texts and self.chunk_store is not None:
+                        text_hashes = {
+                            filename: self.chunk_store.put(
+                                resolve_namespace(namespace),
+                                filename,
+                                text,
+                                sum(
+                                    len(chunk_text.encode("utf-8"))
+                                    for chunk_text, metadata in zip(all_texts, all_metadatas)
+                                    if metadata["filename"] == filename
+                                )
+                            )
+                            for filename, text in source_texts.items()
+                        }
+                        sliced = ["char_offset" in metadata and metadata["filename"] in text_hashes for metadata in metadatas]
+                        texts = ["" if stored else text for text, stored in zip(texts, sliced)]
+                        metadatas = [
+                            dict(metadata, text_hash=text_hashes[metadata["filename"]]) if stored else metadata
+                            for metadata, stored in zip(metadatas, sliced)
+                        ]
+                    
+                    # Add to collection
+                    with stage("vector_insert"):
+                        if self.write_buffer is not None:
+                            self.write_buffer.submit(
+                                ids,
+                                embeddings,
+                                texts,
+                                metadatas,
+                                namespace=resolve_namespace(namespace),
+                                wait=True if wait else None,
+                                on_error=lambda e: self._discard_upload(namespace, all_ids, text_hashes)
+                            )
+                        else:
+                            self.add_embeddings(ids, embeddings, texts, metadatas, namespace=namespace)
+                except Exception:
+                    self._discard_upload(namespace, all_ids, text_hashes)
+                    raise
+                
+                with stage("vector_insert"):
+                    self._write_building_index(ids, embedded_texts, texts, metadatas, namespace)
             
-            print(f"Added {len(documents)} documents to vector store")
+            if self.near_duplicates is not None:
+                self.near_duplicates.record_links(resolve_namespace(namespace), all_ids, all_texts, all_metadatas, duplicates)
+            
+            print(f"Added {len(ids)} documents to vector store ({len(duplicates)} near-duplicates suppressed)")
+            return len(duplicates)
             
         except Exception as e:
             raise Exception(f"Error adding documents to vector store: {str(e)}")
     
-    def search(self, query: str, top_k: int = 5) -> List[Dict[str, Any]]:
-        """Search for similar documents."""
+    def add_embeddings(
+        self,
+        ids: List[str],
+        embeddings: List[List[float]],
+        texts: List[str],
+        metadatas: List[Dict[str, Any]],
+        namespace: Optional[str] = None
+    ) -> None:
+        """Add chunks whose embeddings were computed elsewhere."""
+        if not ids:
+            return
+        
+        collection = self._get_collection(namespace, create=True)
+        self._check_dimension(collection, namespace, len(embeddings[0]))
+        collection.add(
+            embeddings=embeddings,
+            documents=texts,
+            metadatas=metadatas,
+            ids=ids
+        )
+        if settings.DOCUMENT_INDEX_ENABLED:
+            self._update_document_vectors(sorted({metadata["filename"] for metadata in metadatas}), namespace)
+        self._bump_catalog_version(namespace)
+    
+    def _hydrate_texts(self, texts: List[str], metadatas: List[Dict[str, Any]], namespace: Optional[str]) -> List[str]:
+        """Fill in chunk texts kept in the chunk store instead of Chroma."""
+        if self.chunk_store is None:
+            return texts
+        
+        namespace = resolve_namespace(namespace)
+        hydrated = []
+        for text, metadata in zip(texts, metadatas):
+            if not text and metadata and "char_offset" in metadata:
+                stored = self.chunk_store.get_chunk_text(
+                    namespace,
+                    metadata["filename"],
+                    metadata["char_offset"],
+                    metadata["char_length"],
+                    metadata.get("text_hash", "")
+                )
+                if stored is not None:
+                    text = stored
+            hydrated.append(text)
+        return hydrated
+    
+    def _hydrate_results(self, results: List[Dict[str, Any]], namespace: Optional[str]) -> List[Dict[str, Any]]:
+        """Fill in the text of search results or document chunks from the chunk store."""
+        texts = self._hydrate_texts([result["text"] for result in results], [result["metadata"] for result in results], namespace)
+        for result, text in zip(results, texts):
+            result["text"] = text
+        return results
+    
+    def _discard_upload(self, namespace: Optional[str], ids: List[str], text_hashes: Dict[str, str]) -> None:
+        """Forget what add_documents recorded for chunks that were not stored.
+        
+        Later uploads must not be suppressed as near-duplicates of them, and
+        their text must not make the document look stored.
+        """
+        if self.near_duplicates is not None:
+            self.near_duplicates.discard(resolve_namespace(namespace), ids)
+        if self.chunk_store is not None:
+            for filename, text_hash in text_hashes.items():
+                self.chunk_store.delete(resolve_namespace(namespace), filename, text_hash)
+    
+    def _forget_document_text(self, filename: str, namespace: Optional[str]) -> None:
+        if self.chunk_store is not None:
+            self.chunk_store.delete(resolve_namespace(namespace), filename)
+        if self.near_duplicates is not None:
+            # Chunks linked to this document's chunks need an indexed copy of their own now
+            orphans = self.near_duplicates.delete(resolve_namespace(namespace), filename)
+            if orphans:
+                self.add_documents(orphans, namespace=namespace)
+    
+    def _annotate_near_duplicates(self, results: List[Dict[str, Any]], namespace: Optional[str]) -> List[Dict[str, Any]]:
+        """List the documents linked to each result chunk under metadata["near_duplicates"]."""
+        if self.near_duplicates is None or not results:
+            return results
+        linked = self.near_duplicates.linked_filenames(resolve_namespace(namespace), [result["id"] for result in results])
+        for result in results:
+            if result["id"] in linked:
+                result["metadata"]["near_duplicates"] = linked[result["id"]]
+        return results
+    
+    def flush_writes(self) -> None:
+        """Write the chunks waiting in the write buffer, if there is one."""
+        if self.write_buffer is not None:
+            self.write_buffer.flush()
+    
+    def get_write_buffer_stats(self) -> Optional[Dict[str, Any]]:
+        """Group commit counters of the write buffer, or None when it is disabled."""
+        if self.write_buffer is None:
+            return None
+        return self.write_buffer.get_stats()
+    
+    def get_near_duplicate_stats(self) -> Optional[Dict[str, Any]]:
+        """Signature and link counts of the near-duplicate index, or None when it is disabled."""
+        if self.near_duplicates is None:
+            return None
+        return self.near_duplicates.get_stats()
+    
+    def get_chunk_store_stats(self) -> Optional[Dict[str, Any]]:
+        """Storage savings of the chunk store, or None when it is disabled."""
+        if self.chunk_store is None:
+            return None
+        return self.chunk_store.get_stats()
+    
+    def iter_chunks(self, namespace: Optional[str] = None, batch_size: int = 1000) -> Iterator[Dict[str, Any]]:
+        """Iterate over all stored chunks in batches.
+        
+        Each batch is a dict with "ids", "embeddings", "texts" and "metadatas" lists.
+        """
+        offset = 0
+        while True:
+            batch = self.get_chunks(namespace=namespace, offset=offset, limit=batch_size)
+            if not batch["ids"]:
+                break
+            batch["texts"] = self._hydrate_texts(batch["texts"], batch["metadatas"], namespace)
+            yield batch
+            offset += len(batch["ids"])
+    
+    def get_chunks(self, namespace: Optional[str] = None, offset: int = 0, limit: int = 1000) -> Dict[str, Any]:
+        """Get one page of stored chunks with their embeddings."""
+        collection = self._get_collection(namespace)
+        if collection is None:
+            return {"ids": [], "embeddings": [], "texts": [], "metadatas": []}
+        
+        results = collection.get(
+            limit=limit,
+            offset=offset,
+            include=["embeddings", "documents", "metadatas"]
+        )
+        return {
+            "ids": results["ids"],
+            "embeddings": results["embeddings"] if results["ids"] else [],
+            "texts": [text or "" for text in results["documents"]],
+            "metadatas": results["metadatas"]
+        }
+    
+    def has_namespace(self, namespace: Optional[str] = None) -> bool:
+        """Check whether a namespace has a collection."""
+        return self._get_collection(namespace) is not None
+    
+    def close(self) -> None:
+        """Release resources held by the store."""
+        if self.write_buffer is not None:
+            self.write_buffer.close()
+            self.write_buffer = None
+        with self._collections_lock:
+            self._collections.clear()
+            self._document_collections.clear()
+        if self.chunk_store is not None:
+            self.chunk_store.close()
+            self.chunk_store = None
+        if self.near_duplicates is not None:
+            self.near_duplicates.close()
+            self.near_duplicates = None
+        with self._embedding_services_lock:
+            for embedding_service in self._embedding_services.values():
+                embedding_service.close()
+            self._embedding_services.clear()
+        self.registry.close()
+    
+    def search(
+        self,
+        query: str,
+        top_k: int = 5,
+        namespace: Optional[str] = None,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        """Search for similar documents, optionally restricted by metadata filters."""
         try:
+            if not self.has_namespace(namespace):
+                return []
+            
             # Generate query embedding
-            query_embedding = self.embedding_service.generate_single_embedding(query)
+            with stage("embed_query"):
+                query_embedding = self._project([self._embedder(namespace).generate_single_embedding(query)], namespace)[0]
             
-            # Search in collection
-            results = self.collection.query(
-                query_embeddings=[query_embedding],
-                n_results=top_k,
-                include=["documents", "metadatas", "distances"]
-            )
+            with stage("vector_search"):
+                results = self.search_by_embeddings([query_embedding], top_k, namespace=namespace, where=build_where(filters))[0]
             
-            # Format results
-            formatted_results = []
-            if results["documents"] and results["documents"][0]:
-                for i in range(len(results["documents"][0])):
-                    result = {
-                        "text": results["documents"][0][i],
-                        "metadata": results["metadatas"][0][i],
-                        "distance": results["distances"][0][i],
-                        "score": 1 - results["distances"][0][i]  # Convert distance to similarity score
-                    }
-                    formatted_results.append(result)
+            return self._annotate_near_duplicates(self._hydrate_results(results, namespace), namespace)
+            
+        except Exception as e:
+            raise Exception(f"Error searching vector store: {str(e)}")
+    
+    def search_batch(
+        self,
+        queries: List[str],
+        top_k: int = 5,
+        namespace: Optional[str] = None,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """Search for several queries with one embedding call and one collection query."""
+        try:
+            if not queries:
+                return []
+            if not self.has_namespace(namespace):
+                return [[] for _ in queries]
             
-            return formatted_results
+            # Generate all query embeddings at once
+            query_embeddings = self._project(self._embedder(namespace).generate_embeddings(queries), namespace)
+            
+            all_results = self.search_by_embeddings(query_embeddings, top_k, namespace=namespace, where=build_where(filters))
+            return [
+                self._annotate_near_duplicates(self._hydrate_results(results, namespace), namespace)
+                for results in all_results
+            ]
             
         except Exception as e:
             raise Exception(f"Error searching vector store: {str(e)}")
     
-    def get_document_count(self) -> int:
+    def search_by_embeddings(
+        self,
+        query_embeddings: List[List[float]],
+        top_k: int = 5,
+        namespace: Optional[str] = None,
+        where: Optional[Dict[str, Any]] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """Search with precomputed query embeddings, returning one result list per query.
+        
+        where is a Chroma metadata filter applied inside the index search.
+        With RETRIEVAL_MODE=two_level, each query first picks its
+        DOC_PRUNING_TOP_M closest documents and only their chunks are searched.
+        """
+        collection = self._get_collection(namespace)
+        if collection is None:
+            return [[] for _ in query_embeddings]
+        
+        if settings.RETRIEVAL_MODE == "two_level":
+            document_collection = self._get_document_collection(namespace)
+            # Pruning only pays off when there are more documents than we keep
+            if document_collection is not None and document_collection.count() > settings.DOC_PRUNING_TOP_M:
+                return [
+                    self._search_two_level(collection, document_collection, query_embedding, top_k, where)
+                    for query_embedding in query_embeddings
+                ]
+        
+        # Search in collection
+        results = collection.query(
+            query_embeddings=query_embeddings,
+            n_results=top_k,
+            where=where,
+            include=["documents", "metadatas", "distances"]
+        )
+        
+        return self._format_query_results(results, len(query_embeddings))
+    
+    def _search_two_level(
+        self,
+        collection,
+        document_collection,
+        query_embedding: List[float],
+        top_k: int,
+        where: Optional[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """Search the chunks of the documents closest to one query."""
+        documents = document_collection.query(
+            query_embeddings=[query_embedding],
+            n_results=settings.DOC_PRUNING_TOP_M,
+            where=where,
+            include=["distances"]
+        )
+        filenames = documents["ids"][0]
+        if not filenames:
+            return []
+        
+        chunk_where = {"filename": {"$in": filenames}}
+        if where:
+            chunk_where = {"$and": [where, chunk_where]}
+        
+        results = collection.query(
+            query_embeddings=[query_embedding],
+            n_results=top_k,
+            where=chunk_where,
+            include=["documents", "metadatas", "distances"]
+        )
+        return self._format_query_results(results, 1)[0]
+    
+    def _format_query_results(self, results: Dict[str, Any], query_count: int) -> List[List[Dict[str, Any]]]:
+        """Turn a Chroma query response into one result list per query."""
+        all_results = []
+        for q in range(query_count):
+            formatted_results = []
+            if results["documents"] and results["documents"][q]:
+                for i in range(len(results["documents"][q])):
+                    result = {
+                        "id": results["ids"][q][i],
+                        "text": results["documents"][q][i],
+                        "metadata": results["metadatas"][q][i],
+                        "distance": results["distances"][q][i],
+                        "score": 1 - results["distances"][q][i]  # Convert distance to similarity score
+                    }
+                    formatted_results.append(result)
+            all_results.append(formatted_results)
+        
+        return all_results
+    
+    def get_document_count(self, namespace: Optional[str] = None) -> int:
         """Get the total number of documents in the collection."""
         try:
-            return self.collection.count()
+            collection = self._get_collection(namespace)
+            if collection is None:
+                return 0
+            return collection.count()
         except Exception as e:
             print(f"Error getting document count: {str(e)}")
             return 0
     
-    def get_documents_by_filename(self, filename: str) -> List[Dict[str, Any]]:
+    def get_documents_by_filename(self, filename: str, namespace: Optional[str] = None) -> List[Dict[str, Any]]:
         """Get all documents for a specific filename."""
         try:
-            results = self.collection.get(
+            collection = self._get_collection(namespace)
+            if collection is None:
+                return []
+            
+            results = collection.get(
                 where={"filename": filename},
                 include=["documents", "metadatas"]
             )
@@ -119,32 +978,68 @@ class VectorStore:
                     }
                     formatted_results.append(result)
             
-            return formatted_results
+            return self._hydrate_results(formatted_results, namespace)
             
         except Exception as e:
             raise Exception(f"Error getting documents by filename: {str(e)}")
     
-    def delete_documents_by_filename(self, filename: str) -> None:
+    def delete_documents_by_filename(self, filename: str, namespace: Optional[str] = None) -> None:
         """Delete all documents for a specific filename."""
         try:
+            # Buffered chunks of the document must not be written after it is deleted
+            self.flush_writes()
+            
+            # The version being built must not keep a deleted document
+            _, building_collection = self.get_building_index(namespace)
+            if building_collection is not None:
+                building_collection.delete(where={"filename": filename})
+            
+            collection = self._get_collection(namespace)
+            if collection is None:
+                return
+            
             # Get document IDs for the filename
-            results = self.collection.get(
+            results = collection.get(
                 where={"filename": filename},
                 include=["metadatas"]
             )
             
             if results["metadatas"]:
                 ids_to_delete = [f"{filename}_{metadata['chunk_id']}" for metadata in results["metadatas"]]
-                self.collection.delete(ids=ids_to_delete)
+                collection.delete(ids=ids_to_delete)
+                if settings.DOCUMENT_INDEX_ENABLED:
+                    self._update_document_vectors([filename], namespace)
+                self._bump_catalog_version(namespace)
                 print(f"Deleted {len(ids_to_delete)} documents for filename: {filename}")
             
+            # Also when every chunk was linked to another document's and none is in Chroma
+            self._forget_document_text(filename, namespace)
+            
         except Exception as e:
             raise Exception(f"Error deleting documents by filename: {str(e)}")
     
-    def list_filenames(self) -> List[str]:
+    def has_document(self, filename: str, namespace: Optional[str] = None) -> bool:
+        """Whether any chunk or the text of a document is stored, or waiting in the write buffer."""
+        if self.write_buffer is not None and self.write_buffer.has_pending(resolve_namespace(namespace), filename):
+            return True
+        if self.chunk_store is not None and self.chunk_store.has(resolve_namespace(namespace), filename):
+            return True
+        return self._has_chunks(filename, namespace)
+    
+    def _has_chunks(self, filename: str, namespace: Optional[str] = None) -> bool:
+        collection = self._get_collection(namespace)
+        if collection is None:
+            return False
+        return bool(collection.get(where={"filename": filename}, limit=1, include=[])["ids"])
+    
+    def list_filenames(self, namespace: Optional[str] = None) -> List[str]:
         """Get list of all unique filenames in the collection."""
         try:
-            results = self.collection.get(include=["metadatas"])
+            collection = self._get_collection(namespace)
+            if collection is None:
+                return []
+            
+            results = collection.get(include=["metadatas"])
             filenames = set()
             
             if results["metadatas"]:
@@ -155,4 +1050,11 @@ class VectorStore:
             
         except Exception as e:
             print(f"Error listing filenames: {str(e)}")
-            return [] 
\ No newline at end of file
+            return []
+
+def create_vector_store(embedding_service: "EmbeddingService") -> VectorStore:
+    """Create the configured vector store, sharded when VECTOR_STORE_SHARDS > 1."""
+    if settings.VECTOR_STORE_SHARDS > 1:
+        from app.sharding import ShardedVectorStore
+        return ShardedVectorStore(embedding_service)
+    return VectorStore(embedding_service)
\ No newline at end of file
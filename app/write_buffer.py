@@ -0,0 +1,196 @@
+"""
+Write-behind buffer that turns many small vector store inserts into group commits.
+
+Embedded chunks from concurrent uploads are queued per namespace and a
+background thread writes them with one insert per namespace once
+WRITE_BUFFER_MAX_CHUNKS chunks are waiting or the oldest has waited
+WRITE_BUFFER_MAX_DELAY_MS. WRITE_BUFFER_DURABILITY decides when an upload
+is acknowledged:
+
+    flush   after the group commit holding its chunks (errors reach the caller)
+    buffer  as soon as its chunks are queued; they become searchable, and
+            survive a crash, only once the next group commit has run
+            (a failed write is reported to the submitter's on_error callback)
+
+Everything still queued is written when the store is closed.
+"""
+
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+from app.config import settings
+
+DURABILITY_MODES = ("flush", "buffer")
+
+class _PendingWrite:
+    """Chunks of one add_documents call, and the outcome its caller may wait for."""
+    
+    def __init__(self, namespace: Optional[str], ids, embeddings, texts, metadatas, on_error=None):
+        self.namespace = namespace
+        self.ids = ids
+        self.embeddings = embeddings
+        self.texts = texts
+        self.metadatas = metadatas
+        self.on_error = on_error
+        self.queued_at = time.monotonic()
+        self.done = threading.Event()
+        self.error = None
+
+class WriteBuffer:
+    """Queues inserts and writes them in groups from a background thread."""
+    
+    def __init__(
+        self,
+        write: Callable[[List[str], List[List[float]], List[str], List[Dict[str, Any]], Optional[str]], None],
+        max_chunks: Optional[int] = None,
+        max_delay: Optional[float] = None,
+        durability: Optional[str] = None
+    ):
+        self._write = write
+        self.max_chunks = max(1, max_chunks or settings.WRITE_BUFFER_MAX_CHUNKS)
+        self.max_delay = settings.WRITE_BUFFER_MAX_DELAY_MS / 1000 if max_delay is None else max_delay
+        self.durability = durability or settings.WRITE_BUFFER_DURABILITY
+        if self.durability not in DURABILITY_MODES:
+            raise ValueError(f"WRITE_BUFFER_DURABILITY must be one of {', '.join(DURABILITY_MODES)}")
+        self._pending: List[_PendingWrite] = []
+        self._pending_chunks = 0
+        self._condition = threading.Condition()
+        self._flush_lock = threading.Lock()  # one group commit at a time, in queue order
+        self._closed = False
+        self.commits = 0
+        self.chunks_written = 0
+        self.failed_writes = 0
+        self._thread = threading.Thread(target=self._run, name="write-buffer", daemon=True)
+        self._thread.start()
+    
+    def submit(
+        self,
+        ids: List[str],
+        embeddings: List[List[float]],
+        texts: List[str],
+        metadatas: List[Dict[str, Any]],
+        namespace: Optional[str] = None,
+        wait: Optional[bool] = None,
+        on_error: Optional[Callable[[Exception], None]] = None
+    ) -> None:
+        """Queue chunks; in flush mode, return once they are written and raise if that failed.
+        
+        wait overrides the durability mode for this call; waiting in buffer
+        mode writes the queue right away. on_error is called with the error
+        if the chunks cannot be written, also when nobody waits for them.
+        """
+        if not ids:
+            return
+        write = _PendingWrite(namespace, ids, embeddings, texts, metadatas, on_error)
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("Write buffer is closed")
+            self._pending.append(write)
+            self._pending_chunks += len(ids)
+            self._condition.notify_all()
+        
+        if wait is None:
+            wait = self.durability == "flush"
+        if wait:
+            if self.durability == "buffer":
+                # No group commit is coming for it, so write it now
+                self.flush()
+            write.done.wait()
+            if write.error is not None:
+                raise write.error
+    
+    def has_pending(self, namespace: Optional[str], filename: str) -> bool:
+        """Whether chunks of a document are queued and not yet written."""
+        with self._condition:
+            return any(
+                write.namespace == namespace and any(metadata["filename"] == filename for metadata in write.metadatas)
+                for write in self._pending
+            )
+    
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while not self._closed:
+                    if self._pending_chunks >= self.max_chunks:
+                        break
+                    if self._pending:
+                        remaining = self._pending[0].queued_at + self.max_delay - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        self._condition.wait(remaining)
+                    else:
+                        self._condition.wait()
+                if self._closed and not self._pending:
+                    return
+            self.flush()
+    
+    def flush(self) -> None:
+        """Write everything queued so far; returns once it is written."""
+        with self._flush_lock:
+            with self._condition:
+                pending, self._pending = self._pending, []
+                self._pending_chunks = 0
+            if not pending:
+                return
+            
+            # One insert per namespace, in groups of at most max_chunks chunks
+            by_namespace: Dict[Optional[str], List[_PendingWrite]] = {}
+            for write in pending:
+                by_namespace.setdefault(write.namespace, []).append(write)
+            for namespace, writes in by_namespace.items():
+                group, size = [], 0
+                for write in writes:
+                    if group and size + len(write.ids) > self.max_chunks:
+                        self._commit(namespace, group)
+                        group, size = [], 0
+                    group.append(write)
+                    size += len(write.ids)
+                self._commit(namespace, group)
+    
+    def _commit(self, namespace: Optional[str], group: List[_PendingWrite]) -> None:
+        try:
+            self._write(
+                [chunk_id for write in group for chunk_id in write.ids],
+                [embedding for write in group for embedding in write.embeddings],
+                [text for write in group for text in write.texts],
+                [metadata for write in group for metadata in write.metadatas],
+                namespace
+            )
+            self.commits += 1
+            self.chunks_written += sum(len(write.ids) for write in group)
+        except Exception as e:
+            if len(group) == 1:
+                print(f"Error writing buffered chunks: {str(e)}")
+                self.failed_writes += 1
+                group[0].error = e
+                if group[0].on_error is not None:
+                    group[0].on_error(e)
+            else:
+                # Write them one by one so a bad upload fails alone
+                for write in group:
+                    self._commit(namespace, [write])
+                return
+        for write in group:
+            write.done.set()
+    
+    def close(self) -> None:
+        """Write whatever is still queued and stop the background thread."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._thread.join()
+        self.flush()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        with self._condition:
+            pending_chunks = self._pending_chunks
+        return {
+            "durability": self.durability,
+            "max_chunks": self.max_chunks,
+            "max_delay_ms": round(self.max_delay * 1000),
+            "pending_chunks": pending_chunks,
+            "commits": self.commits,
+            "chunks_written": self.chunks_written,
+            "avg_chunks_per_commit": round(self.chunks_written / self.commits, 1) if self.commits else None,
+            "failed_writes": self.failed_writes
+        }
\ No newline at end of file
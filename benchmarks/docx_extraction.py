@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+DOCX extraction benchmark: python-docx vs the streaming extractor.
+
+Times and measures peak traced memory of the previous python-docx based
+extraction (paragraphs only) and of app.docx_stream (paragraphs, tables,
+headers and footers). Without files, a synthetic document with paragraphs
+and tables is generated with python-docx.
+
+Usage:
+    python benchmarks/docx_extraction.py [FILE.docx ...] [--paragraphs 20000] [--tables 200] [--repeat 3]
+"""
+
+import argparse
+import io
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from docx import Document
+
+from app.docx_stream import iter_docx_blocks
+
+def python_docx_extract(data):
+    """The extraction DocumentProcessor used before the streaming extractor."""
+    doc = Document(io.BytesIO(data))
+    text = ""
+    for paragraph in doc.paragraphs:
+        text += paragraph.text + "\n"
+    return text
+
+def streaming_extract(data):
+    return "\n".join(iter_docx_blocks(data)) + "\n"
+
+def build_synthetic(paragraphs, tables):
+    """Generate a DOCX with paragraphs interleaved with 10x4 tables."""
+    doc = Document()
+    doc.sections[0].header.paragraphs[0].text = "Synthetic specification - header"
+    doc.sections[0].footer.paragraphs[0].text = "Synthetic specification - footer"
+    table_every = max(1, paragraphs // max(1, tables))
+    for i in range(paragraphs):
+        doc.add_paragraph(f"Paragraph {i}: the quick brown fox jumps over the lazy dog while the spec lists its limits.")
+        if tables and i % table_every == 0:
+            table = doc.add_table(rows=10, cols=4)
+            for r, row in enumerate(table.rows):
+                for c, cell in enumerate(row.cells):
+                    cell.text = f"r{r}c{c} value {i}"
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+def measure(extract, data, repeat):
+    """Best wall time over repeat runs, and peak traced memory of one run."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        text = extract(data)
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    extract(data)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak, len(text)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark DOCX text extraction")
+    parser.add_argument("files", nargs="*")
+    parser.add_argument("--paragraphs", type=int, default=20000)
+    parser.add_argument("--tables", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.files:
+        inputs = []
+        for path in args.files:
+            with open(path, "rb") as file:
+                inputs.append((os.path.basename(path), file.read()))
+    else:
+        print(f"Generating a document with {args.paragraphs} paragraphs and {args.tables} tables...")
+        inputs = [("synthetic.docx", build_synthetic(args.paragraphs, args.tables))]
+
+    for name, data in inputs:
+        print(f"\n{name} ({len(data) / 1e6:.1f} MB)")
+        print(f"  {'extractor':<12}{'time (s)':>10}{'peak MB':>10}{'chars':>12}")
+        for label, extract in (("python-docx", python_docx_extract), ("streaming", streaming_extract)):
+            elapsed, peak, chars = measure(extract, data, args.repeat)
+            print(f"  {label:<12}{elapsed:>10.3f}{peak / 1e6:>10.1f}{chars:>12}")
+
+if __name__ == "__main__":
+    main()
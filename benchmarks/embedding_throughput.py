@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Embedding throughput benchmark (chunks/sec).
+
+Chunks every PDF/DOCX/TXT file under a corpus directory with the regular
+DocumentProcessor, then embeds the chunks with the default single-call path
+and with the length-bucketed bulk path at several worker counts.
+
+Usage:
+    python benchmarks/embedding_throughput.py CORPUS_DIR [--workers 1 2 4] [--batch-size 64]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.document_processor import DocumentProcessor
+from app.embedding_service import EmbeddingService
+
+SUPPORTED_EXTENSIONS = {".pdf", ".docx", ".txt"}
+
+def load_chunks(corpus_dir):
+    """Chunk every supported document in the corpus directory."""
+    processor = DocumentProcessor()
+    texts = []
+    for root, _, files in os.walk(corpus_dir):
+        for name in sorted(files):
+            if os.path.splitext(name)[1].lower() not in SUPPORTED_EXTENSIONS:
+                continue
+            try:
+                chunks = processor.process_document(os.path.join(root, name))
+                texts.extend(chunk["text"] for chunk in chunks)
+            except Exception as e:
+                print(f"Skipping {name}: {e}")
+    return texts
+
+def measure(label, embed, texts):
+    """Time one embedding run and print its throughput."""
+    start = time.perf_counter()
+    embeddings = embed(texts)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<32} {elapsed:8.2f}s {len(texts) / elapsed:10.1f} chunks/sec")
+    return embeddings
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("corpus_dir")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--batch-size", type=int, default=64)
+    args = parser.parse_args()
+
+    texts = load_chunks(args.corpus_dir)
+    if not texts:
+        print("No chunks found")
+        return
+    print(f"{len(texts)} chunks from {args.corpus_dir}")
+
+    service = EmbeddingService()
+    # Warm up so model initialization is not measured
+    service.generate_embeddings(texts[:8])
+
+    baseline = measure("generate_embeddings", service.generate_embeddings, texts)
+    for workers in args.workers:
+        bulk = measure(
+            f"bulk (batch={args.batch_size}, workers={workers})",
+            lambda batch: service.generate_embeddings_bulk(batch, batch_size=args.batch_size, num_workers=workers),
+            texts
+        )
+        max_diff = max(abs(a - b) for row_a, row_b in zip(baseline, bulk) for a, b in zip(row_a, row_b))
+        print(f"{'':<32} max abs difference vs baseline: {max_diff:.2e}")
+    service.close()
+
+if __name__ == "__main__":
+    main()
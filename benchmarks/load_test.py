@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+End-to-end HTTP load generator for the RAG API.
+
+Replays a question set against /ask, optionally with parallel /upload
+traffic, and reports throughput and latency percentiles per endpoint.
+
+Two load models are supported:
+    closed loop  --concurrency N   N users, each sends its next question as soon
+                                   as the previous answer arrives
+    open loop    --rate R          questions arrive as a Poisson process at R/s,
+                                   whatever the server's latency
+
+Several --concurrency values run one after another, which shows where p99
+starts to collapse. Start the server with LLM_BACKEND=fake to load test the
+API, retrieval and queueing paths without a model.
+
+Usage:
+    python benchmarks/load_test.py QUESTIONS_FILE [--url http://localhost:8000]
+        [--concurrency 1 2 4 8 | --rate 5] [--duration 60]
+        [--upload-dir DIR --upload-concurrency 1] [--namespace NS] [--top-k 5]
+
+QUESTIONS_FILE has one question per line.
+"""
+
+import argparse
+import itertools
+import json
+import math
+import os
+import random
+import threading
+import time
+
+import requests
+
+SUPPORTED_EXTENSIONS = {".pdf", ".docx", ".txt"}
+
+def load_questions(path):
+    """Read one question per line, skipping blank lines."""
+    with open(path, "r", encoding="utf-8") as file:
+        questions = [line.strip() for line in file if line.strip()]
+    if not questions:
+        raise SystemExit(f"No questions found in {path}")
+    return questions
+
+def load_upload_files(upload_dir):
+    """List the supported documents in a directory."""
+    files = []
+    for root, _, names in os.walk(upload_dir):
+        for name in sorted(names):
+            if os.path.splitext(name)[1].lower() in SUPPORTED_EXTENSIONS:
+                files.append(os.path.join(root, name))
+    if not files:
+        raise SystemExit(f"No PDF/DOCX/TXT files found in {upload_dir}")
+    return files
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a list of latencies."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+class Recorder:
+    """Thread-safe collection of per-endpoint latencies and errors."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = {}
+        self.errors = {}
+
+    def record(self, endpoint, latency, ok):
+        with self.lock:
+            if ok:
+                self.latencies.setdefault(endpoint, []).append(latency)
+            else:
+                self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+
+    def report(self, elapsed):
+        endpoints = sorted(set(self.latencies) | set(self.errors))
+        return {
+            endpoint: {
+                "ok": len(self.latencies.get(endpoint, [])),
+                "errors": self.errors.get(endpoint, 0),
+                "throughput": len(self.latencies.get(endpoint, [])) / elapsed if elapsed else 0.0,
+                "mean": sum(self.latencies.get(endpoint, [])) / max(1, len(self.latencies.get(endpoint, []))),
+                "p50": percentile(self.latencies.get(endpoint, []), 0.50),
+                "p90": percentile(self.latencies.get(endpoint, []), 0.90),
+                "p99": percentile(self.latencies.get(endpoint, []), 0.99)
+            }
+            for endpoint in endpoints
+        }
+
+class LoadTest:
+    """One load test run against a running API instance."""
+
+    def __init__(self, args, questions, upload_files):
+        self.args = args
+        self.questions = itertools.cycle(questions)
+        self.upload_files = itertools.cycle(upload_files) if upload_files else None
+        self.next_lock = threading.Lock()
+        self.recorder = Recorder()
+        self.stop_at = 0.0
+        self.sessions = threading.local()
+
+    def session(self):
+        """One pooled HTTP session per thread."""
+        if not hasattr(self.sessions, "session"):
+            self.sessions.session = requests.Session()
+        return self.sessions.session
+
+    def next_question(self):
+        with self.next_lock:
+            return next(self.questions)
+
+    def next_upload(self):
+        with self.next_lock:
+            return next(self.upload_files)
+
+    def ask(self):
+        payload = {"question": self.next_question(), "top_k": self.args.top_k}
+        if self.args.namespace:
+            payload["namespace"] = self.args.namespace
+        start = time.perf_counter()
+        try:
+            response = self.session().post(f"{self.args.url}/ask", json=payload, timeout=self.args.timeout)
+            ok = response.status_code == 200
+        except requests.RequestException:
+            ok = False
+        self.recorder.record("/ask", time.perf_counter() - start, ok)
+
+    def upload(self):
+        path = self.next_upload()
+        params = {"namespace": self.args.namespace} if self.args.namespace else None
+        start = time.perf_counter()
+        try:
+            with open(path, "rb") as file:
+                response = self.session().post(
+                    f"{self.args.url}/upload",
+                    files={"file": (os.path.basename(path), file)},
+                    params=params,
+                    timeout=self.args.timeout
+                )
+            ok = response.status_code == 200
+        except requests.RequestException:
+            ok = False
+        self.recorder.record("/upload", time.perf_counter() - start, ok)
+
+    def closed_loop_user(self):
+        while time.perf_counter() < self.stop_at:
+            self.ask()
+
+    def uploader(self):
+        while time.perf_counter() < self.stop_at:
+            self.upload()
+
+    def open_loop(self, rate):
+        """Fire questions as a Poisson process; each runs on its own thread."""
+        in_flight = []
+        next_arrival = time.perf_counter()
+        while True:
+            next_arrival += random.expovariate(rate)
+            if next_arrival >= self.stop_at:
+                break
+            time.sleep(max(0.0, next_arrival - time.perf_counter()))
+            thread = threading.Thread(target=self.ask, daemon=True)
+            thread.start()
+            in_flight.append(thread)
+        for thread in in_flight:
+            thread.join()
+
+    def run(self, concurrency=None, rate=None):
+        """Run for the configured duration and return the report."""
+        start = time.perf_counter()
+        self.stop_at = start + self.args.duration
+
+        threads = []
+        if self.upload_files:
+            threads += [threading.Thread(target=self.uploader, daemon=True) for _ in range(self.args.upload_concurrency)]
+        if rate:
+            threads.append(threading.Thread(target=self.open_loop, args=(rate,), daemon=True))
+        else:
+            threads += [threading.Thread(target=self.closed_loop_user, daemon=True) for _ in range(concurrency)]
+
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        return self.recorder.report(time.perf_counter() - start)
+
+def print_report(label, report):
+    print(f"\n{label}")
+    print(f"  {'endpoint':<10}{'ok':>7}{'errors':>8}{'req/s':>9}{'mean':>9}{'p50':>9}{'p90':>9}{'p99':>9}")
+    for endpoint, stats in report.items():
+        print(
+            f"  {endpoint:<10}{stats['ok']:>7}{stats['errors']:>8}{stats['throughput']:>9.2f}"
+            f"{stats['mean']:>9.3f}{stats['p50']:>9.3f}{stats['p90']:>9.3f}{stats['p99']:>9.3f}"
+        )
+
+def main():
+    parser = argparse.ArgumentParser(description="HTTP load test for /ask and /upload")
+    parser.add_argument("questions_file")
+    parser.add_argument("--url", default="http://localhost:8000")
+    load = parser.add_mutually_exclusive_group()
+    load.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8])
+    load.add_argument("--rate", type=float, default=None, help="open-loop arrival rate in questions/sec")
+    parser.add_argument("--duration", type=float, default=60.0, help="seconds per run")
+    parser.add_argument("--upload-dir", default=None, help="also upload these documents in parallel")
+    parser.add_argument("--upload-concurrency", type=int, default=1)
+    parser.add_argument("--namespace", default=None)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=300.0)
+    parser.add_argument("--json", default=None, help="also write the results to this file")
+    args = parser.parse_args()
+
+    questions = load_questions(args.questions_file)
+    upload_files = load_upload_files(args.upload_dir) if args.upload_dir else None
+
+    try:
+        status = requests.get(f"{args.url}/status", timeout=10).json()
+        print(f"LLM: {json.dumps(status.get('llm_service', {}))}")
+    except requests.RequestException as e:
+        raise SystemExit(f"API not reachable at {args.url}: {e}")
+
+    results = []
+    if args.rate:
+        report = LoadTest(args, questions, upload_files).run(rate=args.rate)
+        print_report(f"Open loop at {args.rate:.2f} questions/s for {args.duration:.0f}s", report)
+        results.append({"rate": args.rate, "report": report})
+    else:
+        for concurrency in args.concurrency:
+            report = LoadTest(args, questions, upload_files).run(concurrency=concurrency)
+            print_report(f"Closed loop with {concurrency} concurrent users for {args.duration:.0f}s", report)
+            results.append({"concurrency": concurrency, "report": report})
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+
+if __name__ == "__main__":
+    main()
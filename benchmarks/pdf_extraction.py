@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Page-parallel PDF extraction benchmark: speedup by number of page workers.
+
+Extracts the same PDF with 1, 2, 4, ... page worker processes and prints
+the wall time, pages per second and speedup over in-process extraction.
+The worker pool is started (and warmed up) before timing, as it is reused
+across uploads in the API. Without files, a synthetic PDF whose pages are
+filled with text is generated with PyMuPDF.
+
+Usage:
+    python benchmarks/pdf_extraction.py [FILE.pdf ...] [--pages 2000] [--workers 1,2,4,8] [--repeat 3]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import fitz
+
+from app.config import settings
+from app.document_processor import DocumentProcessor
+
+def build_synthetic(pages):
+    """Generate a PDF with pages full of small text."""
+    doc = fitz.open()
+    line = "The quick brown fox jumps over the lazy dog while the spec lists pump limits and valve ratings. "
+    for number in range(pages):
+        page = doc.new_page()
+        page.insert_textbox(page.rect + (36, 36, -36, -36), f"Page {number + 1}. " + line * 40, fontsize=7)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+def measure(processor, data, repeat):
+    """Best wall time over repeat runs, and the number of pages."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        pages = processor.extract_pages_from_pdf(data)
+        best = min(best, time.perf_counter() - start)
+    return best, len(pages)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark page-parallel PDF extraction")
+    parser.add_argument("files", nargs="*")
+    parser.add_argument("--pages", type=int, default=2000)
+    parser.add_argument("--workers", default="1,2,4,8", help="comma separated page worker counts")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    # Split every PDF, however small, so the curve shows the extraction itself
+    settings.PDF_PARALLEL_MIN_PAGES = 2
+    worker_counts = [int(count) for count in args.workers.split(",")]
+
+    if args.files:
+        inputs = []
+        for path in args.files:
+            with open(path, "rb") as file:
+                inputs.append((os.path.basename(path), file.read()))
+    else:
+        print(f"Generating a PDF with {args.pages} pages...")
+        inputs = [("synthetic.pdf", build_synthetic(args.pages))]
+
+    for name, data in inputs:
+        print(f"\n{name} ({len(data) / 1e6:.1f} MB)")
+        print(f"  {'workers':<10}{'time (s)':>10}{'pages/s':>10}{'speedup':>10}")
+        baseline = None
+        for workers in worker_counts:
+            processor = DocumentProcessor(page_workers=workers)
+            try:
+                processor.extract_pages_from_pdf(data)  # start and warm up the pool
+                elapsed, pages = measure(processor, data, args.repeat)
+            finally:
+                processor.close()
+            baseline = baseline or elapsed
+            print(f"  {workers:<10}{elapsed:>10.3f}{pages / elapsed:>10.0f}{baseline / elapsed:>9.2f}x")
+
+if __name__ == "__main__":
+    main()
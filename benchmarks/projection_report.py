@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Recall/latency report for projected embeddings.
+
+Samples stored embeddings from a namespace (or generates synthetic ones),
+holds out some of them as queries, and for each target dimension fits a
+projection on the rest and compares its top-k against exact full-dimension
+cosine search. Reports recall@k, brute-force search latency per query and
+vector memory, so a dimension can be picked before running
+"python -m app.projection migrate".
+
+Usage:
+    python benchmarks/projection_report.py [--namespace NS] [--dims 256 192 128 96 64 32]
+        [--method pca|truncate] [--sample 20000] [--queries 500] [--top-k 5]
+    python benchmarks/projection_report.py --synthetic 20000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.projection import fit_pca, truncation, sample_embeddings
+
+def synthetic_embeddings(count, dimension=384, rank=48, seed=0):
+    """Unit vectors whose energy decays over a few dozen directions, like sentence embeddings."""
+    rng = np.random.default_rng(seed)
+    basis = np.linalg.qr(rng.normal(size=(dimension, dimension)))[0][:, :rank].T
+    weights = rng.normal(size=(count, rank)) * np.exp(-np.arange(rank) / 12)
+    vectors = weights @ basis + 0.02 * rng.normal(size=(count, dimension))
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+def normalize(vectors):
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+def top_k(corpus, queries, k):
+    scores = queries @ corpus.T
+    return np.argpartition(-scores, k, axis=1)[:, :k]
+
+def search_latency(corpus, queries, k):
+    """Mean seconds per query for brute-force cosine search."""
+    start = time.perf_counter()
+    for query in queries:
+        scores = corpus @ query
+        np.argpartition(-scores, k)[:k]
+    return (time.perf_counter() - start) / len(queries)
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall and latency of projected embeddings")
+    parser.add_argument("--namespace", default=None)
+    parser.add_argument("--synthetic", type=int, default=0, help="use this many synthetic embeddings instead of the store")
+    parser.add_argument("--dims", type=int, nargs="+", default=[256, 192, 128, 96, 64, 32])
+    parser.add_argument("--method", choices=("pca", "truncate"), default="pca")
+    parser.add_argument("--sample", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--top-k", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.synthetic:
+        embeddings = synthetic_embeddings(args.synthetic)
+    else:
+        from app.vector_store import VectorStore
+        vector_store = VectorStore(embedding_service=None)
+        if vector_store.get_projection(args.namespace) is not None:
+            raise SystemExit("Namespace is already projected; report on an unprojected namespace")
+        embeddings = sample_embeddings(vector_store, args.namespace, args.sample)
+    if len(embeddings) <= args.queries:
+        raise SystemExit(f"Need more than {args.queries} embeddings, found {len(embeddings)}")
+
+    embeddings = normalize(np.asarray(embeddings, dtype=np.float32))
+    rng = np.random.default_rng(1)
+    order = rng.permutation(len(embeddings))
+    queries, corpus = embeddings[order[:args.queries]], embeddings[order[args.queries:]]
+    exact = top_k(corpus, queries, args.top_k)
+
+    print(f"{len(corpus)} vectors, {len(queries)} queries, {corpus.shape[1]} dimensions, recall@{args.top_k} vs exact search")
+    print(f"  {'dim':>5}{'recall':>9}{'ms/query':>10}{'MB':>8}")
+    print(
+        f"  {corpus.shape[1]:>5}{1.0:>9.3f}{search_latency(corpus, queries, args.top_k) * 1000:>10.3f}"
+        f"{corpus.nbytes / 1e6:>8.1f}"
+    )
+
+    for dim in sorted(args.dims, reverse=True):
+        if dim >= corpus.shape[1]:
+            continue
+        projection = fit_pca(corpus, dim) if args.method == "pca" else truncation(corpus.shape[1], dim)
+        projected_corpus = projection.apply(corpus)
+        projected_queries = projection.apply(queries)
+
+        approx = top_k(projected_corpus, projected_queries, args.top_k)
+        recall = np.mean([len(set(a) & set(e)) / args.top_k for a, e in zip(approx, exact)])
+        latency = search_latency(projected_corpus, projected_queries, args.top_k)
+        print(f"  {dim:>5}{recall:>9.3f}{latency * 1000:>10.3f}{projected_corpus.nbytes / 1e6:>8.1f}")
+
+if __name__ == "__main__":
+    main()
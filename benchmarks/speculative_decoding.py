@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Prompt lookup speculative decoding benchmark.
+
+Answers a fixed question set with the local model twice, once plainly and
+once with LLM_SPECULATIVE_DECODING, using greedy decoding (temperature 0) so
+the answers should match token for token. Reports generated tokens/sec for
+each run, the speedup and how many answers are identical.
+
+The built-in question set has short policy-style contexts that answers quote
+from. A JSONL file with {"question": ..., "context": [...]} lines, where
+context items are chunk texts, can be used instead.
+
+Usage:
+    python benchmarks/speculative_decoding.py [--questions FILE] [--draft-tokens 2 5 10]
+        [--max-tokens 256] [--repeat 1]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.config import settings
+from app.llm_service import LLMService
+
+QUESTION_SET = [
+    {
+        "question": "How long do employees have to submit expense reports?",
+        "context": [
+            "Expense policy. Employees must submit expense reports within thirty days of purchase. Reports must "
+            "include itemized receipts for every item above twenty-five dollars. Reports submitted late are "
+            "returned unpaid unless a manager approves an exception in writing."
+        ]
+    },
+    {
+        "question": "What must a visitor do on arrival?",
+        "context": [
+            "Visitor policy. All visitors must sign in at the reception desk on arrival, show photo "
+            "identification and wear a visitor badge at all times. Visitors must be accompanied by their host "
+            "in every area outside the lobby and must return the badge when they leave."
+        ]
+    },
+    {
+        "question": "When are backups taken and how long are they kept?",
+        "context": [
+            "Backup procedure. Production databases are backed up every night at 02:00 UTC. Nightly backups "
+            "are kept for thirty-five days, and the backup taken on the first day of each month is kept for "
+            "seven years. Restores are tested once per quarter by the operations team."
+        ]
+    },
+    {
+        "question": "Who can approve remote work and for how many days a week?",
+        "context": [
+            "Remote work. Employees may work remotely up to three days a week with the approval of their "
+            "direct manager. Remote work for more than three days a week requires approval from the head of "
+            "department and a review every six months."
+        ]
+    }
+]
+
+def load_questions(path):
+    items = []
+    with open(path, encoding="utf-8") as file:
+        for line in file:
+            if line.strip():
+                items.append(json.loads(line))
+    return items
+
+def run(llm, items, max_tokens, repeat):
+    """Generated tokens per second and the answers of one pass over the question set."""
+    params = {**llm._generation_params(), "max_tokens": max_tokens, "temperature": 0.0}
+    answers = []
+    tokens = 0
+    start = time.perf_counter()
+    for _ in range(repeat):
+        answers = []
+        for item in items:
+            context = [{"text": text, "metadata": {"filename": f"doc{i}.txt"}} for i, text in enumerate(item["context"])]
+            response = llm.model(llm._create_prompt(item["question"], context), echo=False, **params)
+            tokens += response["usage"]["completion_tokens"]
+            answers.append(response["choices"][0]["text"].strip())
+    return tokens / (time.perf_counter() - start), answers
+
+def main():
+    parser = argparse.ArgumentParser(description="Tokens/sec with and without prompt lookup decoding")
+    parser.add_argument("--questions", default=None, help="JSONL question set (default: built-in)")
+    parser.add_argument("--draft-tokens", type=int, nargs="+", default=[2, 5, 10])
+    parser.add_argument("--max-tokens", type=int, default=256)
+    parser.add_argument("--repeat", type=int, default=1)
+    args = parser.parse_args()
+
+    items = load_questions(args.questions) if args.questions else QUESTION_SET
+
+    settings.LLM_SPECULATIVE_DECODING = False
+    llm = LLMService()
+    baseline_rate, baseline_answers = run(llm, items, args.max_tokens, args.repeat)
+    del llm
+    print(f"{len(items)} questions, greedy decoding, up to {args.max_tokens} tokens per answer")
+    print(f"  {'mode':<20}{'tokens/s':>10}{'speedup':>9}{'identical':>11}")
+    print(f"  {'plain':<20}{baseline_rate:>10.1f}{1.0:>9.2f}{len(items):>8}/{len(items)}")
+
+    settings.LLM_SPECULATIVE_DECODING = True
+    for draft_tokens in args.draft_tokens:
+        settings.LLM_DRAFT_TOKENS = draft_tokens
+        llm = LLMService()
+        rate, answers = run(llm, items, args.max_tokens, args.repeat)
+        del llm
+        identical = sum(a == b for a, b in zip(answers, baseline_answers))
+        print(f"  {'lookup, ' + str(draft_tokens) + ' drafts':<20}{rate:>10.1f}{rate / baseline_rate:>9.2f}{identical:>8}/{len(items)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Latency and recall of two-level retrieval against flat chunk search.
+
+Builds a synthetic corpus in a temporary persist directory: each document is
+a topic direction and its chunks are noisy copies of it. Queries are noisy
+copies of random chunks. Both retrieval modes run through
+VectorStore.search_by_embeddings and are compared with exact numpy top-k.
+
+Usage:
+    python benchmarks/two_level_retrieval.py [--documents 2000] [--chunks 25] [--dim 384]
+        [--queries 200] [--top-k 5] [--top-m 5 10 20 50] [--noise 0.6]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.config import settings
+
+def normalize(vectors):
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+def build_corpus(documents, chunks, dimension, noise, seed=0):
+    rng = np.random.default_rng(seed)
+    topics = normalize(rng.normal(size=(documents, dimension)))
+    vectors = np.repeat(topics, chunks, axis=0) + noise * rng.normal(size=(documents * chunks, dimension)) / np.sqrt(dimension)
+    return normalize(vectors).astype(np.float32)
+
+def run(vector_store, queries, top_k):
+    """Mean seconds per query and the result ids."""
+    ids = []
+    start = time.perf_counter()
+    for query in queries:
+        results = vector_store.search_by_embeddings([query.tolist()], top_k=top_k)[0]
+        ids.append([int(result["id"]) for result in results])
+    return (time.perf_counter() - start) / len(queries), ids
+
+def recall(found, exact):
+    return np.mean([len(set(f) & set(e)) / len(e) for f, e in zip(found, exact)])
+
+def main():
+    parser = argparse.ArgumentParser(description="Two-level vs flat retrieval")
+    parser.add_argument("--documents", type=int, default=2000)
+    parser.add_argument("--chunks", type=int, default=25)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--top-m", type=int, nargs="+", default=[5, 10, 20, 50])
+    parser.add_argument("--noise", type=float, default=0.6, help="chunk spread around its document's topic")
+    args = parser.parse_args()
+
+    settings.CHROMA_PERSIST_DIRECTORY = tempfile.mkdtemp(prefix="two-level-")
+    settings.CHUNK_STORE_ENABLED = False
+    from app.vector_store import VectorStore
+
+    corpus = build_corpus(args.documents, args.chunks, args.dim, args.noise)
+    vector_store = VectorStore(embedding_service=None)
+    start = time.perf_counter()
+    batch = 5000
+    for offset in range(0, len(corpus), batch):
+        rows = range(offset, min(offset + batch, len(corpus)))
+        vector_store.add_embeddings(
+            [str(i) for i in rows],
+            corpus[offset:offset + len(rows)].tolist(),
+            ["" for _ in rows],
+            [{"filename": f"doc{i // args.chunks}", "chunk_id": i % args.chunks} for i in rows]
+        )
+    print(f"Indexed {args.documents} documents x {args.chunks} chunks ({args.dim}-d) in {time.perf_counter() - start:.1f}s")
+
+    rng = np.random.default_rng(1)
+    queries = normalize(corpus[rng.integers(0, len(corpus), args.queries)] + 0.3 * rng.normal(size=(args.queries, args.dim)) / np.sqrt(args.dim))
+    exact = np.argsort(-(queries @ corpus.T), axis=1)[:, :args.top_k].tolist()
+
+    print(f"  {'mode':<16}{'ms/query':>10}{'recall@' + str(args.top_k):>11}")
+    settings.RETRIEVAL_MODE = "flat"
+    latency, ids = run(vector_store, queries, args.top_k)
+    print(f"  {'flat':<16}{latency * 1000:>10.2f}{recall(ids, exact):>11.3f}")
+
+    settings.RETRIEVAL_MODE = "two_level"
+    for top_m in args.top_m:
+        settings.DOC_PRUNING_TOP_M = top_m
+        latency, ids = run(vector_store, queries, args.top_k)
+        print(f"  {'two_level M=' + str(top_m):<16}{latency * 1000:>10.2f}{recall(ids, exact):>11.3f}")
+
+    vector_store.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Write-behind group commit benchmark: vector store inserts/sec under concurrent small uploads.
+
+Each of --threads threads adds --documents small documents of --chunks
+chunks to a fresh persistent store, through VectorStore.add_documents, once
+with one insert per upload and once per write buffer durability mode.
+Embeddings come from a cheap deterministic stand-in, so the numbers measure
+the vector store writes rather than the model.
+
+Usage:
+    python benchmarks/write_buffer.py [--threads 16] [--documents 25] [--chunks 3] [--dim 384]
+        [--max-chunks 2048] [--max-delay-ms 50]
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import numpy as np
+
+from app.config import settings
+from app.vector_store import VectorStore
+
+class RandomEmbeddingService:
+    """Normalized random vectors of a fixed dimension."""
+
+    def __init__(self, dim):
+        self.dim = dim
+
+    def generate_embeddings(self, texts):
+        vectors = np.random.default_rng().normal(size=(len(texts), self.dim)).astype(np.float32)
+        return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).tolist()
+
+def run(label, args, enabled, durability):
+    """Time the concurrent uploads and the closing flush, and print one result row."""
+    directory = tempfile.mkdtemp(prefix="write-buffer-")
+    settings.CHROMA_PERSIST_DIRECTORY = directory
+    settings.WRITE_BUFFER_ENABLED = enabled
+    settings.WRITE_BUFFER_DURABILITY = durability
+    settings.WRITE_BUFFER_MAX_CHUNKS = args.max_chunks
+    settings.WRITE_BUFFER_MAX_DELAY_MS = args.max_delay_ms
+    store = VectorStore(RandomEmbeddingService(args.dim))
+
+    def upload(thread):
+        for d in range(args.documents):
+            filename = f"t{thread}-d{d}.txt"
+            store.add_documents([
+                {"text": f"{filename} chunk {c}", "metadata": {"filename": filename, "chunk_id": c}}
+                for c in range(args.chunks)
+            ])
+
+    threads = [threading.Thread(target=upload, args=(t,)) for t in range(args.threads)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    acknowledged = time.perf_counter() - start
+    stats = store.get_write_buffer_stats()
+    store.close()
+    elapsed = time.perf_counter() - start
+
+    total = args.threads * args.documents * args.chunks
+    commits = stats["commits"] if stats else args.threads * args.documents
+    print(
+        f"  {label:<16}{acknowledged:>10.2f}{elapsed:>10.2f}{total / elapsed:>12.0f}"
+        f"{commits:>9}{total / max(commits, 1):>12.1f}"
+    )
+    shutil.rmtree(directory, ignore_errors=True)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark write-behind group commit of vector store inserts")
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--documents", type=int, default=25, help="documents uploaded per thread")
+    parser.add_argument("--chunks", type=int, default=3, help="chunks per document")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--max-chunks", type=int, default=2048)
+    parser.add_argument("--max-delay-ms", type=int, default=50)
+    args = parser.parse_args()
+
+    # Keep the comparison to the chunk inserts themselves
+    settings.DOCUMENT_INDEX_ENABLED = False
+    settings.CHUNK_STORE_ENABLED = False
+    settings.NEAR_DUP_MODE = "off"
+
+    total = args.threads * args.documents * args.chunks
+    print(f"{args.threads} threads x {args.documents} documents x {args.chunks} chunks = {total} chunks")
+    print(f"  {'mode':<16}{'acked (s)':>10}{'total (s)':>10}{'chunks/s':>12}{'commits':>9}{'per commit':>12}")
+    run("per upload", args, False, "flush")
+    run("buffer: flush", args, True, "flush")
+    run("buffer: buffer", args, True, "buffer")
+
+if __name__ == "__main__":
+    main()
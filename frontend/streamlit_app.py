@@ -7,6 +7,47 @@ import os
 
 # Configuration
 API_BASE_URL = "http://localhost:8000"
+CATALOG_CACHE_TTL = 30  # seconds before /documents and /status are revalidated
+
+@st.cache_resource
+def get_http_session() -> requests.Session:
+    """Shared HTTP session so requests reuse pooled keep-alive connections."""
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=16)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+def cached_get(path, params=None, ttl=CATALOG_CACHE_TTL):
+    """GET a JSON endpoint through a per-session TTL cache revalidated with ETags.
+    
+    Within the TTL the cached body is returned without any request. After it,
+    a conditional request is sent and a 304 Not Modified keeps the cached body.
+    Returns the decoded JSON body, or raises for non-success responses.
+    """
+    cache = st.session_state.setdefault("http_cache", {})
+    key = (path, tuple(sorted((params or {}).items())))
+    entry = cache.get(key)
+    now = time.time()
+    
+    if entry is not None and now - entry["fetched_at"] < ttl:
+        return entry["data"]
+    
+    headers = {"If-None-Match": entry["etag"]} if entry is not None and entry["etag"] else {}
+    response = get_http_session().get(f"{API_BASE_URL}{path}", params=params, headers=headers, timeout=10)
+    
+    if response.status_code == 304 and entry is not None:
+        entry["fetched_at"] = now
+        return entry["data"]
+    
+    response.raise_for_status()
+    data = response.json()
+    cache[key] = {"etag": response.headers.get("ETag"), "data": data, "fetched_at": now}
+    return data
+
+def invalidate_cache():
+    """Drop cached catalog/status responses after this session changed them."""
+    st.session_state["http_cache"] = {}
 
 def main():
     st.set_page_config(
@@ -23,6 +64,14 @@ def main():
     with st.sidebar:
         st.header("📁 Document Management")
         
+        # Namespace (tenant) selection
+        namespace = st.text_input(
+            "Namespace",
+            value="",
+            help="Documents and questions are isolated per namespace. Leave empty for the default one."
+        ).strip() or None
+        namespace_params = {"namespace": namespace} if namespace else {}
+        
         # File upload
         uploaded_file = st.file_uploader(
             "Upload a document",
@@ -35,9 +84,10 @@ def main():
                 with st.spinner("Uploading and processing document..."):
                     try:
                         files = {"file": uploaded_file}
-                        response = requests.post(f"{API_BASE_URL}/upload", files=files)
+                        response = get_http_session().post(f"{API_BASE_URL}/upload", files=files, params=namespace_params)
                         
                         if response.status_code == 200:
+                            invalidate_cache()
                             result = response.json()
                             st.success(f"✅ {result['message']}")
                             st.info(f"📊 Processed {result['chunks_processed']} chunks")
@@ -51,27 +101,24 @@ def main():
         # Document list
         st.subheader("📋 Uploaded Documents")
         try:
-            response = requests.get(f"{API_BASE_URL}/documents")
-            if response.status_code == 200:
-                documents = response.json()["documents"]
-                if documents:
-                    for doc in documents:
-                        col1, col2 = st.columns([3, 1])
-                        with col1:
-                            st.write(f"📄 {doc['filename']}")
-                            st.caption(f"Chunks: {doc['chunks_count']} | Size: {doc['file_size']} chars")
-                        with col2:
-                            if st.button("🗑️", key=f"del_{doc['filename']}"):
-                                delete_response = requests.delete(f"{API_BASE_URL}/documents/{doc['filename']}")
-                                if delete_response.status_code == 200:
-                                    st.success("Deleted!")
-                                    st.rerun()
-                                else:
-                                    st.error("Delete failed")
-                else:
-                    st.info("No documents uploaded yet")
+            documents = cached_get("/documents", params=namespace_params)["documents"]
+            if documents:
+                for doc in documents:
+                    col1, col2 = st.columns([3, 1])
+                    with col1:
+                        st.write(f"📄 {doc['filename']}")
+                        st.caption(f"Chunks: {doc['chunks_count']} | Size: {doc['file_size']} chars")
+                    with col2:
+                        if st.button("🗑️", key=f"del_{doc['filename']}"):
+                            delete_response = get_http_session().delete(f"{API_BASE_URL}/documents/{doc['filename']}", params=namespace_params)
+                            if delete_response.status_code == 200:
+                                invalidate_cache()
+                                st.success("Deleted!")
+                                st.rerun()
+                            else:
+                                st.error("Delete failed")
             else:
-                st.error("Failed to load documents")
+                st.info("No documents uploaded yet")
         except Exception as e:
             st.error(f"Error loading documents: {str(e)}")
         
@@ -80,26 +127,22 @@ def main():
         # System status
         st.subheader("⚙️ System Status")
         try:
-            response = requests.get(f"{API_BASE_URL}/status")
-            if response.status_code == 200:
-                status = response.json()
-                
-                # Embedding service
-                emb_status = status.get("embedding_service", {})
-                st.write(f"🔤 Embeddings: {emb_status.get('status', 'Unknown')}")
-                st.caption(f"Model: {emb_status.get('model', 'Unknown')}")
-                
-                # Vector store
-                vs_status = status.get("vector_store", {})
-                st.write(f"🗄️ Vector Store: {vs_status.get('status', 'Unknown')}")
-                st.caption(f"Documents: {vs_status.get('document_count', 0)}")
-                
-                # LLM service
-                llm_status = status.get("llm_service", {})
-                st.write(f"🧠 LLM: {llm_status.get('status', 'Unknown')}")
-                st.caption(f"Model: {llm_status.get('model_type', 'Unknown')}")
-            else:
-                st.error("Failed to get system status")
+            status = cached_get("/status")
+            
+            # Embedding service
+            emb_status = status.get("embedding_service", {})
+            st.write(f"🔤 Embeddings: {emb_status.get('status', 'Unknown')}")
+            st.caption(f"Model: {emb_status.get('model', 'Unknown')}")
+            
+            # Vector store
+            vs_status = status.get("vector_store", {})
+            st.write(f"🗄️ Vector Store: {vs_status.get('status', 'Unknown')}")
+            st.caption(f"Documents: {vs_status.get('document_count', 0)}")
+            
+            # LLM service
+            llm_status = status.get("llm_service", {})
+            st.write(f"🧠 LLM: {llm_status.get('status', 'Unknown')}")
+            st.caption(f"Model: {llm_status.get('model_type', 'Unknown')}")
         except Exception as e:
             st.error(f"Error getting status: {str(e)}")
     
@@ -137,9 +180,9 @@ def main():
         with st.chat_message("assistant"):
             with st.spinner("🤔 Thinking..."):
                 try:
-                    response = requests.post(
+                    response = get_http_session().post(
                         f"{API_BASE_URL}/ask",
-                        json={"question": prompt, "top_k": 5}
+                        json={"question": prompt, "top_k": 5, "namespace": namespace}
                     )
                     
                     if response.status_code == 200:
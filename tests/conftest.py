@@ -0,0 +1,39 @@
+import hashlib
+import numpy as np
+import pytest
+from app.config import settings
+
+class HashingEmbeddingService:
+    """Deterministic unit vectors seeded by each text's hash, counting the texts it embedded."""
+
+    def __init__(self, model_name=None, dimension=8):
+        self.model_name = model_name or settings.EMBEDDING_MODEL
+        self.dimension = dimension
+        self.embedded = 0
+
+    def generate_embeddings(self, texts):
+        self.embedded += len(texts)
+        vectors = []
+        for text in texts:
+            seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:4], "big")
+            vector = np.random.default_rng(seed).normal(size=self.dimension)
+            vectors.append((vector / np.linalg.norm(vector)).tolist())
+        return vectors
+
+    def generate_embeddings_bulk(self, texts):
+        return self.generate_embeddings(texts)
+
+    def generate_single_embedding(self, text):
+        return self.generate_embeddings([text])[0]
+
+    def close(self):
+        pass
+
+@pytest.fixture
+def make_embedding_service():
+    """Build embedding service stubs, e.g. one per model for re-embedding tests."""
+    return HashingEmbeddingService
+
+@pytest.fixture
+def embedding_service(make_embedding_service):
+    return make_embedding_service()
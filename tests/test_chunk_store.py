@@ -0,0 +1,91 @@
+import numpy as np
+from app.config import settings
+from app.chunk_store import ChunkStore
+from app.vector_store import VectorStore
+
+def overlapping_chunks(text, filename, size=40, step=30):
+    chunks = []
+    for i, offset in enumerate(range(0, len(text), step)):
+        chunk = text[offset:offset + size]
+        chunks.append({
+            "text": chunk,
+            "metadata": {"filename": filename, "chunk_id": i, "char_offset": offset, "char_length": len(chunk)}
+        })
+    return chunks
+
+def test_chunk_store_round_trip_and_stats(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "CHUNK_STORE_CACHE_DOCUMENTS", 1)
+    store = ChunkStore(str(tmp_path / "chunks.sqlite3"))
+    text = "Pressure limits for pump P-100. " * 50
+
+    text_hash = store.put("default", "a.txt", text, chunk_bytes=2 * len(text))
+    store.put("default", "b.txt", "Other document.", chunk_bytes=15)
+
+    assert store.get_chunk_text("default", "a.txt", 9, 6, text_hash) == "limits"
+    assert store.get_text("other", "a.txt", text_hash) is None
+    assert store.has("default", "a.txt") and not store.has("other", "a.txt")
+    stats = store.get_stats()
+    assert stats["documents"] == 2
+    assert stats["chunk_text_bytes"] == 2 * len(text) + 15
+    assert stats["bytes_saved"] > len(text)
+
+    store.delete("default", "a.txt")
+    assert store.get_text("default", "a.txt", text_hash) is None
+    store.close()
+
+def test_a_new_version_never_serves_the_old_text(tmp_path):
+    path = str(tmp_path / "chunks.sqlite3")
+    writer, reader = ChunkStore(path), ChunkStore(path)
+    old_hash = writer.put("default", "a.txt", "Version one of the text.", chunk_bytes=24)
+    assert reader.get_text("default", "a.txt", old_hash) == "Version one of the text."
+
+    # Another process replaces the text; the reader's cached copy belongs to the old hash only
+    new_hash = writer.put("default", "a.txt", "Version two.", chunk_bytes=12)
+    assert reader.get_text("default", "a.txt", new_hash) == "Version two."
+    assert writer.get_text("default", "a.txt", old_hash) is None
+    assert writer.get_stats()["documents"] == 1
+    writer.close()
+    reader.close()
+
+def test_vector_store_keeps_chunk_text_out_of_chroma(tmp_path, monkeypatch, embedding_service):
+    monkeypatch.setattr(settings, "CHROMA_PERSIST_DIRECTORY", str(tmp_path))
+    monkeypatch.setattr(settings, "CHUNK_STORE_ENABLED", True)
+    store = VectorStore(embedding_service)
+    text = "Valve V-7 opens at 3 bar and closes at 1 bar. Pump P-100 runs at 50 Hz. " * 3
+    chunks = overlapping_chunks(text, "spec.txt")
+
+    store.add_documents(chunks, namespace="tenant", source_text=text)
+
+    raw = store._get_collection("tenant").get(include=["documents"])
+    assert set(raw["documents"]) == {""}
+
+    results = store.search(chunks[2]["text"], top_k=len(chunks), namespace="tenant")
+    assert {result["text"] for result in results} == {chunk["text"] for chunk in chunks}
+    assert [chunk["text"] for chunk in store.get_documents_by_filename("spec.txt", namespace="tenant")] == [chunk["text"] for chunk in chunks]
+    batch = next(store.iter_chunks(namespace="tenant"))
+    assert sorted(batch["texts"]) == sorted(chunk["text"] for chunk in chunks)
+    assert store.get_chunk_store_stats()["chunk_text_bytes"] == sum(len(chunk["text"]) for chunk in chunks)
+
+    store.delete_documents_by_filename("spec.txt", namespace="tenant")
+    assert store.get_chunk_store_stats()["documents"] == 0
+    store.close()
+
+def test_reupload_replaces_the_chunks_of_the_old_version(tmp_path, monkeypatch, embedding_service):
+    monkeypatch.setattr(settings, "CHROMA_PERSIST_DIRECTORY", str(tmp_path))
+    monkeypatch.setattr(settings, "CHUNK_STORE_ENABLED", True)
+    store = VectorStore(embedding_service)
+    first = "Valve V-7 opens at 3 bar and closes at 1 bar. Pump P-100 runs at 50 Hz. " * 3
+    second = "Pump P-200 replaces P-100 and runs at 60 Hz."
+    store.add_documents(overlapping_chunks(first, "f.txt"), source_text=first)
+
+    chunks = overlapping_chunks(second, "f.txt")
+    store.add_documents(chunks, source_text=second)
+
+    stored = store.get_documents_by_filename("f.txt")
+    assert sorted(chunk["text"] for chunk in stored) == sorted(chunk["text"] for chunk in chunks)
+    raw = store._get_collection().get(include=["embeddings"])
+    assert sorted(raw["ids"]) == [f"f.txt_{i}" for i in range(len(chunks))]
+    for chunk_id, embedding in zip(raw["ids"], raw["embeddings"]):
+        chunk = chunks[int(chunk_id.rsplit("_", 1)[1])]
+        assert np.allclose(embedding, embedding_service.generate_single_embedding(chunk["text"]), atol=1e-6)
+    store.close()
@@ -0,0 +1,107 @@
+import threading
+import time
+import pytest
+from app.config import settings
+from app.dedup import MinHasher, shingles, similarity
+from app.vector_store import VectorStore
+
+POLICY = (
+    "Employees must submit expense reports within thirty days of purchase and attach itemized receipts "
+    "for every item above twenty five dollars, otherwise the finance team will return the report unpaid."
+)
+
+def chunks(filename, texts):
+    return [{"text": text, "metadata": {"filename": filename, "chunk_id": i}} for i, text in enumerate(texts)]
+
+def test_signatures_estimate_jaccard_similarity():
+    hasher = MinHasher(128, 16)
+    original = hasher.signature(shingles(POLICY, 5))
+    edited = hasher.signature(shingles(POLICY.replace("thirty", "forty"), 5))
+    unrelated = hasher.signature(shingles("The cafeteria opens at eight and serves breakfast until ten every weekday.", 5))
+
+    assert similarity(original, hasher.signature(shingles(POLICY.upper(), 5))) == 1.0
+    assert 0.6 < similarity(original, edited) < 1.0
+    assert similarity(original, unrelated) < 0.2
+    assert hasher.band_keys(original) != hasher.band_keys(unrelated)
+
+def test_skip_mode_drops_near_duplicate_chunks(tmp_path, monkeypatch, embedding_service):
+    monkeypatch.setattr(settings, "CHROMA_PERSIST_DIRECTORY", str(tmp_path))
+    monkeypatch.setattr(settings, "NEAR_DUP_MODE", "skip")
+    monkeypatch.setattr(settings, "NEAR_DUP_THRESHOLD", 0.7)
+    store = VectorStore(embedding_service)
+
+    assert store.add_documents(chunks("v1.txt", [POLICY, "Short heading"])) == 0
+    assert store.add_documents(chunks("v2.txt", [POLICY + " Revised.", "Short heading", POLICY])) == 2
+    assert embedding_service.embedded == 3
+    assert store.get_document_count() == 3
+    store.close()
+
+def test_link_mode_reports_and_restores_linked_chunks(tmp_path, monkeypatch, embedding_service):
+    monkeypatch.setattr(settings, "CHROMA_PERSIST_DIRECTORY", str(tmp_path))
+    monkeypatch.setattr(settings, "NEAR_DUP_MODE", "link")
+    store = VectorStore(embedding_service)
+    store.add_documents(chunks("v1.txt", [POLICY]))
+    assert store.add_documents(chunks("v2.txt", [POLICY])) == 1
+
+    result = store.search(POLICY, top_k=1)[0]
+    assert result["id"] == "v1.txt_0"
+    assert result["metadata"]["near_duplicates"] == ["v2.txt"]
+    assert store.get_near_duplicate_stats()["linked_chunks"] == 1
+
+    # Deleting the canonical document indexes its duplicate in its place
+    store.delete_documents_by_filename("v1.txt")
+    assert store.list_filenames() == ["v2.txt"]
+    assert store.get_near_duplicate_stats() == {"mode": "link", "signatures": 1, "linked_chunks": 0}
+    store.close()
+
+def test_upload_made_only_of_duplicates_keeps_its_source_text(tmp_path, monkeypatch, embedding_service):
+    monkeypatch.setattr(settings, "CHROMA_PERSIST_DIRECTORY", str(tmp_path))
+    monkeypatch.setattr(settings, "CHUNK_STORE_ENABLED", True)
+    monkeypatch.setattr(settings, "NEAR_DUP_MODE", "skip")
+    store = VectorStore(embedding_service)
+    documents = [{"text": POLICY, "metadata": {"filename": "v1.txt", "chunk_id": 0, "char_offset": 0, "char_length": len(POLICY)}}]
+    store.add_documents(documents, source_text=POLICY)
+
+    copy = [{"text": POLICY, "metadata": dict(documents[0]["metadata"], filename="copy.txt")}]
+    assert store.add_documents(copy, source_text=POLICY) == 1
+    assert embedding_service.embedded == 1
+    assert store.list_filenames() == ["v1.txt"]
+    store.close()
+
+def test_concurrent_identical_uploads_index_one_copy(tmp_path, monkeypatch, embedding_service):
+    monkeypatch.setattr(settings, "CHROMA_PERSIST_DIRECTORY", str(tmp_path))
+    monkeypatch.setattr(settings, "NEAR_DUP_MODE", "skip")
+    generate_embeddings = embedding_service.generate_embeddings
+
+    def slow_embeddings(texts):
+        time.sleep(0.2)
+        return generate_embeddings(texts)
+
+    monkeypatch.setattr(embedding_service, "generate_embeddings", slow_embeddings)
+    store = VectorStore(embedding_service)
+    threads = [threading.Thread(target=store.add_documents, args=(chunks(name, [POLICY]),)) for name in ("a.txt", "b.txt")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert embedding_service.embedded == 1
+    assert store.get_document_count() == 1
+    store.close()
+
+def test_a_failed_upload_does_not_suppress_the_next_one(tmp_path, monkeypatch, embedding_service):
+    monkeypatch.setattr(settings, "CHROMA_PERSIST_DIRECTORY", str(tmp_path))
+    monkeypatch.setattr(settings, "NEAR_DUP_MODE", "skip")
+    store = VectorStore(embedding_service)
+
+    def failing_insert(*args, **kwargs):
+        raise RuntimeError("disk full")
+
+    store.add_embeddings = failing_insert
+    with pytest.raises(Exception, match="disk full"):
+        store.add_documents(chunks("a.txt", [POLICY]))
+    del store.add_embeddings
+
+    assert store.add_documents(chunks("b.txt", [POLICY])) == 0
+    assert store.list_filenames() == ["b.txt"]
+    store.close()
@@ -0,0 +1,68 @@
+import numpy as np
+from app.config import settings
+from app.document_index import centroid, document_metadata
+from app.vector_store import VectorStore
+
+def topic_corpus(documents=12, chunks=5, dimension=16):
+    """Chunks scattered around one random direction per document."""
+    rng = np.random.default_rng(0)
+    ids, embeddings, texts, metadatas = [], [], [], []
+    for d in range(documents):
+        topic = rng.normal(size=dimension)
+        for c in range(chunks):
+            vector = topic + 0.3 * rng.normal(size=dimension)
+            ids.append(f"doc{d}.txt_{c}")
+            embeddings.append((vector / np.linalg.norm(vector)).tolist())
+            texts.append(f"Document {d} chunk {c}")
+            metadatas.append({"filename": f"doc{d}.txt", "chunk_id": c, "file_type": ".txt", "char_offset": 0})
+    return ids, embeddings, texts, metadatas
+
+def test_centroid_and_document_metadata():
+    assert np.allclose(centroid([[1.0, 0.0], [0.0, 1.0]]), [2 ** -0.5, 2 ** -0.5])
+    metadata = document_metadata({"filename": "a.txt", "chunk_id": 3, "page": 2, "tag_team": "ops"}, 7)
+    assert metadata == {"filename": "a.txt", "tag_team": "ops", "chunk_count": 7}
+
+def test_document_index_follows_uploads_and_deletes(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "CHROMA_PERSIST_DIRECTORY", str(tmp_path))
+    monkeypatch.setattr(settings, "DOCUMENT_INDEX_ENABLED", True)
+    store = VectorStore(embedding_service=None)
+    store.add_embeddings(*topic_corpus(), namespace="tenant")
+
+    documents = store._get_document_collection("tenant")
+    assert documents.count() == 12
+    assert documents.get(ids=["doc3.txt"])["metadatas"][0]["chunk_count"] == 5
+
+    store.delete_documents_by_filename("doc3.txt", namespace="tenant")
+    assert documents.count() == 11
+
+    assert store.rebuild_document_index("tenant") == 11
+    assert store._get_document_collection("tenant").count() == 11
+    store.close()
+
+def test_flat_retrieval_keeps_no_document_index(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "CHROMA_PERSIST_DIRECTORY", str(tmp_path))
+    monkeypatch.setattr(settings, "DOCUMENT_INDEX_ENABLED", False)
+    store = VectorStore(embedding_service=None)
+    store.add_embeddings(*topic_corpus(), namespace="tenant")
+    assert store._get_document_collection("tenant") is None
+    store.close()
+
+def test_two_level_search_only_returns_chunks_of_closest_documents(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "CHROMA_PERSIST_DIRECTORY", str(tmp_path))
+    monkeypatch.setattr(settings, "DOCUMENT_INDEX_ENABLED", True)
+    store = VectorStore(embedding_service=None)
+    ids, embeddings, texts, metadatas = topic_corpus()
+    store.add_embeddings(ids, embeddings, texts, metadatas)
+    queries = [embeddings[7], embeddings[31]]
+
+    flat = store.search_by_embeddings(queries, top_k=3)
+    monkeypatch.setattr(settings, "RETRIEVAL_MODE", "two_level")
+    monkeypatch.setattr(settings, "DOC_PRUNING_TOP_M", 2)
+    pruned = store.search_by_embeddings(queries, top_k=3)
+
+    assert [[r["id"] for r in results] for results in pruned] == [[r["id"] for r in results] for results in flat]
+    assert pruned[0][0]["id"] == "doc1.txt_2"
+
+    filtered = store.search_by_embeddings(queries[:1], top_k=3, where={"filename": {"$ne": "doc1.txt"}})
+    assert filtered[0] and all(r["metadata"]["filename"] != "doc1.txt" for r in filtered[0])
+    store.close()
@@ -1,6 +1,7 @@
 import os
 import tempfile
-from app.document_processor import DocumentProcessor
+from app.config import settings
+from app.document_processor import DocumentProcessor, page_ranges
 
 def test_chunking_simple_text():
     processor = DocumentProcessor()
@@ -16,4 +17,64 @@ def test_chunking_simple_text():
             assert "text" in chunk
             assert len(chunk["text"]) > 0
     finally:
-        os.remove(temp_path) 
\ No newline at end of file
+        os.remove(temp_path)
+
+def test_chunks_record_offsets_and_pages():
+    processor = DocumentProcessor()
+    pages = ["Page one talks about pumps. " * 150, "Page two talks about valves. " * 150]
+    text = "".join(pages)
+    chunks = processor.chunk_text(text, "spec.pdf", page_starts=[0, len(pages[0])])
+    for chunk in chunks:
+        metadata = chunk["metadata"]
+        assert text[metadata["char_offset"]:metadata["char_offset"] + metadata["char_length"]] == chunk["text"]
+    assert chunks[0]["metadata"]["page"] == 1
+    assert chunks[-1]["metadata"]["page"] == 2
+
+def make_pdf(pages):
+    import fitz
+    doc = fitz.open()
+    for number in range(pages):
+        doc.new_page().insert_text((72, 72), f"Page {number + 1} describes part {number}.")
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+def test_page_ranges_cover_every_page_in_order():
+    assert page_ranges(10, 3) == [(0, 3), (3, 6), (6, 10)]
+    assert page_ranges(2, 8) == [(0, 1), (1, 2)]
+
+def test_parallel_pdf_extraction_keeps_page_order(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "UPLOAD_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "PDF_PARALLEL_MIN_PAGES", 4)
+    monkeypatch.setattr(settings, "CHUNK_SIZE", 10)
+    monkeypatch.setattr(settings, "CHUNK_OVERLAP", 0)
+    data = make_pdf(9)
+    processor = DocumentProcessor(page_workers=2)
+    try:
+        result = processor.process_source(data, "parts.pdf")
+        assert processor._page_pool is not None
+    finally:
+        processor.close()
+    # The bytes were handed to the workers as a temporary file
+    assert list(tmp_path.iterdir()) == []
+
+    assert result["text"] == "".join(DocumentProcessor(page_workers=1).extract_pages_from_pdf(data))
+    assert [line for line in result["text"].splitlines() if line][8] == "Page 9 describes part 8."
+    assert result["chunks"][-1]["metadata"]["page"] == 9
+
+def test_a_broken_page_pool_is_replaced(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "UPLOAD_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "PDF_PARALLEL_MIN_PAGES", 4)
+    data = make_pdf(6)
+    processor = DocumentProcessor(page_workers=2)
+    try:
+        first = processor.extract_pages_from_pdf(data)
+        broken = processor._page_pool
+        for process in list(broken._processes.values()):
+            process.kill()
+            process.join()
+
+        assert processor.extract_pages_from_pdf(data) == first
+        assert processor._page_pool is not broken
+    finally:
+        processor.close()
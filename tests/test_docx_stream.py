@@ -0,0 +1,70 @@
+import io
+import zipfile
+from app.docx_stream import iter_docx_blocks
+
+W_NS = 'xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"'
+MC_NS = 'xmlns:mc="http://schemas.openxmlformats.org/markup-compatibility/2006"'
+
+def paragraph(*runs):
+    return "<w:p>" + "".join(f"<w:r><w:t>{run}</w:t></w:r>" for run in runs) + "</w:p>"
+
+def table(*rows):
+    return "<w:tbl>" + "".join(
+        "<w:tr>" + "".join(f"<w:tc>{cell}</w:tc>" for cell in row) + "</w:tr>" for row in rows
+    ) + "</w:tbl>"
+
+def build_docx(body, headers=(), footers=()):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        archive.writestr("word/document.xml", f"<w:document {W_NS} {MC_NS}><w:body>{body}<w:sectPr/></w:body></w:document>")
+        for i, header in enumerate(headers, 1):
+            archive.writestr(f"word/header{i}.xml", f"<w:hdr {W_NS}>{header}</w:hdr>")
+        for i, footer in enumerate(footers, 1):
+            archive.writestr(f"word/footer{i}.xml", f"<w:ftr {W_NS}>{footer}</w:ftr>")
+    return buffer.getvalue()
+
+def test_blocks_follow_document_order_with_tables_headers_and_footers():
+    body = (
+        paragraph("Intro ", "text.")
+        + table(
+            [paragraph("Part"), paragraph("Limit")],
+            [paragraph("A-1"), paragraph("5 ", "mm") + paragraph("max")],
+        )
+        + paragraph()
+        + paragraph("Outro.")
+    )
+    data = build_docx(
+        body,
+        headers=[paragraph("Spec 42"), paragraph("Spec 42")],
+        footers=[paragraph("Page footer")],
+    )
+
+    assert list(iter_docx_blocks(data)) == [
+        "Spec 42",
+        "Intro text.",
+        "Part | Limit",
+        "A-1 | 5 mm max",
+        "",
+        "Outro.",
+        "Page footer",
+    ]
+
+def test_nested_tables_tabs_and_text_box_fallbacks():
+    nested = table([paragraph("x"), paragraph("y")])
+    body = (
+        table([paragraph("outer") + nested, paragraph("z")])
+        + "<w:p><w:r><w:t>a</w:t><w:tab/><w:t>b</w:t><w:br/><w:t>c</w:t></w:r></w:p>"
+        + "<w:p><w:r><mc:AlternateContent><mc:Choice>" + paragraph("box") + "</mc:Choice>"
+        + "<mc:Fallback>" + paragraph("box") + "</mc:Fallback></mc:AlternateContent></w:r></w:p>"
+    )
+
+    blocks = list(iter_docx_blocks(build_docx(body)))
+
+    assert blocks[0] == "outer x | y | z"
+    assert blocks[1] == "a\tb\nc"
+    assert blocks.count("box") == 1
+
+def test_reads_from_path(tmp_path):
+    path = tmp_path / "doc.docx"
+    path.write_bytes(build_docx(paragraph("From disk")))
+    assert list(iter_docx_blocks(str(path))) == ["From disk"]
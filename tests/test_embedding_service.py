@@ -13,4 +13,16 @@ def test_embedding_service_monkeypatch(monkeypatch):
     service = EmbeddingService()
     emb = service.embed_text("hello world")
     assert isinstance(emb, (list, np.ndarray))
-    assert len(emb) == 384 
\ No newline at end of file
+    assert len(emb) == 384 
+
+class LengthModel:
+    def encode(self, texts, **kwargs):
+        return np.array([[float(len(text)), 1.0] for text in texts])
+
+def test_generate_embeddings_bulk_restores_input_order(monkeypatch):
+    monkeypatch.setattr(EmbeddingService, "_load_model", lambda self: None)
+    service = EmbeddingService()
+    service.model = LengthModel()
+    texts = ["ccc", "a", "bbbbbb", "dd", "eeeee"]
+    embeddings = service.generate_embeddings_bulk(texts, batch_size=2, num_workers=1)
+    assert [row[0] for row in embeddings] == [float(len(text)) for text in texts]
@@ -0,0 +1,63 @@
+import re
+import numpy as np
+from app.config import settings
+from app.extractive import ExtractiveAnswerer, is_decisive, split_sentences
+from app.rag_service import RAGService
+
+VOCABULARY = ["maximum", "operating", "temperature", "pump", "valve", "pressure", "warranty", "years", "colour", "blue"]
+
+def bag_of_words(texts, namespace=None):
+    """Word-count vectors over a small vocabulary, enough to rank sentences."""
+    vectors = []
+    for text in texts:
+        words = re.findall(r"\w+", text.lower())
+        vectors.append([float(words.count(word)) for word in VOCABULARY] + [0.01])
+    return vectors
+
+def result(text, score, filename="pump.txt"):
+    return {"id": f"{filename}_0", "text": text, "metadata": {"filename": filename, "chunk_id": 0}, "score": score}
+
+PUMP_SPEC = (
+    "The pump is painted blue. The maximum operating temperature of the pump is 80 C. "
+    "Valve pressure is rated at 10 bar.\n\nThe warranty lasts two years."
+)
+
+def test_split_sentences_and_decisiveness():
+    assert split_sentences("One. Two!\n\nThree? ok") == ["One.", "Two!", "Three?"]
+    assert is_decisive([result("a", 0.9), result("b", 0.5)])
+    assert not is_decisive([result("a", 0.9), result("b", 0.88)])
+    assert not is_decisive([result("a", 0.5)])
+
+def test_answer_picks_the_closest_sentence_of_a_decisive_result(monkeypatch):
+    monkeypatch.setattr(settings, "EXTRACTIVE_MAX_SENTENCES", 1)
+    answerer = ExtractiveAnswerer(bag_of_words)
+    answer = answerer.answer("What is the maximum operating temperature of the pump?", [result(PUMP_SPEC, 0.9)])
+    assert answer == "The maximum operating temperature of the pump is 80 C."
+
+    # Not decisive, or no sentence close enough: left to the LLM
+    assert answerer.answer("What is the maximum temperature?", [result(PUMP_SPEC, 0.9), result(PUMP_SPEC, 0.89)]) is None
+    assert answerer.answer("Who makes it?", [result(PUMP_SPEC, 0.9)]) is None
+
+class FailingLLMService:
+    def generate_answer(self, question, context):
+        raise AssertionError("the LLM should not be called")
+
+class SpecVectorStore:
+    def search(self, question, top_k=5, namespace=None, filters=None):
+        return [result(PUMP_SPEC, 0.92), result("Unrelated text about colour.", 0.4, "other.txt")]
+
+def test_decisive_questions_skip_the_llm(monkeypatch):
+    monkeypatch.setattr(settings, "EXTRACTIVE_ANSWERS_ENABLED", True)
+    rag = RAGService.__new__(RAGService)
+    rag.vector_store = SpecVectorStore()
+    rag.llm_service = FailingLLMService()
+    rag.extractive = ExtractiveAnswerer(bag_of_words)
+    rag.extractive.record_generation(2.0, declined=True)
+
+    response = rag.ask_question("How long is the warranty in years?")
+
+    assert response["answer_type"] == "extractive"
+    assert response["answer"] == "The warranty lasts two years."
+    stats = rag.extractive.get_stats()
+    assert stats["served"] == 1 and stats["declined"] == 1
+    assert 1.9 < stats["seconds_saved"] <= 2.0
@@ -0,0 +1,89 @@
+import json
+import zipfile
+from app.config import settings
+from app.indexer import BulkIndexer, iter_source, load_manifest
+from app.vector_store import VectorStore
+
+def write_corpus(root):
+    (root / "policies").mkdir()
+    (root / "policies" / "travel.txt").write_text("Book travel through the portal. " * 20)
+    (root / "notes.txt").write_text("Meeting notes for the quarterly review. " * 20)
+    (root / "image.png").write_bytes(b"not indexed")
+
+def test_iter_source_reads_directories_and_zips(tmp_path):
+    write_corpus(tmp_path)
+    assert [name for name, _ in iter_source(str(tmp_path))] == ["notes.txt", "policies/travel.txt"]
+
+    with zipfile.ZipFile(tmp_path / "corpus.zip", "w") as archive:
+        archive.writestr("a/b.txt", "zipped text")
+        archive.writestr("c.png", b"skip")
+    assert list(iter_source(str(tmp_path / "corpus.zip"))) == [("a/b.txt", b"zipped text")]
+
+def test_load_manifest_keeps_latest_entry_and_ignores_torn_line(tmp_path):
+    manifest = tmp_path / "m.jsonl"
+    manifest.write_text(
+        json.dumps({"path": "a.txt", "status": "failed"}) + "\n"
+        + json.dumps({"path": "a.txt", "status": "indexed"}) + "\n"
+        + '{"path": "b.t'
+    )
+    assert load_manifest(str(manifest)) == {"a.txt": {"path": "a.txt", "status": "indexed"}}
+
+def test_bulk_indexer_resumes_from_manifest(tmp_path, monkeypatch, embedding_service):
+    monkeypatch.setattr(settings, "CHROMA_PERSIST_DIRECTORY", str(tmp_path / "db"))
+    corpus = tmp_path / "corpus"
+    corpus.mkdir()
+    write_corpus(corpus)
+    manifest = str(tmp_path / "manifest.jsonl")
+    store = VectorStore(embedding_service)
+
+    first = BulkIndexer(store, manifest, workers=1, tags=["hr"]).run(str(corpus))
+    assert (first["indexed"], first["skipped"], first["failed"]) == (2, 0, 0)
+    assert sorted(store.list_filenames()) == ["notes.txt", "policies/travel.txt"]
+    chunks = store.get_documents_by_filename("notes.txt")
+    assert chunks[0]["metadata"]["tag_hr"] is True
+    assert chunks[0]["text"].startswith("Meeting notes")
+
+    (corpus / "notes.txt").write_text("Rescheduled meeting notes. " * 20)
+    second = BulkIndexer(store, manifest, workers=1).run(str(corpus))
+    assert (second["indexed"], second["skipped"]) == (1, 1)
+    assert store.get_documents_by_filename("notes.txt")[0]["text"].startswith("Rescheduled")
+    store.close()
+
+def test_bulk_indexer_writes_buffered_chunks_before_the_manifest(tmp_path, monkeypatch, embedding_service):
+    monkeypatch.setattr(settings, "CHROMA_PERSIST_DIRECTORY", str(tmp_path / "db"))
+    monkeypatch.setattr(settings, "WRITE_BUFFER_ENABLED", True)
+    monkeypatch.setattr(settings, "WRITE_BUFFER_DURABILITY", "buffer")
+    monkeypatch.setattr(settings, "WRITE_BUFFER_MAX_DELAY_MS", 60000)
+    corpus = tmp_path / "corpus"
+    corpus.mkdir()
+    write_corpus(corpus)
+    manifest = str(tmp_path / "manifest.jsonl")
+    store = VectorStore(embedding_service)
+
+    BulkIndexer(store, manifest, workers=1).run(str(corpus))
+    indexed = [entry for entry in load_manifest(manifest).values() if entry["status"] == "indexed"]
+    assert sum(entry["chunks"] for entry in indexed) == store.get_document_count() > 0
+    store.close()
+
+def test_a_document_that_fails_to_store_is_recorded_and_does_not_block_its_batch(tmp_path, monkeypatch, embedding_service):
+    monkeypatch.setattr(settings, "CHROMA_PERSIST_DIRECTORY", str(tmp_path / "db"))
+    corpus = tmp_path / "corpus"
+    corpus.mkdir()
+    write_corpus(corpus)
+    (corpus / "bad.txt").write_text("Unembeddable text. " * 20)
+    manifest = str(tmp_path / "manifest.jsonl")
+    store = VectorStore(embedding_service)
+    add_documents = store.add_documents
+
+    def failing_add_documents(documents, **kwargs):
+        if any(document["metadata"]["filename"] == "bad.txt" for document in documents):
+            raise ValueError("embedding failed")
+        return add_documents(documents, **kwargs)
+
+    monkeypatch.setattr(store, "add_documents", failing_add_documents)
+    stats = BulkIndexer(store, manifest, workers=1).run(str(corpus))
+    assert (stats["indexed"], stats["failed"]) == (2, 1)
+    entries = load_manifest(manifest)
+    assert entries["bad.txt"]["status"] == "failed" and "embedding failed" in entries["bad.txt"]["error"]
+    assert sorted(store.list_filenames()) == ["notes.txt", "policies/travel.txt"]
+    store.close()
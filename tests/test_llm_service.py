@@ -0,0 +1,126 @@
+import json
+import sys
+import threading
+import time
+import types
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import pytest
+from app.config import settings
+from app.llm_service import LLMService, FakeLLMService, HTTPLLMService, create_llm_service
+
+CONTEXT = [{"text": "The sky is blue.", "metadata": {"filename": "sky.txt"}}]
+
+def test_fake_llm_sleeps_for_modelled_generation_time(monkeypatch):
+    monkeypatch.setattr(settings, "FAKE_LLM_TOKENS_PER_SEC", 100.0)
+    monkeypatch.setattr(settings, "FAKE_LLM_PROMPT_TOKENS_PER_SEC", 1e9)
+    monkeypatch.setattr(settings, "FAKE_LLM_OUTPUT_TOKENS", 10)
+    llm = FakeLLMService()
+
+    start = time.perf_counter()
+    answer = llm.generate_answer("What colour is the sky?", CONTEXT)
+    elapsed = time.perf_counter() - start
+
+    assert elapsed >= 0.1
+    assert answer.startswith("[fake answer")
+    assert llm.is_available()
+    assert llm.get_model_info()["backend"] == "fake"
+
+def test_create_llm_service_selects_backend(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_BACKEND", "fake")
+    assert isinstance(create_llm_service(), FakeLLMService)
+
+    monkeypatch.setattr(settings, "LLM_BACKEND", "remote-gpu")
+    with pytest.raises(ValueError):
+        create_llm_service()
+
+
+class CompletionHandler(BaseHTTPRequestHandler):
+    """Minimal stand-in for llama.cpp's OpenAI-compatible server."""
+    protocol_version = "HTTP/1.1"
+    requests_seen = []
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        CompletionHandler.requests_seen.append((self.path, payload, self.headers.get("Authorization")))
+        if payload["stream"]:
+            body = "".join(
+                f"data: {json.dumps({'choices': [{'text': piece}]})}\n\n"
+                for piece in ["  Ans", "wer:", " Blue", ",", " mostly."]
+            ) + "data: [DONE]\n\n"
+            content_type = "text/event-stream"
+        else:
+            body = json.dumps({"choices": [{"text": " Answer: Blue. "}]})
+            content_type = "application/json"
+        encoded = body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(encoded)))
+        self.end_headers()
+        self.wfile.write(encoded)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def llm_server(monkeypatch):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), CompletionHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    CompletionHandler.requests_seen = []
+    monkeypatch.setattr(settings, "LLM_SERVER_URL", f"http://127.0.0.1:{server.server_address[1]}/")
+    monkeypatch.setattr(settings, "LLM_SERVER_API_KEY", "secret")
+    yield server
+    server.shutdown()
+    server.server_close()
+
+def test_http_llm_complete_and_stream(llm_server):
+    llm = HTTPLLMService()
+
+    assert llm.generate_answer("What colour is the sky?", CONTEXT) == "Blue."
+    assert "".join(llm.stream_answer("What colour is the sky?", CONTEXT)) == "Blue, mostly."
+
+    path, payload, authorization = CompletionHandler.requests_seen[0]
+    assert path == "/v1/completions"
+    assert "The sky is blue." in payload["prompt"]
+    assert payload["max_tokens"] == settings.LLM_MAX_TOKENS
+    assert authorization == "Bearer secret"
+    assert [seen[1]["stream"] for seen in CompletionHandler.requests_seen] == [False, True]
+    llm.close()
+
+def test_http_llm_reports_server_errors(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_SERVER_URL", "http://127.0.0.1:9")
+    monkeypatch.setattr(settings, "LLM_SERVER_CONNECT_TIMEOUT", 1.0)
+    llm = HTTPLLMService()
+
+    with pytest.raises(Exception, match="Error generating answer"):
+        llm.generate_answer("What colour is the sky?", CONTEXT)
+    assert llm.get_model_info()["status"].startswith("unreachable")
+
+
+
+class RecordingLlama:
+    """Stands in for llama_cpp.Llama and keeps the arguments it was built with."""
+
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+
+class PromptLookup:
+    def __init__(self, num_pred_tokens):
+        self.num_pred_tokens = num_pred_tokens
+
+def test_speculative_decoding_passes_prompt_lookup_draft_model(tmp_path, monkeypatch):
+    model_path = tmp_path / "model.gguf"
+    model_path.write_bytes(b"")
+    monkeypatch.setattr(settings, "LLM_MODEL_PATH", str(model_path))
+    monkeypatch.setitem(sys.modules, "llama_cpp", types.SimpleNamespace(Llama=RecordingLlama))
+    monkeypatch.setitem(
+        sys.modules, "llama_cpp.llama_speculative", types.SimpleNamespace(LlamaPromptLookupDecoding=PromptLookup)
+    )
+
+    assert LLMService().model.kwargs["draft_model"] is None
+
+    monkeypatch.setattr(settings, "LLM_SPECULATIVE_DECODING", True)
+    monkeypatch.setattr(settings, "LLM_DRAFT_TOKENS", 4)
+    llm = LLMService()
+    assert llm.model.kwargs["draft_model"].num_pred_tokens == 4
+    assert llm.get_model_info()["speculative_decoding"] == {"method": "prompt_lookup", "draft_tokens": 4}
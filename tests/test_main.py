@@ -19,9 +19,54 @@ def test_health():
     assert "timestamp" in data
     assert data["version"] == "1.0.0"
 
+def test_status_answers_304_while_catalogs_and_indexes_are_unchanged(monkeypatch):
+    from app.main import get_rag_service
+
+    class StatusRAG:
+        builds = 0
+
+        def get_status_version(self):
+            return "model|default=3"
+
+        def get_system_status(self):
+            # Live counters differ on every call
+            StatusRAG.builds += 1
+            return {"resources": {"active_questions": StatusRAG.builds}}
+
+    monkeypatch.setitem(app.dependency_overrides, get_rag_service, StatusRAG)
+    first = client.get("/status")
+    assert first.status_code == 200
+    second = client.get("/status", headers={"If-None-Match": first.headers["etag"]})
+    assert second.status_code == 304
+    assert StatusRAG.builds == 1
+
+def test_profiled_question_is_answered_off_the_event_loop(tmp_path, monkeypatch):
+    import asyncio
+    from app.config import settings
+    from app.main import get_rag_service
+    from app.profiling import stage
+    monkeypatch.setattr(settings, "PROFILING_ENABLED", True)
+    monkeypatch.setattr(settings, "PROFILES_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "ASK_COALESCING_ENABLED", False)
+
+    class ProfiledRAG:
+        def ask_question(self, question, top_k, namespace=None, filters=None):
+            with pytest.raises(RuntimeError):
+                asyncio.get_running_loop()
+            with stage("retrieval"):
+                pass
+            return {"question": question, "answer": "Blue.", "sources": [], "confidence": 1.0, "processing_time": 0.0}
+
+    monkeypatch.setitem(app.dependency_overrides, get_rag_service, ProfiledRAG)
+    response = client.post("/ask?profile=1", json={"question": "What colour?"}, headers={"x-request-id": "req-7"})
+    assert response.status_code == 200
+    profile = response.json()["profile"]
+    assert "retrieval" in profile["stages"]
+    assert profile["profile_file"] == "req-7.prof"
+
 def test_upload_txt(monkeypatch):
-    # Mock RAGService.upload_document to avoid real processing
-    def mock_upload_document(self, file_path):
+    # Mock RAGService.upload_document_bytes to avoid real processing
+    def mock_upload_document(self, data, filename, namespace=None, content_hash=None, tags=None):
         return {
             "filename": "test.txt",
             "status": "success",
@@ -31,7 +76,7 @@ def test_upload_txt(monkeypatch):
             "processing_time": 0.01
         }
     from app import rag_service
-    monkeypatch.setattr(rag_service.RAGService, "upload_document", mock_upload_document)
+    monkeypatch.setattr(rag_service.RAGService, "upload_document_bytes", mock_upload_document)
 
     file_content = b"This is a test."
     files = {"file": ("test.txt", io.BytesIO(file_content), "text/plain")}
@@ -39,4 +84,24 @@ def test_upload_txt(monkeypatch):
     assert response.status_code == 200
     data = response.json()
     assert data["status"] == "success"
-    assert data["filename"] == "test.txt" 
\ No newline at end of file
+    assert data["filename"] == "test.txt" 
+
+def test_upload_rejects_oversized_file_while_streaming(monkeypatch):
+    from app.config import settings
+    monkeypatch.setattr(settings, "MAX_FILE_SIZE", 8)
+    monkeypatch.setattr(settings, "UPLOAD_CHUNK_SIZE", 4)
+
+    files = {"file": ("big.txt", io.BytesIO(b"0123456789abcdef"), "text/plain")}
+    response = client.post("/upload", files=files)
+    assert response.status_code == 413
+    assert "File too large" in response.json()["detail"]
+
+def test_upload_rejects_oversized_body_before_parsing(monkeypatch):
+    from app.config import settings
+    from app.main import MULTIPART_OVERHEAD
+    monkeypatch.setattr(settings, "MAX_FILE_SIZE", 8)
+
+    files = {"file": ("big.txt", io.BytesIO(b"0" * (MULTIPART_OVERHEAD + 16)), "text/plain")}
+    response = client.post("/upload", files=files)
+    assert response.status_code == 413
+    assert "File too large" in response.json()["detail"]
@@ -0,0 +1,63 @@
+import json
+import os
+import threading
+import pytest
+from app.config import settings
+from app.profiling import RequestProfile, ProfilerBusyError, stage, new_request_id
+
+def test_stage_is_noop_without_profile():
+    with stage("extraction"):
+        pass
+
+def test_request_profile_records_stages_and_saves_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "PROFILES_DIR", str(tmp_path))
+
+    with RequestProfile("ask", request_id="req-1") as profile:
+        with stage("embed_query"):
+            sum(range(1000))
+        with stage("generation"):
+            data = [bytearray(1024) for _ in range(100)]
+        with stage("generation"):
+            pass
+
+    summary = profile.summary()
+    assert summary["request_id"] == "req-1"
+    assert summary["kind"] == "ask"
+    assert summary["profile_file"] == "req-1.prof"
+    assert set(summary["stages"]) == {"embed_query", "generation"}
+    assert summary["memory_peak_bytes"] >= 100 * 1024
+    assert summary["total_time"] >= sum(summary["stages"].values())
+    assert os.path.exists(tmp_path / "req-1.prof")
+    with open(tmp_path / "req-1.json") as f:
+        saved = json.load(f)
+    assert saved["stages"] == summary["stages"]
+    assert "top_functions" in saved
+    del data
+
+def test_only_one_request_profiled_at_a_time(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "PROFILES_DIR", str(tmp_path))
+    entered = threading.Event()
+    release = threading.Event()
+
+    def hold():
+        with RequestProfile("upload"):
+            entered.set()
+            release.wait(5)
+
+    thread = threading.Thread(target=hold)
+    thread.start()
+    entered.wait(5)
+    try:
+        with pytest.raises(ProfilerBusyError):
+            with RequestProfile("ask"):
+                pass
+    finally:
+        release.set()
+        thread.join()
+
+    with RequestProfile("ask"):
+        pass
+
+def test_unsafe_request_id_is_replaced():
+    assert new_request_id("abc_123") == "abc_123"
+    assert new_request_id("../etc/passwd") != "../etc/passwd"
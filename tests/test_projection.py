@@ -0,0 +1,73 @@
+import hashlib
+import numpy as np
+import pytest
+from app.config import settings
+from app.projection import fit_pca, truncation, migrate, Projection
+from app.vector_store import VectorStore
+
+class LowRankEmbeddingService:
+    """16-d embeddings that live in a 4-d subspace, like real embeddings concentrate their energy."""
+    basis = np.random.default_rng(0).normal(size=(4, 16))
+
+    def generate_embeddings(self, texts):
+        vectors = []
+        for text in texts:
+            seed = int.from_bytes(hashlib.sha1(text.encode("utf-8")).digest()[:4], "big")
+            vector = np.random.default_rng(seed).normal(size=4) @ self.basis
+            vectors.append((vector / np.linalg.norm(vector)).tolist())
+        return vectors
+
+    def generate_single_embedding(self, text):
+        return self.generate_embeddings([text])[0]
+
+def test_pca_preserves_rankings_of_low_rank_embeddings():
+    embeddings = np.asarray(LowRankEmbeddingService().generate_embeddings([f"doc {i}" for i in range(200)]))
+    projection = fit_pca(embeddings, 4)
+
+    projected = projection.apply(embeddings)
+    assert projected.shape == (200, 4)
+    assert np.allclose(projected @ projected[0], embeddings @ embeddings[0], atol=1e-4)
+    assert truncation(16, 8).apply(embeddings).shape == (200, 8)
+    with pytest.raises(ValueError):
+        projection.apply(projected)
+
+def test_projection_file_round_trip(tmp_path):
+    projection = truncation(16, 8)
+    projection.save(str(tmp_path / "p.npz"))
+    loaded = Projection.load(str(tmp_path / "p.npz"))
+    assert loaded.info() == projection.info()
+
+def test_migrate_rewrites_namespace_and_projects_new_chunks_and_queries(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "CHROMA_PERSIST_DIRECTORY", str(tmp_path))
+    store = VectorStore(LowRankEmbeddingService())
+    docs = [{"text": f"Chunk number {i}.", "metadata": {"filename": "a.txt", "chunk_id": i}} for i in range(40)]
+    store.add_documents(docs, namespace="tenant")
+    before = [result["id"] for result in store.search("Chunk number 7.", top_k=3, namespace="tenant")]
+
+    result = migrate(store, 4, namespace="tenant", sample_size=30)
+
+    assert result["chunks"] == 40
+    assert result["energy_kept"] > 0.99
+    assert len(store.get_chunks(namespace="tenant", limit=1)["embeddings"][0]) == 4
+    assert [result["id"] for result in store.search("Chunk number 7.", top_k=3, namespace="tenant")] == before
+
+    store.add_documents([{"text": "Late chunk.", "metadata": {"filename": "b.txt", "chunk_id": 0}}], namespace="tenant")
+    assert store.search("Late chunk.", top_k=1, namespace="tenant")[0]["metadata"]["filename"] == "b.txt"
+
+    reopened = VectorStore(LowRankEmbeddingService())
+    assert reopened.get_projection("tenant").target_dim == 4
+    assert reopened.get_projection("other") is None
+    with pytest.raises(ValueError):
+        migrate(reopened, 2, namespace="tenant")
+
+def test_projection_of_a_namespace_on_another_model_reloads(tmp_path, monkeypatch, make_embedding_service):
+    monkeypatch.setattr(settings, "CHROMA_PERSIST_DIRECTORY", str(tmp_path))
+    store = VectorStore(make_embedding_service("other-model"))
+    docs = [{"text": f"Chunk {i}.", "metadata": {"filename": "a.txt", "chunk_id": i}} for i in range(10)]
+    store.add_documents(docs, namespace="tenant")
+    assert migrate(store, 4, namespace="tenant", method="truncate")["embedding_model"] == "other-model"
+    store.close()
+
+    reopened = VectorStore(make_embedding_service("other-model"))
+    assert reopened.get_projection("tenant").target_dim == 4
+    reopened.close()
@@ -0,0 +1,51 @@
+from app.extractive import ExtractiveAnswerer
+from app.rag_service import RAGService
+
+class DummyVectorStore:
+    def search_batch(self, queries, top_k=5, namespace=None, filters=None):
+        return [
+            [{"id": "a.txt_0", "text": "Context.", "metadata": {"filename": "a.txt", "chunk_id": 0}, "score": 0.9}]
+            for _ in queries
+        ]
+
+class CountingLLMService:
+    def __init__(self):
+        self.calls = 0
+
+    def generate_answer(self, question, context):
+        self.calls += 1
+        return f"Answer to {question}"
+
+def test_ask_questions_batch_shares_duplicate_generations():
+    rag = RAGService.__new__(RAGService)
+    rag.vector_store = DummyVectorStore()
+    rag.llm_service = CountingLLMService()
+    rag.extractive = ExtractiveAnswerer(embed=None)
+
+    results = list(rag.ask_questions_batch(["What is X?", "what is  x?", "What is Y?"], top_k=1))
+
+    assert sorted(result["index"] for result in results) == [0, 1, 2]
+    assert rag.llm_service.calls == 2
+    by_index = {result["index"]: result for result in results}
+    assert by_index[1]["question"] == "what is  x?"
+    assert by_index[1]["answer"] == by_index[0]["answer"]
+
+class StreamingLLMService:
+    def stream_answer(self, question, context):
+        yield "Streamed"
+        yield " answer."
+
+class SearchVectorStore:
+    def search(self, question, top_k=5, namespace=None, filters=None):
+        return DummyVectorStore().search_batch([question])[0]
+
+def test_ask_question_stream_emits_sources_tokens_and_done():
+    rag = RAGService.__new__(RAGService)
+    rag.vector_store = SearchVectorStore()
+    rag.llm_service = StreamingLLMService()
+
+    events = list(rag.ask_question_stream("What is X?", top_k=1))
+
+    assert [event["type"] for event in events] == ["sources", "token", "token", "done"]
+    assert events[0]["sources"][0]["filename"] == "a.txt"
+    assert "".join(event["text"] for event in events if event["type"] == "token") == "Streamed answer."
@@ -0,0 +1,134 @@
+import threading
+import time
+import pytest
+from app.config import settings
+from app.index_registry import STALE_BUILD_SECONDS
+from app.reindex import ReindexJob
+from app.vector_store import VectorStore
+
+@pytest.fixture
+def models(tmp_path, monkeypatch, make_embedding_service):
+    """A store on model-a, with model-b available to re-embed into."""
+    monkeypatch.setattr(settings, "CHROMA_PERSIST_DIRECTORY", str(tmp_path))
+    old, new = make_embedding_service("model-a", 8), make_embedding_service("model-b", 12)
+    store = VectorStore(embedding_service=old)
+    store._embedding_services["model-b"] = new
+    yield store, old, new
+    store.close()
+
+def chunks(filename, count):
+    return [
+        {"text": f"{filename} chunk {i} about topic {i}", "metadata": {"filename": filename, "chunk_id": i}}
+        for i in range(count)
+    ]
+
+def test_reindex_switches_namespace_to_new_model(models):
+    store, old, new = models
+    store.add_documents(chunks("a.txt", 5) + chunks("b.txt", 4), namespace="tenant")
+    assert store.get_index_versions("tenant")[0]["embedding_model"] == "model-a"
+
+    job = ReindexJob(store, "tenant", "model-b", batch_size=3, max_chunks_per_sec=0)
+    job.run()
+
+    status = job.get_status()
+    assert status["state"] == "completed" and status["done"] == status["total"] == 9
+    versions = {entry["version"]: entry for entry in store.get_index_versions("tenant")}
+    assert versions[1]["state"] == "retired"
+    assert versions[2]["state"] == "active"
+    assert versions[2]["embedding_model"] == "model-b" and versions[2]["dimension"] == 12
+
+    # Queries are now embedded with the new model and find the re-embedded chunks
+    results = store.search("b.txt chunk 2 about topic 2", top_k=1, namespace="tenant")
+    assert results[0]["id"] == "b.txt_2" and results[0]["score"] == pytest.approx(1.0)
+    assert store.get_document_count("tenant") == 9
+
+def test_writes_during_a_build_reach_both_versions(models):
+    store, old, new = models
+    store.add_documents(chunks("a.txt", 3), namespace="tenant")
+    building = store.registry.create_version("tenant", store._base_collection_name("tenant"), "model-b")
+    target = store.client.create_collection(building["collection"], metadata={"hnsw:space": "cosine"})
+
+    store.add_documents(chunks("b.txt", 2), namespace="tenant")
+    assert sorted(target.get()["ids"]) == ["b.txt_0", "b.txt_1"]
+    assert new.embedded == 2
+
+    store.delete_documents_by_filename("b.txt", namespace="tenant")
+    assert target.count() == 0
+    # The active version serves until the switch
+    assert store.get_document_count("tenant") == 3
+
+def test_uploads_skip_a_build_whose_job_died(models):
+    store, old, new = models
+    building = store.registry.create_version("tenant", store._base_collection_name("tenant"), "model-b")
+    store.client.create_collection(building["collection"], metadata={"hnsw:space": "cosine"})
+    store.registry.update("tenant", building["version"], heartbeat_at=time.time() - STALE_BUILD_SECONDS - 1)
+
+    store.add_documents(chunks("a.txt", 2), namespace="tenant")
+    assert new.embedded == 0
+    assert store.get_document_count("tenant") == 2
+
+def test_switching_waits_for_uploads_being_embedded(models):
+    store, old, new = models
+    store.add_documents(chunks("a.txt", 2), namespace="tenant")
+    building = store.registry.create_version("tenant", store._base_collection_name("tenant"), "model-b")
+    target = store.client.create_collection(building["collection"], metadata={"hnsw:space": "cosine"})
+    target.add(ids=["a.txt_0", "a.txt_1"], embeddings=new.generate_embeddings(["a", "b"]))
+    embedding, release = threading.Event(), threading.Event()
+    generate_embeddings = old.generate_embeddings
+
+    def slow_generate_embeddings(texts):
+        embedding.set()
+        release.wait(10)
+        return generate_embeddings(texts)
+
+    old.generate_embeddings = slow_generate_embeddings
+    upload = threading.Thread(target=store.add_documents, args=(chunks("b.txt", 2),), kwargs={"namespace": "tenant"})
+    upload.start()
+    embedding.wait(10)
+    switch = threading.Thread(target=store.activate_index_version, args=("tenant", building["version"]))
+    switch.start()
+    switch.join(0.5)
+    assert switch.is_alive()
+
+    release.set()
+    upload.join(10)
+    switch.join(10)
+    assert store.get_index_versions("tenant")[-1]["state"] == "active"
+    assert store.get_document_count("tenant") == 4
+    assert len(store.get_chunks(namespace="tenant", limit=1)["embeddings"][0]) == 12
+
+def test_a_failed_job_drops_its_half_built_version(models):
+    store, old, new = models
+    store.add_documents(chunks("a.txt", 4), namespace="tenant")
+
+    def failing_generate_embeddings(texts):
+        raise RuntimeError("model crashed")
+
+    new.generate_embeddings = failing_generate_embeddings
+    job = ReindexJob(store, "tenant", "model-b", batch_size=2, max_chunks_per_sec=0)
+    job.run()
+
+    assert job.get_status()["state"] == "failed"
+    assert [entry["version"] for entry in store.get_index_versions("tenant")] == [1]
+    assert f"{store._base_collection_name('tenant')}.v2" not in [collection.name for collection in store.client.list_collections()]
+    assert store.get_document_count("tenant") == 4
+
+def test_reconcile_recopies_changed_chunks_and_drops_deleted_ones(models):
+    store, old, new = models
+    store.add_documents(chunks("a.txt", 3), namespace="tenant")
+    job = ReindexJob(store, "tenant", "model-b", max_chunks_per_sec=0)
+    job.version = store.registry.create_version("tenant", store._base_collection_name("tenant"), "model-b")["version"]
+    target = store.client.create_collection(f"{store._base_collection_name('tenant')}.v2", metadata={"hnsw:space": "cosine"})
+    target.add(ids=["a.txt_0", "gone.txt_0"], embeddings=[[0.1] * 12] * 2, metadatas=[{"filename": "a.txt", "chunk_id": 0}, {"filename": "gone.txt", "chunk_id": 0}])
+
+    job._reconcile(target, new)
+
+    assert sorted(target.get()["ids"]) == ["a.txt_0", "a.txt_1", "a.txt_2"]
+    assert job.reconciled == 3
+
+def test_vectors_of_another_dimension_are_rejected(models):
+    store, old, new = models
+    store.add_documents(chunks("a.txt", 2), namespace="tenant")
+    with pytest.raises(ValueError, match="8-dimensional vectors from model-a"):
+        store.add_embeddings(["x_0"], [[0.5] * 12], ["x"], [{"filename": "x", "chunk_id": 0}], namespace="tenant")
+    store.close()
@@ -0,0 +1,78 @@
+import threading
+import time
+from app import residency
+from app.config import settings
+from app.residency import ResidencyManager
+
+class Model:
+    def __init__(self):
+        self.loaded = True
+        self.loads = 0
+
+    def load(self):
+        self.loaded = True
+        self.loads += 1
+
+    def unload(self):
+        self.loaded = False
+
+def test_idle_model_is_unloaded_and_reloaded_on_use(monkeypatch):
+    monkeypatch.setattr(settings, "RESIDENCY_CHECK_INTERVAL", 3600)
+    manager = ResidencyManager()
+    model = Model()
+    tracked = manager.register("llm", model.load, model.unload, idle_timeout=0.05)
+
+    manager.check()
+    assert model.loaded
+
+    time.sleep(0.06)
+    manager.check()
+    assert not model.loaded
+    assert manager.get_status()["models"]["llm"]["state"] == "unloaded"
+
+    with tracked.acquire():
+        assert model.loaded
+    status = manager.get_status()["models"]["llm"]
+    assert (status["state"], status["reloads"], status["evictions"]["idle"]) == ("resident", 1, 1)
+    manager.stop()
+
+def test_model_in_use_is_never_unloaded(monkeypatch):
+    monkeypatch.setattr(settings, "RESIDENCY_CHECK_INTERVAL", 3600)
+    manager = ResidencyManager()
+    model = Model()
+    tracked = manager.register("llm", model.load, model.unload, idle_timeout=0.01)
+
+    holding, release = threading.Event(), threading.Event()
+
+    def answer():
+        with tracked.acquire():
+            holding.set()
+            release.wait()
+
+    worker = threading.Thread(target=answer)
+    worker.start()
+    holding.wait()
+    time.sleep(0.02)
+    manager.check()
+    assert model.loaded
+    release.set()
+    worker.join()
+    manager.stop()
+
+def test_memory_pressure_unloads_least_recently_used_first(monkeypatch):
+    monkeypatch.setattr(settings, "MEMORY_LOW_WATERMARK_MB", 1000)
+    monkeypatch.setattr(settings, "RESIDENCY_CHECK_INTERVAL", 3600)
+    manager = ResidencyManager()
+    llm, embedder, pinned = Model(), Model(), Model()
+    manager.register("pinned", pinned.load, pinned.unload, evict_under_pressure=False)
+    tracked_llm = manager.register("llm", llm.load, llm.unload)
+    manager.register("embedding", embedder.load, embedder.unload)
+    tracked_llm.last_used -= 10
+
+    # Memory recovers once one model is gone
+    monkeypatch.setattr(residency, "available_memory_bytes", lambda: 2000 * 2 ** 20 if not llm.loaded else 500 * 2 ** 20)
+    manager.check()
+
+    assert (llm.loaded, embedder.loaded, pinned.loaded) == (False, True, True)
+    assert manager.get_status()["models"]["llm"]["evictions"]["memory_pressure"] == 1
+    manager.stop()
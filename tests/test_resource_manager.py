@@ -0,0 +1,49 @@
+import threading
+import time
+from app.config import settings
+from app.resource_manager import ResourceManager
+
+def test_budgets_are_derived_from_cpu_budget(monkeypatch):
+    monkeypatch.setattr(settings, "CPU_BUDGET", 16)
+    monkeypatch.setattr(settings, "LLM_THREADS", 0)
+    monkeypatch.setattr(settings, "QUERY_EMBED_THREADS", 0)
+    monkeypatch.setattr(settings, "INGEST_EMBED_THREADS", 0)
+    manager = ResourceManager()
+
+    assert manager.query_embed_threads == 2
+    assert manager.ingest_embed_threads == 4
+    assert manager.llm_threads == 10
+    assert manager.threads_per_ingest_worker(3) == 1
+
+    monkeypatch.setattr(settings, "LLM_THREADS", 6)
+    assert ResourceManager().llm_threads == 6
+
+def test_ingestion_waits_for_active_questions():
+    manager = ResourceManager()
+    question_started = threading.Event()
+
+    def answer_question():
+        with manager.interactive():
+            question_started.set()
+            time.sleep(0.2)
+
+    thread = threading.Thread(target=answer_question)
+    thread.start()
+    question_started.wait(5)
+
+    waited = manager.yield_to_interactive()
+    thread.join()
+
+    assert waited >= 0.1
+    assert manager.get_status()["ingest_deferrals"] == 1
+    assert manager.yield_to_interactive() == 0.0
+
+def test_ingestion_is_not_starved(monkeypatch):
+    monkeypatch.setattr(settings, "INGEST_MAX_DEFER", 0.05)
+    manager = ResourceManager()
+
+    with manager.interactive():
+        start = time.perf_counter()
+        manager.yield_to_interactive()
+        assert time.perf_counter() - start < 1
+        assert manager.get_status()["active_questions"] == 1
@@ -0,0 +1,87 @@
+import threading
+import time
+from app.config import settings
+from app.sharding import ShardedVectorStore
+
+def test_sharded_store_routes_and_merges(tmp_path, monkeypatch, embedding_service):
+    monkeypatch.setattr(settings, "CHROMA_PERSIST_DIRECTORY", str(tmp_path))
+    store = ShardedVectorStore(embedding_service, num_shards=2)
+    try:
+        filenames = [f"doc{i}.txt" for i in range(6)]
+        docs = [
+            {"text": f"Chunk {j} of {filename}", "metadata": {"filename": filename, "chunk_id": j}}
+            for filename in filenames for j in range(2)
+        ]
+        store.add_documents(docs)
+
+        # Documents are spread over both shards, each document on one shard
+        assert {store.shard_for(filename).index for filename in filenames} == {0, 1}
+        assert store.get_document_count() == 12
+        assert sorted(store.list_filenames()) == filenames
+        assert len(store.get_documents_by_filename("doc3.txt")) == 2
+
+        results = store.search("Chunk 0 of doc1.txt", top_k=4)
+        assert len(results) == 4
+        assert [r["score"] for r in results] == sorted((r["score"] for r in results), reverse=True)
+
+        store.delete_documents_by_filename("doc3.txt")
+        assert store.get_document_count() == 10
+        assert sum(len(batch["ids"]) for batch in store.iter_chunks(batch_size=3)) == 10
+    finally:
+        store.close()
+
+def test_concurrent_multi_shard_adds_and_searches_do_not_deadlock(tmp_path, monkeypatch, embedding_service):
+    monkeypatch.setattr(settings, "CHROMA_PERSIST_DIRECTORY", str(tmp_path))
+    store = ShardedVectorStore(embedding_service, num_shards=2)
+    # Batches list a shard 1 document before a shard 0 one, the reverse of the broadcast order
+    first = next(f"doc{i}.txt" for i in range(100) if store.shard_for(f"doc{i}.txt").index == 1)
+    second = next(f"doc{i}.txt" for i in range(100) if store.shard_for(f"doc{i}.txt").index == 0)
+
+    def add():
+        for n in range(50):
+            store.add_embeddings(
+                [f"{first}_{n}", f"{second}_{n}"],
+                embedding_service.generate_embeddings(["a", "b"]),
+                ["a", "b"],
+                [{"filename": first, "chunk_id": n}, {"filename": second, "chunk_id": n}]
+            )
+
+    def search():
+        for _ in range(50):
+            store.search_by_embeddings([embedding_service.generate_single_embedding("query")], top_k=2)
+
+    threads = [threading.Thread(target=target, daemon=True) for target in (add, search, add, search)]
+    for thread in threads:
+        thread.start()
+    deadline = time.monotonic() + 60
+    for thread in threads:
+        thread.join(timeout=max(deadline - time.monotonic(), 0))
+    assert not any(thread.is_alive() for thread in threads)
+    assert store.get_document_count() == 100
+    store.close()
+
+def test_status_reads_survive_a_dead_shard_and_close_releases_everything(tmp_path, monkeypatch, embedding_service):
+    monkeypatch.setattr(settings, "CHROMA_PERSIST_DIRECTORY", str(tmp_path))
+    monkeypatch.setattr(settings, "NEAR_DUP_MODE", "skip")
+    store = ShardedVectorStore(embedding_service, num_shards=2)
+    store.add_documents([{"text": "Shard chunk", "metadata": {"filename": "a.txt", "chunk_id": 0}}])
+    store.shards[1].process.kill()
+    store.shards[1].process.join()
+
+    assert store.get_open_namespaces() == []
+    store.close()
+    assert store.near_duplicates is None and store.chunk_store is None
+
+def test_deleting_a_document_drops_its_buffered_chunks_on_every_shard(tmp_path, monkeypatch, embedding_service):
+    monkeypatch.setattr(settings, "CHROMA_PERSIST_DIRECTORY", str(tmp_path))
+    monkeypatch.setattr(settings, "WRITE_BUFFER_ENABLED", True)
+    monkeypatch.setattr(settings, "WRITE_BUFFER_DURABILITY", "buffer")
+    monkeypatch.setattr(settings, "WRITE_BUFFER_MAX_DELAY_MS", 60000)
+    store = ShardedVectorStore(embedding_service, num_shards=2)
+    documents = [{"text": f"chunk {i}", "metadata": {"filename": name, "chunk_id": i}} for name in ("a.txt", "b.txt") for i in range(2)]
+
+    store.add_documents(documents)
+    store.delete_documents_by_filename("a.txt")
+    store.flush_writes()
+    assert sorted(store.list_filenames()) == ["b.txt"]
+    store.close()
@@ -0,0 +1,71 @@
+import asyncio
+import threading
+import time
+from app.singleflight import SingleFlight, question_key
+
+def test_concurrent_identical_calls_share_one_computation():
+    flights = SingleFlight()
+    calls = []
+
+    def slow_answer():
+        calls.append(threading.get_ident())
+        time.sleep(0.1)
+        return {"answer": "42"}
+
+    async def ask():
+        loop = asyncio.get_running_loop()
+        return await flights.do("key", lambda: loop.run_in_executor(None, slow_answer))
+
+    async def main():
+        return await asyncio.gather(*(ask() for _ in range(5)))
+
+    results = asyncio.run(main())
+
+    assert len(calls) == 1
+    assert [result for result, _ in results] == [{"answer": "42"}] * 5
+    assert sorted(shared for _, shared in results) == [False, True, True, True, True]
+    assert flights.stats() == {"in_flight": 0, "leaders": 1, "followers": 4}
+
+def test_followers_receive_the_leaders_exception_and_key_is_released():
+    flights = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.05)
+        raise RuntimeError("boom")
+
+    async def succeed():
+        return "ok"
+
+    async def main():
+        results = await asyncio.gather(flights.do("key", fail), flights.do("key", fail), return_exceptions=True)
+        again = await flights.do("key", succeed)
+        return results, again
+
+    results, again = asyncio.run(main())
+
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert again == ("ok", False)
+
+def test_cancelled_leader_does_not_cancel_followers():
+    flights = SingleFlight()
+
+    async def slow():
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def main():
+        leader = asyncio.ensure_future(flights.do("key", slow))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flights.do("key", slow))
+        await asyncio.sleep(0)
+        leader.cancel()
+        return await follower
+
+    assert asyncio.run(main()) == ("done", True)
+
+def test_question_key_normalizes_question_and_separates_versions():
+    base = question_key("What is  X?", 5, "default", "v1", {"tags": ["a"]})
+    assert base == question_key("what is x?", 5, "default", "v1", {"tags": ["a"]})
+    assert base != question_key("what is x?", 5, "default", "v2", {"tags": ["a"]})
+    assert base != question_key("what is x?", 3, "default", "v1", {"tags": ["a"]})
+    assert base != question_key("what is x?", 5, "default", "v1", None)
@@ -0,0 +1,56 @@
+import json
+import os
+import numpy as np
+import pytest
+from app.config import settings
+from app.snapshot import export_snapshot, import_snapshot
+from app.vector_store import VectorStore
+
+def test_snapshot_round_trip(tmp_path, monkeypatch, embedding_service):
+    monkeypatch.setattr(settings, "CHROMA_PERSIST_DIRECTORY", str(tmp_path / "source"))
+    source = VectorStore(embedding_service)
+    docs = [
+        {"text": "Première page.", "metadata": {"filename": "a.txt", "chunk_id": 0}},
+        {"text": "Second chunk of text.", "metadata": {"filename": "a.txt", "chunk_id": 1}},
+        {"text": "", "metadata": {"filename": "b.txt", "chunk_id": 0}},
+    ]
+    source.add_documents(docs, namespace="tenant")
+
+    snapshot_dir = str(tmp_path / "snapshot")
+    manifest = export_snapshot(source, snapshot_dir, namespace="tenant", dtype="float16", batch_size=2)
+    assert manifest["count"] == 3
+    assert manifest["dimension"] == embedding_service.dimension
+    assert np.load(os.path.join(snapshot_dir, "vectors.npy")).dtype == np.float16
+    with open(os.path.join(snapshot_dir, "manifest.json")) as f:
+        assert json.load(f)["format_version"] == 1
+
+    monkeypatch.setattr(settings, "CHROMA_PERSIST_DIRECTORY", str(tmp_path / "replica"))
+    replica = VectorStore(embedding_service=None)
+    result = import_snapshot(replica, snapshot_dir, batch_size=2)
+    assert result["imported"] == 3
+
+    chunks = {}
+    for batch in replica.iter_chunks(namespace="tenant"):
+        for chunk_id, text in zip(batch["ids"], batch["texts"]):
+            chunks[chunk_id] = text
+    assert chunks == {"a.txt_0": "Première page.", "a.txt_1": "Second chunk of text.", "b.txt_0": ""}
+
+def test_snapshot_carries_the_namespace_model_not_the_default(tmp_path, monkeypatch, make_embedding_service):
+    monkeypatch.setattr(settings, "CHROMA_PERSIST_DIRECTORY", str(tmp_path / "source"))
+    other = make_embedding_service("other-model")
+    source = VectorStore(other)
+    source.add_documents([{"text": "Chunk.", "metadata": {"filename": "a.txt", "chunk_id": 0}}], namespace="tenant")
+    manifest = export_snapshot(source, str(tmp_path / "snapshot"), namespace="tenant")
+    assert manifest["embedding_model"] == "other-model" != settings.EMBEDDING_MODEL
+    source.close()
+
+    monkeypatch.setattr(settings, "CHROMA_PERSIST_DIRECTORY", str(tmp_path / "default-replica"))
+    replica = VectorStore(embedding_service=None)
+    with pytest.raises(ValueError, match="other-model"):
+        import_snapshot(replica, str(tmp_path / "snapshot"))
+    replica.close()
+
+    monkeypatch.setattr(settings, "CHROMA_PERSIST_DIRECTORY", str(tmp_path / "replica"))
+    replica = VectorStore(make_embedding_service("other-model"))
+    assert import_snapshot(replica, str(tmp_path / "snapshot"))["imported"] == 1
+    replica.close()
@@ -5,7 +5,9 @@ class DummyEmbeddingService:
     def embed_text(self, text):
         return np.ones(384)
 
-def test_vector_store_add_and_search(tmp_path):
+def test_vector_store_add_and_search(tmp_path, monkeypatch):
+    from app.config import settings
+    monkeypatch.setattr(settings, "CHROMA_PERSIST_DIRECTORY", str(tmp_path))
     embedding_service = DummyEmbeddingService()
     store = VectorStore(embedding_service)
     docs = [
@@ -16,4 +18,80 @@ def test_vector_store_add_and_search(tmp_path):
     results = store.search("fox", top_k=1)
     assert isinstance(results, list)
     assert len(results) == 1
-    assert "text" in results[0] 
\ No newline at end of file
+    assert "text" in results[0] 
+
+def test_vector_store_namespaces_are_isolated(tmp_path, monkeypatch, embedding_service):
+    from app.config import settings
+    monkeypatch.setattr(settings, "CHROMA_PERSIST_DIRECTORY", str(tmp_path))
+    store = VectorStore(embedding_service)
+    store.add_documents([{"text": "Tenant A manual.", "metadata": {"filename": "a.txt", "chunk_id": 0}}], namespace="tenant-a")
+    store.add_documents([{"text": "Tenant B manual.", "metadata": {"filename": "b.txt", "chunk_id": 0}}], namespace="tenant-b")
+
+    assert store.list_filenames(namespace="tenant-a") == ["a.txt"]
+    assert store.list_filenames(namespace="tenant-b") == ["b.txt"]
+    assert store.list_filenames() == []
+    assert store.search("manual", top_k=5, namespace="unknown") == []
+    assert [r["metadata"]["filename"] for r in store.search("manual", top_k=5, namespace="tenant-a")] == ["a.txt"]
+
+    store.delete_documents_by_filename("a.txt", namespace="tenant-a")
+    assert store.get_document_count(namespace="tenant-a") == 0
+    assert store.get_document_count(namespace="tenant-b") == 1
+
+def test_vector_store_collection_pool_is_bounded(tmp_path, monkeypatch, embedding_service):
+    from app.config import settings
+    monkeypatch.setattr(settings, "CHROMA_PERSIST_DIRECTORY", str(tmp_path))
+    monkeypatch.setattr(settings, "MAX_OPEN_COLLECTIONS", 2)
+    store = VectorStore(embedding_service)
+    for namespace in ["t1", "t2", "t3"]:
+        store.add_documents([{"text": namespace, "metadata": {"filename": "x.txt", "chunk_id": 0}}], namespace=namespace)
+
+    open_namespaces = store.get_open_namespaces()
+    assert len(open_namespaces) == 2
+    assert settings.DEFAULT_NAMESPACE in open_namespaces
+    # Evicted collections are reopened transparently
+    assert store.get_document_count(namespace="t1") == 1
+
+def test_vector_store_catalog_version_changes_on_writes(tmp_path, monkeypatch, embedding_service):
+    from app.config import settings
+    monkeypatch.setattr(settings, "CHROMA_PERSIST_DIRECTORY", str(tmp_path))
+    store = VectorStore(embedding_service)
+    initial = store.get_catalog_version()
+
+    store.add_documents([{"text": "Versioned.", "metadata": {"filename": "v.txt", "chunk_id": 0}}])
+    after_add = store.get_catalog_version()
+    assert after_add != initial
+    assert store.get_catalog_version(namespace="other") == "0"
+
+    store.delete_documents_by_filename("v.txt")
+    assert store.get_catalog_version() not in (initial, after_add)
+
+def test_build_where_translates_filters():
+    from datetime import datetime
+    from app.vector_store import build_where
+
+    assert build_where(None) is None
+    assert build_where({"filenames": ["a.pdf"]}) == {"filename": {"$in": ["a.pdf"]}}
+    where = build_where({
+        "file_types": ["PDF", ".docx"],
+        "uploaded_after": datetime.fromtimestamp(100),
+        "tags": ["hr", "legal"],
+    })
+    assert where == {"$and": [
+        {"file_type": {"$in": [".pdf", ".docx"]}},
+        {"upload_timestamp": {"$gte": 100.0}},
+        {"$or": [{"tag_hr": True}, {"tag_legal": True}]},
+    ]}
+
+def test_vector_store_search_pushes_down_filters(tmp_path, monkeypatch, embedding_service):
+    from app.config import settings
+    monkeypatch.setattr(settings, "CHROMA_PERSIST_DIRECTORY", str(tmp_path))
+    store = VectorStore(embedding_service)
+    store.add_documents([
+        {"text": "Pump manual.", "metadata": {"filename": "pump.pdf", "chunk_id": 0, "file_type": ".pdf", "tag_ops": True}},
+        {"text": "Valve manual.", "metadata": {"filename": "valve.txt", "chunk_id": 0, "file_type": ".txt"}},
+    ])
+
+    results = store.search("manual", top_k=5, filters={"file_types": ["txt"]})
+    assert [r["metadata"]["filename"] for r in results] == ["valve.txt"]
+    results = store.search("manual", top_k=5, filters={"tags": ["ops"]})
+    assert [r["metadata"]["filename"] for r in results] == ["pump.pdf"]
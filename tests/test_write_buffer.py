@@ -0,0 +1,105 @@
+import threading
+import pytest
+from app.config import settings
+from app.vector_store import VectorStore
+from app.write_buffer import WriteBuffer
+
+class RecordingStore:
+    def __init__(self):
+        self.commits = []
+
+    def add_embeddings(self, ids, embeddings, texts, metadatas, namespace=None):
+        if any(chunk_id.startswith("bad") for chunk_id in ids):
+            raise ValueError("rejected")
+        self.commits.append((namespace, list(ids)))
+
+def chunk(chunk_id):
+    return [chunk_id], [[1.0, 0.0]], ["text"], [{"filename": chunk_id, "chunk_id": 0}]
+
+def test_concurrent_submits_are_written_as_group_commits():
+    store = RecordingStore()
+    buffer = WriteBuffer(store.add_embeddings, max_chunks=1000, max_delay=0.2, durability="flush")
+    threads = [threading.Thread(target=buffer.submit, args=chunk(f"doc{i}")) for i in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(chunk_id for _, ids in store.commits for chunk_id in ids) == sorted(f"doc{i}" for i in range(20))
+    assert len(store.commits) < 20
+    assert buffer.get_stats()["chunks_written"] == 20
+    buffer.close()
+
+def test_a_failing_upload_fails_alone():
+    store = RecordingStore()
+    buffer = WriteBuffer(store.add_embeddings, max_chunks=2, max_delay=0.2, durability="flush")
+    errors = []
+
+    def submit(chunk_id):
+        try:
+            buffer.submit(*chunk(chunk_id))
+        except ValueError as e:
+            errors.append((chunk_id, str(e)))
+
+    threads = [threading.Thread(target=submit, args=(chunk_id,)) for chunk_id in ("good", "bad")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == [("bad", "rejected")]
+    assert [ids for _, ids in store.commits] == [["good"]]
+    assert buffer.get_stats()["failed_writes"] == 1
+    buffer.close()
+
+def test_buffer_mode_acknowledges_before_writing_and_flushes_on_close():
+    store = RecordingStore()
+    buffer = WriteBuffer(store.add_embeddings, max_chunks=1000, max_delay=60, durability="buffer")
+    buffer.submit(*chunk("a"), namespace="one")
+    buffer.submit(*chunk("b"), namespace="two")
+    buffer.submit(*chunk("c"), namespace="one")
+    assert store.commits == []
+
+    buffer.close()
+    assert sorted(store.commits) == [("one", ["a", "c"]), ("two", ["b"])]
+    with pytest.raises(RuntimeError):
+        buffer.submit(*chunk("d"))
+
+def test_deleting_a_document_drops_its_buffered_chunks(tmp_path, monkeypatch, embedding_service):
+    monkeypatch.setattr(settings, "CHROMA_PERSIST_DIRECTORY", str(tmp_path))
+    monkeypatch.setattr(settings, "WRITE_BUFFER_ENABLED", True)
+    monkeypatch.setattr(settings, "WRITE_BUFFER_DURABILITY", "buffer")
+    monkeypatch.setattr(settings, "WRITE_BUFFER_MAX_DELAY_MS", 60000)
+    store = VectorStore(embedding_service=embedding_service)
+    documents = [{"text": f"chunk {i}", "metadata": {"filename": name, "chunk_id": i}} for name in ("a.txt", "b.txt") for i in range(2)]
+
+    store.add_documents(documents, namespace="tenant")
+    assert store.get_document_count("tenant") == 0
+
+    store.delete_documents_by_filename("a.txt", namespace="tenant")
+    assert sorted(store.list_filenames("tenant")) == ["b.txt"]
+    store.close()
+
+def test_a_buffered_upload_that_fails_to_be_written_is_forgotten(tmp_path, monkeypatch, embedding_service):
+    monkeypatch.setattr(settings, "CHROMA_PERSIST_DIRECTORY", str(tmp_path))
+    monkeypatch.setattr(settings, "WRITE_BUFFER_ENABLED", True)
+    monkeypatch.setattr(settings, "WRITE_BUFFER_DURABILITY", "buffer")
+    monkeypatch.setattr(settings, "WRITE_BUFFER_MAX_DELAY_MS", 60000)
+    monkeypatch.setattr(settings, "CHUNK_STORE_ENABLED", True)
+    monkeypatch.setattr(settings, "NEAR_DUP_MODE", "skip")
+    store = VectorStore(embedding_service=embedding_service)
+    text = "Expense reports are due within thirty days of travel."
+    write = store.write_buffer._write
+
+    def failing_write(*args):
+        raise RuntimeError("disk full")
+
+    store.write_buffer._write = failing_write
+    store.add_documents([{"text": text, "metadata": {"filename": "a.txt", "chunk_id": 0, "char_offset": 0}}], source_text=text)
+    store.flush_writes()
+    assert not store.has_document("a.txt")
+
+    store.write_buffer._write = write
+    assert store.add_documents([{"text": text, "metadata": {"filename": "b.txt", "chunk_id": 0}}], wait=True) == 0
+    assert store.list_filenames() == ["b.txt"]
+    store.close()